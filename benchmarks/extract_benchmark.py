@@ -0,0 +1,204 @@
+"""
+文章转换微基准测试
+
+在子进程中通过本地 HTTP 服务提供一组保存的网页，分别使用 markitdown 与轻量正文提取调用
+ContentProcessor._process_article，比较每页耗时、Python 内存分配峰值与输出的正文长度。
+
+用法:
+    # 使用保存的网页（目录中的 .html / .htm 文件）
+    python benchmarks/extract_benchmark.py --corpus pages/ --repeat 3 --output extract.json
+
+    # 没有语料时生成带导航、侧栏、评论与脚本的模拟网页
+    python benchmarks/extract_benchmark.py --generate 50 --article-bytes 12000
+"""
+import argparse
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_services import article_text
+from scan_benchmark import git_version
+
+logger = logging.getLogger('benchmark')
+
+ENGINES = ('markitdown', 'extractor')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='crss 文章转换微基准测试')
+    parser.add_argument('--corpus', help='保存的网页目录（.html / .htm 文件）')
+    parser.add_argument('--generate', type=int, default=30, help='未指定语料时生成的模拟网页数')
+    parser.add_argument('--article-bytes', type=int, default=8000, help='模拟网页正文的大约字符数')
+    parser.add_argument('--repeat', type=int, default=3, help='计时的重复次数，取每页的最小耗时')
+    parser.add_argument('--config', default='{}', help='ArticleExtractor 的参数 JSON，例如 {"min_chars": 300}')
+    parser.add_argument('--output', default='extract-benchmark.json', help='结果文件路径')
+    parser.add_argument('--label', default='', help='写入结果中的标签，便于区分不同版本')
+    return parser.parse_args(argv)
+
+
+def generate_page(index: int, size: int) -> bytes:
+    """生成带页面模板的网页，约两成使用 GBK 编码"""
+    rng = random.Random(index)
+    links = ''.join(f'<li><a href="/post/{rng.randint(1, 9999)}">相关文章 {i}</a></li>' for i in range(15))
+    sections = []
+    for part in range(3):
+        sections.append(f'<h2>第 {part + 1} 部分</h2>{article_text(f"{index}-{part}", size // 3)}')
+    sections.insert(2, '<ul><li>要点一：缓存命中率提升</li><li>要点二：延迟下降</li></ul>'
+                       '<pre><code>for item in items:\n    process(item)</code></pre>')
+    encoding = 'gbk' if index % 5 == 0 else 'utf-8'
+    html = (
+        f'<!DOCTYPE html><html><head><meta charset="{encoding}"><title>测试文章 {index}</title>'
+        f'<style>body {{ font-family: sans-serif; }}</style>'
+        f'<script>window.analytics = {{id: {index}}};</script></head><body>'
+        f'<header class="site-header"><a href="/">首页</a><nav><ul>{links}</ul></nav></header>'
+        f'<div class="layout"><div class="main-column"><article class="post">'
+        f'<h1>测试文章 {index}</h1><div class="post-meta">作者 张三 · 阅读 {rng.randint(100, 9999)}</div>'
+        f'<div class="post-body">{"".join(sections)}</div>'
+        f'<div class="share-buttons"><a href="#">微博</a><a href="#">微信</a></div></article>'
+        f'<div id="comments">{"".join(f"<p>评论 {i}：写得不错，学习了。</p>" for i in range(20))}</div>'
+        f'</div><aside class="sidebar"><ul>{links}</ul></aside></div>'
+        f'<footer>版权所有 © 2024</footer><script>trackPageView();</script></body></html>'
+    )
+    return html.encode(encoding, errors='replace')
+
+
+def prepare_corpus(args, workdir: str) -> str:
+    if args.corpus:
+        return os.path.abspath(args.corpus)
+    for index in range(args.generate):
+        with open(os.path.join(workdir, f'page-{index}.html'), 'wb') as f:
+            f.write(generate_page(index, args.article_bytes))
+    return workdir
+
+
+def serve_directory(directory: str, queue):
+    """在子进程中提供语料目录，将地址放入 queue 后一直运行到进程结束"""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    queue.put(f'http://127.0.0.1:{server.server_address[1]}')
+    server.serve_forever()
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def build_processor(engine: str, extractor_config: Dict):
+    from src.article_extractor import ArticleExtractor
+    from src.content_processor import ContentProcessor
+    from src.transport import Transport
+
+    transport = Transport()
+    extractor = ArticleExtractor(transport.session, **extractor_config) if engine == 'extractor' else None
+    # 只调用转换，不会请求LLM
+    llm_config = {'api_key': 'benchmark', 'api_url': 'http://127.0.0.1:9/v1/chat/completions', 'model': 'benchmark'}
+    return ContentProcessor(llm_config, transport=transport, extractor=extractor)
+
+
+def run_engine(engine: str, urls: List[str], args) -> Dict:
+    from src.metrics import metrics
+
+    processor = build_processor(engine, json.loads(args.config))
+    metrics.reset_scan()
+    timings = {url: float('inf') for url in urls}
+    outputs = {}
+    for _ in range(max(1, args.repeat)):
+        for url in urls:
+            start = time.perf_counter()
+            result = processor._process_article(url)
+            timings[url] = min(timings[url], time.perf_counter() - start)
+            content = result.get('markdown_content')
+            outputs[url] = len(content.text_content) if content else 0
+
+    # 内存单独统计，避免 tracemalloc 影响计时
+    peaks = []
+    for url in urls:
+        tracemalloc.start()
+        processor._process_article(url)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    processor.transport.close()
+    ordered = sorted(timings.values())
+    events = metrics.scan_summary()['events']
+    return {
+        'pages': len(urls),
+        'failures': sum(1 for chars in outputs.values() if not chars),
+        'total_seconds': round(sum(ordered), 3),
+        'avg_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+        'peak_alloc_kb': round(max(peaks) / 1024, 1),
+        'avg_peak_alloc_kb': round(sum(peaks) / len(peaks) / 1024, 1),
+        'output_chars': sum(outputs.values()),
+        'fast_path': events.get('extract_fast', 0),
+        'fallback': events.get('extract_fallback', 0),
+        '_outputs': outputs,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    with tempfile.TemporaryDirectory(prefix='crss-extract-') as workdir:
+        corpus = prepare_corpus(args, workdir)
+        names = sorted(name for name in os.listdir(corpus) if name.lower().endswith(('.html', '.htm')))
+        if not names:
+            raise SystemExit(f"语料目录中没有网页: {corpus}")
+
+        queue = multiprocessing.Queue()
+        server = multiprocessing.Process(target=serve_directory, args=(corpus, queue), daemon=True)
+        server.start()
+        try:
+            base_url = queue.get(timeout=30)
+            urls = [f'{base_url}/{name}' for name in names]
+            results = {engine: run_engine(engine, urls, args) for engine in ENGINES}
+        finally:
+            server.terminate()
+            server.join()
+
+    # 正文长度之比用于发现提取过多或过少的网页
+    baseline = results['markitdown'].pop('_outputs')
+    extracted = results['extractor'].pop('_outputs')
+    ratios = sorted(extracted[url] / baseline[url] for url in urls if baseline[url])
+    output = {
+        'label': args.label,
+        'version': git_version(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'corpus': args.corpus or f'generated:{args.generate}',
+        'results': results,
+        'speedup': round(results['markitdown']['total_seconds'] / max(results['extractor']['total_seconds'], 1e-9), 2),
+        'output_ratio_median': round(ratios[len(ratios) // 2], 3) if ratios else None,
+        'output_ratio_min': round(ratios[0], 3) if ratios else None,
+    }
+    for engine in ENGINES:
+        result = results[engine]
+        logger.warning(f"{engine}: {result['pages']} 页, 平均 {result['avg_ms']} ms, p95 {result['p95_ms']} ms, "
+                       f"内存分配峰值 {result['peak_alloc_kb']} KB, 正文 {result['output_chars']} 字符, "
+                       f"失败 {result['failures']}")
+    logger.warning(f"加速比 {output['speedup']}，正文长度比中位数 {output['output_ratio_median']}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    logger.warning(f"结果已保存到 {args.output}")
+    return output
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+# 生成正文用的词表，中英文混合，保证不同文章内容不同
+WORDS_ZH = ['数据', '模型', '系统', '网络', '用户', '服务', '性能', '缓存', '延迟', '吞吐',
+            '架构', '存储', '索引', '调度', '并发', '协议', '编码', '解析', '推送', '订阅']
+WORDS_EN = ['latency', 'throughput', 'cache', 'queue', 'kernel', 'socket', 'thread', 'buffer',
+            'index', 'shard', 'replica', 'stream', 'parser', 'vector', 'token', 'budget']
+
+
+class ServiceStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+
+class RateLimiter:
+    def __init__(self, per_second: float):
+        """令牌桶，per_second 为 0 时不限速"""
+        self.per_second = per_second
+        self.tokens = per_second
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.per_second <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.per_second, self.tokens + (now - self.updated) * self.per_second)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def article_text(seed: str, size: int) -> str:
+    """按种子生成确定的正文，约 size 个字符"""
+    rng = random.Random(seed)
+    paragraphs = []
+    length = 0
+    while length < size:
+        words = [rng.choice(WORDS_ZH) if rng.random() < 0.5 else rng.choice(WORDS_EN) for _ in range(60)]
+        paragraph = ' '.join(words) + '。'
+        paragraphs.append(paragraph)
+        length += len(paragraph)
+    return '\n'.join(f'<p>{p}</p>' for p in paragraphs)
+
+
+class FakeServices:
+    def __init__(self, params: Dict):
+        """
+        基准测试使用的本地服务：RSS源、文章、OpenAI 兼容的 LLM 与推送接收端
+
+        每种服务使用独立端口，以便按主机限流的逻辑与真实环境一致。
+
+        Args:
+            params: 服务参数
+                feeds: RSS源数量
+                items: 每个RSS源的条目数
+                article_bytes: 每篇文章正文的大约字符数
+                gbk_ratio: 使用 GBK 编码的RSS源比例
+                llm_latency: LLM 每次请求的延迟（秒）
+                llm_rps: LLM 每秒允许的请求数，超出时返回 429，0 表示不限
+                webhook_latency: 推送接收端的延迟（秒）
+        """
+        self.params = params
+        self.stats = ServiceStats()
+        self.llm_limiter = RateLimiter(float(params.get('llm_rps', 0)))
+        self.servers = {}
+        self._feed_cache: Dict[int, bytes] = {}
+        self._feed_lock = threading.Lock()
+
+    def start(self, host: str = '127.0.0.1') -> Dict[str, str]:
+        """启动所有服务，返回各服务的基础地址"""
+        handlers = {
+            'feed': self._handle_feed,
+            'article': self._handle_article,
+            'llm': self._handle_llm,
+            'webhook': self._handle_webhook,
+        }
+        urls = {}
+        for name, handler in handlers.items():
+            server = ThreadingHTTPServer((host, 0), _make_handler(handler, self.stats))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name=f'fake-{name}', daemon=True).start()
+            self.servers[name] = server
+            urls[name] = f'http://{host}:{server.server_address[1]}'
+        self.urls = urls
+        return urls
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def feed_encoding(self, index: int) -> str:
+        ratio = float(self.params.get('gbk_ratio', 0))
+        if ratio > 0 and index % max(1, round(1 / ratio)) == 0:
+            return 'gbk'
+        return 'utf-8'
+
+    def feed_body(self, index: int) -> bytes:
+        with self._feed_lock:
+            if index not in self._feed_cache:
+                self._feed_cache[index] = self._build_feed(index)
+            return self._feed_cache[index]
+
+    def _build_feed(self, index: int) -> bytes:
+        encoding = self.feed_encoding(index)
+        items = int(self.params.get('items', 20))
+        now = time.time()
+        entries = []
+        for n in range(items):
+            link = f'{self.urls["article"]}/articles/{index}/{n}.html'
+            published = formatdate(now - n * 3600, usegmt=True)
+            entries.append(
+                f'<item><title>第{index}号源 文章{n}</title><link>{link}</link><guid>{link}</guid>'
+                f'<pubDate>{published}</pubDate><description>摘要 {index}-{n}</description></item>'
+            )
+        xml = (
+            f'<?xml version="1.0" encoding="{encoding}"?>'
+            f'<rss version="2.0"><channel><title>基准测试源 {index}</title><ttl>30</ttl>'
+            f'{"".join(entries)}</channel></rss>'
+        )
+        return xml.encode(encoding)
+
+    def _handle_feed(self, request: BaseHTTPRequestHandler):
+        self.stats.increment('feed_requests')
+        try:
+            index = int(request.path.rsplit('/', 1)[-1].split('.', 1)[0])
+        except ValueError:
+            request.send_error(404)
+            return
+        body = self.feed_body(index)
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if request.headers.get('If-None-Match') == etag:
+            self.stats.increment('feed_not_modified')
+            request.send_response(304)
+            request.send_header('ETag', etag)
+            request.end_headers()
+            return
+        request.send_response(200)
+        request.send_header('Content-Type', f'application/rss+xml; charset={self.feed_encoding(index)}')
+        request.send_header('ETag', etag)
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        if request.command != 'HEAD':
+            request.wfile.write(body)
+
+    def _handle_article(self, request: BaseHTTPRequestHandler):
+        self.stats.increment('article_requests')
+        text = article_text(request.path, int(self.params.get('article_bytes', 8000)))
+        body = (
+            f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{request.path}</title></head>'
+            f'<body><nav>导航 菜单</nav><article><h1>{request.path}</h1>{text}</article>'
+            f'<footer>页脚</footer></body></html>'
+        ).encode('utf-8')
+        request.send_response(200)
+        request.send_header('Content-Type', 'text/html; charset=utf-8')
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        if request.command != 'HEAD':
+            request.wfile.write(body)
+
+    def _handle_llm(self, request: BaseHTTPRequestHandler):
+        length = int(request.headers.get('Content-Length', 0))
+        payload = json.loads(request.rfile.read(length) or b'{}')
+        if not self.llm_limiter.allow():
+            self.stats.increment('llm_rate_limited')
+            request.send_response(429)
+            request.send_header('Retry-After', '1')
+            request.send_header('Content-Length', '0')
+            request.end_headers()
+            return
+
+        self.stats.increment('llm_requests')
+        time.sleep(float(self.params.get('llm_latency', 0)))
+        prompt = ''.join(str(m.get('content', '')) for m in payload.get('messages', []))
+        body = json.dumps({
+            'choices': [{'message': {'role': 'assistant', 'content': f'摘要：共 {len(prompt)} 字符'}}],
+            'usage': {'prompt_tokens': len(prompt) // 2, 'completion_tokens': 16},
+        }).encode('utf-8')
+        request.send_response(200)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        if request.command != 'HEAD':
+            request.wfile.write(body)
+
+    def _handle_webhook(self, request: BaseHTTPRequestHandler):
+        length = int(request.headers.get('Content-Length', 0))
+        request.rfile.read(length)
+        self.stats.increment('webhook_posts')
+        time.sleep(float(self.params.get('webhook_latency', 0)))
+        request.send_response(200)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', '2')
+        request.end_headers()
+        request.wfile.write(b'{}')
+
+
+def _make_handler(handler, stats: ServiceStats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if self.path == '/_stats':
+                body = json.dumps(stats.snapshot()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            handler(self)
+
+        def do_HEAD(self):
+            handler(self)
+
+        def do_POST(self):
+            handler(self)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(params: Dict, queue):
+    """在子进程中运行服务，将各服务地址放入 queue 后一直运行到进程结束"""
+    services = FakeServices(params)
+    queue.put(services.start())
+    threading.Event().wait()
@@ -0,0 +1,206 @@
+"""
+端到端扫描基准测试
+
+在子进程中启动本地 RSS源、文章、LLM 与推送服务，使用临时数据库驱动 RSSMonitor.scan_feeds，
+记录每次扫描的耗时、吞吐量、内存峰值与各阶段耗时，结果保存为 JSON 以便在不同版本间对比。
+
+用法:
+    python benchmarks/scan_benchmark.py --feeds 50 --items 20 --gbk-ratio 0.2 \
+        --llm-latency 0.2 --llm-rps 20 --scans 2 --output benchmark.json \
+        --config '{"scan_workers": 8}'
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import yaml
+
+from fake_services import serve
+
+logger = logging.getLogger('benchmark')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='crss 端到端扫描基准测试')
+    parser.add_argument('--feeds', type=int, default=20, help='RSS源数量')
+    parser.add_argument('--items', type=int, default=20, help='每个RSS源的条目数')
+    parser.add_argument('--article-bytes', type=int, default=8000, help='每篇文章正文的大约字符数')
+    parser.add_argument('--gbk-ratio', type=float, default=0.2, help='使用 GBK 编码的RSS源比例')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='LLM 每次请求的延迟（秒）')
+    parser.add_argument('--llm-rps', type=float, default=0, help='LLM 每秒允许的请求数，0 表示不限')
+    parser.add_argument('--webhook-latency', type=float, default=0, help='推送接收端的延迟（秒）')
+    parser.add_argument('--scans', type=int, default=2, help='扫描次数，第一次为冷启动，之后为无更新扫描')
+    parser.add_argument('--config', default='{}', help='合并到生成配置中的 JSON，例如 {"scan_workers": 8}')
+    parser.add_argument('--tracemalloc', action='store_true', help='统计 Python 分配的内存峰值（会降低速度）')
+    parser.add_argument('--output', default='benchmark-results.json', help='结果文件路径')
+    parser.add_argument('--label', default='', help='写入结果中的标签，便于区分不同版本')
+    parser.add_argument('--verbose', action='store_true', help='输出 crss 的运行日志')
+    return parser.parse_args(argv)
+
+
+def build_config(args, urls: Dict[str, str], workdir: str) -> Dict:
+    config = {
+        'database': os.path.join(workdir, 'benchmark.db'),
+        'log_file': os.path.join(workdir, 'logs', 'benchmark.log'),
+        'target_api': urls['webhook'] + '/hook',
+        'llm': {
+            'api_key': 'benchmark',
+            'api_url': urls['llm'] + '/v1/chat/completions',
+            'model': 'benchmark',
+            'temperature': 0.1,
+            'max_tokens': 1000,
+            'context_window': 32000,
+            'max_concurrency': 4,
+            'timeout': 30,
+            'max_retries': 5,
+        },
+        'feeds': [
+            {'name': f'benchmark-{i}', 'url': f'{urls["feed"]}/feeds/{i}.xml'}
+            for i in range(args.feeds)
+        ],
+    }
+    overrides = json.loads(args.config)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key] = {**config[key], **value}
+        else:
+            config[key] = value
+    return config
+
+
+def peak_rss_mb() -> float:
+    """进程启动以来的常驻内存峰值（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def fetch_stats(urls: Dict[str, str]) -> Dict[str, int]:
+    """各服务共用同一组计数，从任一服务读取即可"""
+    with urllib.request.urlopen(urls['feed'] + '/_stats', timeout=10) as response:
+        return json.load(response)
+
+
+def git_version() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], cwd=ROOT,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def run_scans(monitor, args) -> List[Dict]:
+    from src.metrics import metrics
+
+    results = []
+    for index in range(args.scans):
+        if args.tracemalloc:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        monitor.scan_feeds()
+        scan_seconds = time.perf_counter() - start
+        # 推送在后台进行，单独统计清空推送队列的耗时
+        monitor.delivery.drain(timeout=300)
+        total_seconds = time.perf_counter() - start
+
+        summary = metrics.scan_summary()
+        items = summary['events'].get('entries_new', 0)
+        result = {
+            'scan': index + 1,
+            'scan_seconds': round(scan_seconds, 3),
+            'total_seconds': round(total_seconds, 3),
+            'items': items,
+            'items_per_second': round(items / total_seconds, 2) if total_seconds else 0.0,
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': summary['stages'],
+            'events': summary['events'],
+        }
+        if args.tracemalloc:
+            result['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+            tracemalloc.stop()
+        results.append(result)
+        logger.warning(f"第 {index + 1} 次扫描: {result['total_seconds']}s, {items} 条, "
+                       f"{result['items_per_second']} 条/秒, 内存峰值 {result['peak_rss_mb']} MB")
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    params = {
+        'feeds': args.feeds,
+        'items': args.items,
+        'article_bytes': args.article_bytes,
+        'gbk_ratio': args.gbk_ratio,
+        'llm_latency': args.llm_latency,
+        'llm_rps': args.llm_rps,
+        'webhook_latency': args.webhook_latency,
+    }
+    # 本地服务运行在子进程中，不计入本进程的 CPU 与内存
+    queue = multiprocessing.Queue()
+    services = multiprocessing.Process(target=serve, args=(params, queue), daemon=True)
+    services.start()
+    try:
+        urls = queue.get(timeout=30)
+        with tempfile.TemporaryDirectory(prefix='crss-benchmark-') as workdir:
+            config = build_config(args, urls, workdir)
+            config_path = os.path.join(workdir, 'config.yaml')
+            with open(config_path, 'w', encoding='utf-8') as f:
+                yaml.safe_dump(config, f, allow_unicode=True)
+
+            from main import RSSMonitor
+
+            baseline_rss = peak_rss_mb()
+            monitor = RSSMonitor(config_path)
+            try:
+                scans = run_scans(monitor, args)
+            finally:
+                monitor.close()
+
+        output = {
+            'label': args.label,
+            'version': git_version(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': params,
+            'config_overrides': json.loads(args.config),
+            'baseline_rss_mb': baseline_rss,
+            'scans': scans,
+            'services': fetch_stats(urls),
+        }
+    finally:
+        services.terminate()
+        services.join()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    logger.warning(f"结果已保存到 {args.output}")
+    return output
+
+
+if __name__ == '__main__':
+    main()
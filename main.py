@@ -1,18 +1,34 @@
 import logging
 import os
+import sys
 import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 import pytz
 
 import schedule
 
+from src.article_extractor import ArticleExtractor
+from src.async_engine import AsyncScanEngine
+from src.checkpoint import ScanCheckpoints
 from src.config import Config
+from src.content_probe import ContentProbe
 from src.content_processor import ContentProcessor
 from src.database import Database
+from src.delivery import DeliveryService
 from src.feed import FeedProcessor
+from src.host_health import HostHealth, host_of
 from src.http_client import HTTPClient
+from src.llm_cache import LLMCache
+from src.metrics import MetricsServer, metrics
+from src.near_duplicate import NearDuplicateIndex
+from src.scheduler import FeedScheduler
+from src.summary_generator import NO_ARTICLES, SummaryGenerator
+from src.transport import Transport
 from src.utils import setup_logging
-from src.summary_generator import SummaryGenerator
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,6 +36,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 自适应轮询模式下重新加载配置的最长间隔（秒）
+ADAPTIVE_POLL_SECONDS = 60
+
 class RSSMonitor:
     def __init__(self, config_path: str):
         # 加载配置
@@ -35,75 +54,379 @@ class RSSMonitor:
         self.schedule_times = self.config.schedule_times
 
         # 获取代理配置
-        proxy_config = getattr(self.config, 'proxy', None)
+        proxy_config = self.config.proxy
         if proxy_config:
             self.logger.info(f"使用代理配置: HTTP={proxy_config.get('http', 'None')}, "
                            f"HTTPS={proxy_config.get('https', 'None')}")
         
         # 初始化组件
-        self.database = Database(self.config.database)
-        self.http_client = HTTPClient(self.config.target_api, proxy_config)
+        self.database = Database(
+            self.config.database,
+            seen_filter_config=self.config.seen_filter,
+            write_buffer_config=self.config.db_write_buffer
+        )
+        # 按主机熔断，状态保存在数据库中
+        breaker_config = self.config.circuit_breaker
+        self.host_health = None
+        if breaker_config:
+            self.host_health = HostHealth(
+                self.database,
+                failure_threshold=int(breaker_config['failure_threshold']),
+                error_rate=float(breaker_config['error_rate']),
+                min_requests=int(breaker_config['min_requests']),
+                window=int(breaker_config['window']),
+                slow_seconds=float(breaker_config['slow_seconds']),
+                cooldown=float(breaker_config['cooldown']),
+                max_cooldown=float(breaker_config['max_cooldown']),
+                # LLM 与推送接口的响应时间取决于请求内容，慢响应不代表主机异常
+                slow_exempt=(host_of(self.config.llm_config.get('api_url') or ''),
+                             host_of(self.config.target_api or ''))
+            )
+
+        # RSS源、文章、LLM与推送共用一个连接池
+        self.transport = Transport(self.config.http, proxy_config, host_health=self.host_health)
+        self.http_client = HTTPClient(self.config.target_api, transport=self.transport)
+        self.delivery = DeliveryService(self.database, self.http_client, self.config.delivery,
+                                        host_health=self.host_health)
         
+        # 初始化LLM分析结果缓存
+        llm_cache_config = self.config.llm_cache
+        self.llm_cache = None
+        if llm_cache_config:
+            self.llm_cache = LLMCache(
+                self.database,
+                max_entries=int(llm_cache_config['max_entries']),
+                max_age_days=int(llm_cache_config['max_age_days'])
+            )
+
+        # 初始化近似重复内容索引
+        near_duplicate_config = self.config.near_duplicate
+        self.near_duplicates = None
+        if near_duplicate_config:
+            self.near_duplicates = NearDuplicateIndex(
+                self.database,
+                max_distance=int(near_duplicate_config['max_distance']),
+                max_age_days=int(near_duplicate_config['max_age_days']),
+                min_tokens=int(near_duplicate_config['min_tokens'])
+            )
+
+        # 初始化下载转换前的资源类型探测
+        probe_config = self.config.content_probe
+        self.content_probe = None
+        if probe_config:
+            self.content_probe = ContentProbe(
+                self.transport.session,
+                timeout=float(probe_config['timeout']),
+                max_bytes=int(probe_config['max_bytes']),
+                cache_size=int(probe_config['cache_size']),
+                trust_after=int(probe_config['trust_after'])
+            )
+
+        # 初始化HTML正文提取
+        extractor_config = self.config.article_extractor
+        self.article_extractor = None
+        if extractor_config:
+            self.article_extractor = ArticleExtractor(
+                self.transport.session,
+                max_bytes=int(extractor_config['max_bytes']),
+                timeout=float(extractor_config['timeout']),
+                min_chars=int(extractor_config['min_chars'])
+            )
+
         # 初始化内容处理器
         self.content_processor = ContentProcessor(
-            llm_config=self.config.llm_config
+            llm_config=self.config.llm_config,
+            cache=self.llm_cache,
+            transport=self.transport,
+            probe=self.content_probe,
+            extractor=self.article_extractor
         )
         
+        # 扫描检查点，进程中断后重启时继续未完成的条目
+        self.checkpoints = ScanCheckpoints(self.database) if self.config.scan_checkpoints else None
+
         # 初始化Feed处理器
         self.feed_processor = FeedProcessor(
             database=self.database,
             http_client=self.http_client,
-            content_processor=self.content_processor
+            content_processor=self.content_processor,
+            pipeline_config=self.config.pipeline,
+            delivery=self.delivery,
+            early_exit_config=self.config.early_exit,
+            near_duplicates=self.near_duplicates,
+            duplicate_action=near_duplicate_config['action'] if near_duplicate_config else 'skip',
+            streaming_config=self.config.streaming_parse,
+            checkpoints=self.checkpoints
         )
 
-    def scan_feeds(self):
-        """执行一次完整的扫描"""
+        # 自适应轮询调度器，未启用时按 schedule_times 扫描全部RSS源
+        schedule_config = self.config.adaptive_schedule
+        self.scheduler = FeedScheduler(self.database, schedule_config) if schedule_config else None
+
+        # 每日摘要，条目入库后增量汇总要点
+        summary_config = self.config.daily_summary
+        self.summary_generator = None
+        if summary_config:
+            self.summary_generator = SummaryGenerator(
+                self.content_processor, self.database, self.config.llm_config, summary_config
+            )
+
+        # 可选的 Prometheus 指标端点，在 run() 中启动
+        self.metrics_server = None
+
+    def scan_feeds(self, feeds: Optional[List[Dict]] = None):
+        """
+        执行一次扫描
+
+        Args:
+            feeds: 需要扫描的RSS源，默认为配置中的全部RSS源
+        """
+        feeds, scan_id = self.begin_scan(feeds)
+        # 推送在后台进行，扫描只负责入队
+        self.delivery.start()
+
+        workers = self.config.scan_workers
+        if workers > 1:
+            self.logger.info(f"并发扫描 - 线程数: {workers}, 单主机并发: {self.config.per_host_workers}")
+            results = self._scan_concurrently(feeds, scan_id, workers)
+        else:
+            results = [self._scan_feed(feed, scan_id) for feed in feeds]
+
+        self.finish_scan(scan_id, results, feeds)
+
+    def begin_scan(self, feeds: Optional[List[Dict]] = None) -> Tuple[List[Dict], int]:
+        """重新加载配置并创建扫描记录，返回 (RSS源列表, 扫描ID)"""
         current_time = datetime.now(self.timezone).strftime('%Y-%m-%d %H:%M:%S %Z')
         self.logger.info(f"开始扫描RSS源 - 当前时间: {current_time}")
         
         # 重新加载配置
         self.config.load_config()
-        feeds = self.config.feeds
+        if feeds is None:
+            feeds = self.config.feeds
         
+        if self.llm_cache is not None:
+            self.llm_cache.reset_stats()
+        if self.near_duplicates is not None:
+            self.near_duplicates.reset_stats()
+        self.feed_processor.pipeline.reset_stats()
+        metrics.reset_scan()
+        if self.host_health is not None:
+            self.host_health.reset_scan()
+
         # 创建新的扫描记录
-        scan_id = self.database.start_scan(len(feeds))
+        return feeds, self.database.start_scan(len(feeds))
+
+    def finish_scan(self, scan_id: int, results: List[Dict], feeds: Optional[List[Dict]] = None):
+        """汇总每个RSS源的结果并更新扫描记录，启用自适应轮询时据此安排各RSS源的下次检查"""
         total_success = 0
         total_error = 0
+        total_bytes_saved = 0
         error_details = []
 
-        # 处理每个RSS源
-        for feed in feeds:
-            try:
-                self.logger.info(f"处理RSS源: {feed['name']}")
-                
-                result = self.feed_processor.process_feed(
-                    feed_name=feed['name'],
-                    feed_url=feed['url'],
-                    scan_history_id=scan_id,
-                )
-                
-                total_success += result['success']
-                total_error += result['error']
-                
-            except Exception as e:
-                error_msg = f"处理RSS源 {feed['name']} 时发生错误: {str(e)}"
-                self.logger.error(error_msg)
-                error_details.append(error_msg)
-                total_error += 1
+        # 汇总每个RSS源的结果
+        for result in results:
+            total_success += result['success']
+            total_error += result['error']
+            total_bytes_saved += result.get('bytes_saved', 0)
+            if result.get('error_msg'):
+                error_details.append(result['error_msg'])
+
+        if self.scheduler is not None and feeds is not None:
+            for feed, result in zip(feeds, results):
+                self.scheduler.record(feed, result)
+
+        # 因熔断跳过的请求记入错误详情
+        if self.host_health is not None:
+            error_details.extend(self.host_health.scan_report())
+            self.host_health.save()
 
-        # 更新扫描记录
+        # 写入剩余的缓冲数据并更新扫描记录
+        self.database.flush()
+        if self.checkpoints is not None:
+            self.checkpoints.finish(scan_id)
+        stage_metrics = metrics.scan_summary()
         self.database.end_scan(
             scan_id=scan_id,
             success_count=total_success,
             error_count=total_error,
-            error_detail=error_details
+            error_detail=error_details,
+            bytes_saved=total_bytes_saved,
+            stage_metrics=stage_metrics
         )
         
-        self.logger.info(f"扫描完成 - 成功: {total_success}, 错误: {total_error}")
+        self.logger.info(f"扫描完成 - 成功: {total_success}, 错误: {total_error}, "
+                         f"节省流量: {total_bytes_saved} 字节")
+        self.feed_processor.pipeline.log_stats()
+        for stage, summary in stage_metrics['stages'].items():
+            self.logger.info(f"阶段耗时 {stage}: {summary}")
+        self.logger.info(f"事件计数: {stage_metrics['events']}")
+        self.logger.info(f"推送统计: {self.delivery.stats()}")
+        transport_stats = self.transport.stats()
+        self.logger.info(f"连接复用统计: 请求 {transport_stats['requests']}, "
+                         f"新建连接 {transport_stats['connections']}, 复用率 {transport_stats['reuse_rate']}")
+        if self.database.seen_filter is not None:
+            self.logger.info(f"已处理链接过滤器统计: {self.database.seen_filter.stats()}")
+        if self.llm_cache is not None:
+            self.logger.info(f"LLM缓存统计: {self.llm_cache.stats()}")
+            self.llm_cache.evict()
+        if self.content_probe is not None:
+            self.logger.info(f"资源类型探测统计: {self.content_probe.stats()}")
+        if self.host_health is not None:
+            self.logger.info(f"主机健康统计: {self.host_health.stats()}")
+        if self.near_duplicates is not None:
+            self.logger.info(f"近似重复检测统计: {self.near_duplicates.stats()}")
+            self.near_duplicates.evict()
+        self._maintain_database()
+        if self.summary_generator is not None:
+            self._update_daily_summary()
+
+    def _update_daily_summary(self):
+        """追加新条目的要点，到达 daily_summary.time 后生成并推送当天的摘要（每天一次）"""
+        try:
+            self.summary_generator.update_digests()
+            now = datetime.now()
+            date = now.strftime('%Y-%m-%d')
+            if now.strftime('%H:%M') < self.config.daily_summary['time'] or self.database.is_daily_summary_sent(date):
+                return
+
+            summary = self.summary_generator.generate_daily_summary(date)
+            if summary == NO_ARTICLES:
+                return
+            self.http_client.post({
+                "type": "summary",
+                "title": f"每日摘要 - {date}",
+                "content": summary,
+                "folder": "RSS Summary"
+            })
+            self.database.mark_daily_summary_sent(date)
+            self.logger.info(f"已推送每日摘要: {date}")
+        except Exception as e:
+            self.logger.error(f"生成每日摘要失败: {str(e)}")
+
+    def _maintain_database(self):
+        """按 db_maintenance.interval_hours 压缩旧的已处理项目并执行 ANALYZE/VACUUM"""
+        maintenance_config = self.config.db_maintenance
+        if not maintenance_config:
+            return
+        now = time.time()
+        last_run_at = self.database.get_maintenance_time('database')
+        if last_run_at is not None and now - last_run_at < float(maintenance_config['interval_hours']) * 3600:
+            return
+        try:
+            self.database.compact_processed_items(int(maintenance_config['retention_days']))
+            self.database.optimize(vacuum=bool(maintenance_config['vacuum']))
+            self.database.set_maintenance_time('database', now)
+            self.logger.info("数据库维护完成")
+        except Exception as e:
+            self.logger.error(f"数据库维护失败: {str(e)}")
+
+    def _scan_feed(self, feed: Dict, scan_id: int) -> Dict:
+        """处理单个RSS源，返回包含成功数、错误数和错误信息的字典"""
+        try:
+            self.logger.info(f"处理RSS源: {feed['name']}")
+
+            return self.feed_processor.process_feed(
+                feed_name=feed['name'],
+                feed_url=feed['url'],
+                scan_history_id=scan_id,
+            )
+
+        except Exception as e:
+            error_msg = f"处理RSS源 {feed['name']} 时发生错误: {str(e)}"
+            self.logger.error(error_msg)
+            return {'success': 0, 'error': 1, 'error_msg': error_msg}
+
+    def _scan_concurrently(self, feeds: List[Dict], scan_id: int, workers: int) -> List[Dict]:
+        """
+        使用线程池并发处理RSS源
+
+        同一主机的并发数受 per_host_workers 限制；主机已满时跳过其RSS源，
+        先派发其他主机的任务，避免慢主机占满线程池。
+        """
+        per_host = self.config.per_host_workers
+        pending = deque(enumerate(feeds))
+        active_hosts: Dict[str, int] = defaultdict(int)
+        running = {}
+        results: List[Dict] = [{}] * len(feeds)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan') as executor:
+            while pending or running:
+                # 派发主机尚有余量的任务
+                skipped = deque()
+                while pending and len(running) < workers:
+                    index, feed = pending.popleft()
+                    host = (urlparse(feed.get('url', '')).hostname or '').lower()
+                    if active_hosts[host] >= per_host:
+                        skipped.append((index, feed))
+                        continue
+                    active_hosts[host] += 1
+                    running[executor.submit(self._scan_feed, feed, scan_id)] = (index, host)
+                pending.extendleft(reversed(skipped))
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, host = running.pop(future)
+                    active_hosts[host] -= 1
+                    results[index] = future.result()
+
+        return results
+
+    def resume_scans(self):
+        """继续上次进程中断时未完成的扫描：未入队的条目从已完成的阶段继续，并结束遗留的扫描记录"""
+        for scan in self.database.get_unfinished_scans():
+            jobs = self.checkpoints.load(scan['id']) if self.checkpoints is not None else []
+            self.logger.info(f"继续中断的扫描 {scan['id']}（开始于 {scan['start_time']}），未完成条目 {len(jobs)} 个")
+            for job in jobs:
+                self.feed_processor.pipeline.submit(job)
+            for job in jobs:
+                job.wait()
+
+            success = 0
+            error_details = [f"扫描中断，启动时继续未完成的条目 {len(jobs)} 个"]
+            for job in jobs:
+                if job.status in ('queued', 'duplicate'):
+                    success += 1
+                elif job.error:
+                    error_details.append(f"处理条目错误 {job.feed_name}: {job.error}")
+            metrics.increment('items_resumed', len(jobs))
+
+            self.database.flush()
+            if self.checkpoints is not None:
+                self.checkpoints.finish(scan['id'])
+            self.database.end_scan(
+                scan_id=scan['id'],
+                success_count=success,
+                error_count=len(jobs) - success,
+                error_detail=error_details
+            )
 
     def run(self):
         """启动监控程序"""
         self.logger.info("crss启动")
+        try:
+            self.resume_scans()
+        except Exception as e:
+            self.logger.error(f"继续中断的扫描失败: {str(e)}")
+
+        metrics_config = self.config.metrics
+        if metrics_config:
+            self.metrics_server = MetricsServer(metrics_config['host'], int(metrics_config['port']))
+            self.metrics_server.start()
+
+        if self.config.engine == 'asyncio':
+            self.logger.info("使用 asyncio 引擎")
+            try:
+                AsyncScanEngine(self).run_forever()
+            except KeyboardInterrupt:
+                self.logger.info("程序被用户中断")
+            self.close()
+            return
+
+        if self.scheduler is not None:
+            self.logger.info("使用自适应轮询")
+            self._run_adaptive()
+            self.close()
+            return
         
         # 立即执行一次扫描
         self.scan_feeds()
@@ -112,6 +435,10 @@ class RSSMonitor:
         for time_str in self.schedule_times:
             schedule.every().day.at(time_str).do(self.scan_feeds)
             self.logger.info(f"已设置每日 {time_str} ({self.timezone.zone}) 运行扫描任务")
+        if self.summary_generator is not None:
+            summary_time = self.config.daily_summary['time']
+            schedule.every().day.at(summary_time).do(self._update_daily_summary)
+            self.logger.info(f"已设置每日 {summary_time} ({self.timezone.zone}) 生成每日摘要")
         
         # 主循环
         while True:
@@ -126,50 +453,49 @@ class RSSMonitor:
                 # 继续运行，不中断程序
                 continue
 
-def process_feeds():
-    """处理所有RSS源"""
-    try:
-        # 初始化组件
-        config = Config()
-        db = Database(config.get('database'))
-        http_client = HTTPClient(config.get('target_api'))
-        content_processor = ContentProcessor(config.get('llm'))
-        feed_processor = FeedProcessor(db, http_client, content_processor)
-        
-        # 处理RSS源
-        feed_processor.process_all_feeds()
-        
-        # 生成每日摘要
-        summary_generator = SummaryGenerator(content_processor, db, config.get('llm'))
-        summary = summary_generator.generate_daily_summary()
-        
-        # 推送摘要
-        if summary and summary != "今天没有新的文章。":
-            http_client.send_message({
-                "type": "summary",
-                "title": f"每日摘要 - {datetime.now().strftime('%Y-%m-%d')}",
-                "content": summary,
-                "folder": "RSS Summary"
-            })
-            
-    except Exception as e:
-        logger.error(f"处理RSS源时发生错误: {str(e)}")
+        self.close()
+
+    def _run_adaptive(self):
+        """按调度器安排的时间扫描到期的RSS源"""
+        while True:
+            try:
+                feeds = self.due_feeds()
+                if feeds:
+                    self.scan_feeds(feeds)
+                time.sleep(self.next_poll_delay())
+            except KeyboardInterrupt:
+                self.logger.info("程序被用户中断")
+                break
+            except Exception as e:
+                self.logger.error(f"发生错误: {str(e)}")
+                time.sleep(ADAPTIVE_POLL_SECONDS)
+
+    def due_feeds(self) -> List[Dict]:
+        """重新加载配置并返回自适应轮询中已到期的RSS源"""
+        self.config.load_config()
+        self.scheduler.sync(self.config.feeds)
+        return self.scheduler.due()
+
+    def next_poll_delay(self) -> float:
+        """距离下一个RSS源到期的秒数，最长 ADAPTIVE_POLL_SECONDS 以便及时加载配置变更"""
+        delay = self.scheduler.seconds_until_due()
+        return ADAPTIVE_POLL_SECONDS if delay is None else min(delay, ADAPTIVE_POLL_SECONDS)
+
+    def close(self):
+        """停止后台线程并释放连接"""
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.feed_processor.close()
+        self.delivery.stop()
+        if self.host_health is not None:
+            self.host_health.save()
+        self.transport.close()
+        self.database.close()
 
 def main():
-    """主函数"""
-    config = Config()
-    schedule_times = config.get('schedule_times', ['09:00', '12:00', '18:00'])
-    
-    # 设置定时任务
-    for time_str in schedule_times:
-        schedule.every().day.at(time_str).do(process_feeds)
-    
-    logger.info(f"已设置定时任务: {schedule_times}")
-    
-    # 运行定时任务
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    """主函数：加载配置并启动监控，配置文件路径可由第一个命令行参数指定"""
+    config_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('config', 'config.yaml')
+    RSSMonitor(config_path).run()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,307 @@
+import logging
+import mimetypes
+import os
+import re
+import time
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from .utils import detect_encoding
+
+logger = logging.getLogger(__name__)
+
+# 内容不计入正文的元素
+SKIP_TAGS = {
+    'script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object', 'embed',
+    'form', 'button', 'select', 'textarea', 'nav', 'header', 'footer', 'aside', 'menu', 'head',
+}
+
+# 没有结束标签的元素
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+    'source', 'track', 'wbr',
+}
+
+# 开始或结束时切分文本块的元素
+BLOCK_TAGS = {
+    'address', 'article', 'blockquote', 'body', 'dd', 'details', 'div', 'dl', 'dt', 'figcaption',
+    'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'br', 'li', 'main', 'ol', 'p', 'pre',
+    'section', 'summary', 'table', 'td', 'th', 'tr', 'ul',
+}
+
+# 参与正文评分的容器元素
+CONTAINER_TAGS = {'article', 'body', 'div', 'main', 'section', 'td'}
+
+# class/id 中出现这些词的元素视为页面模板（导航、评论、分享、推荐等）
+_BOILERPLATE_RE = re.compile(
+    r'(?:^|[\s_-])(?:comments?|sidebar|footer|header|nav|navbar|menu|share|sharing|social|related|'
+    r'recommend(?:ed)?|advert\w*|ads?|promo|breadcrumbs?|subscribe|newsletter|cookies?|popup|modal|'
+    r'pagination|toolbar|widget)(?:$|[\s_-])',
+    re.I
+)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9._:-]+)', re.I)
+
+# 段落中的标点数量反映其是否为正文（中英文逗号、句号等）
+_PUNCTUATION_RE = re.compile(r'[，,。；;、！？!?]')
+
+# 评分时忽略的短文本块（字符数）
+MIN_BLOCK_CHARS = 25
+
+# 超过该比例的文字位于链接中的文本块视为导航或链接列表
+MAX_LINK_DENSITY = 0.5
+
+
+class ExtractedArticle:
+    def __init__(self, title: Optional[str], text_content: str):
+        """正文提取结果，与 markitdown 转换结果一样提供 title 和 text_content"""
+        self.title = title
+        self.text_content = text_content
+
+    def __str__(self):
+        return self.text_content
+
+
+class _ArticleParser(HTMLParser):
+    def __init__(self):
+        """
+        将HTML拆分为文本块，记录每个文本块所在的容器及其中链接文字的长度
+
+        导航、脚本、评论区等模板元素在解析时直接丢弃，不保留DOM树。
+        """
+        super().__init__(convert_charrefs=True)
+        self.title_parts: List[str] = []
+        self.meta_title: Optional[str] = None
+        # (类型, 文本, 链接文字长度, 所在容器的节点编号)
+        self.blocks: List[Tuple[str, str, int, Tuple[int, ...]]] = []
+
+        self._stack: List[Tuple[str, int]] = []
+        self._skip_depth: Optional[int] = None
+        self._next_node = 0
+        self._in_title = False
+        self._link_depth = 0
+        self._text: List[str] = []
+        self._link_chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title':
+            self._in_title = True
+            return
+        if tag == 'meta':
+            self._handle_meta(dict(attrs))
+            return
+        if self._skip_depth is not None:
+            if tag not in VOID_TAGS:
+                self._stack.append((tag, -1))
+            return
+
+        if tag in BLOCK_TAGS:
+            self._flush()
+            # <p>、<li> 在下一个块级元素开始时隐式结束
+            while self._stack and self._stack[-1][0] in ('p', 'li') and tag not in ('ul', 'ol', 'br'):
+                if tag != 'li' and self._stack[-1][0] == 'li':
+                    break
+                self._stack.pop()
+        if tag in VOID_TAGS:
+            return
+        if tag == 'a':
+            self._link_depth += 1
+
+        node = self._next_node
+        self._next_node += 1
+        self._stack.append((tag, node))
+        if tag in SKIP_TAGS or self._is_boilerplate(tag, attrs):
+            self._skip_depth = len(self._stack) - 1
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+            return
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                break
+        else:
+            return
+
+        if self._skip_depth is None and tag in BLOCK_TAGS:
+            self._flush()
+        for open_tag, node in self._stack[index:]:
+            # 跳过的元素中的链接未计数（节点编号为 -1）
+            if open_tag == 'a' and node >= 0:
+                self._link_depth = max(0, self._link_depth - 1)
+        del self._stack[index:]
+        if self._skip_depth is not None and len(self._stack) <= self._skip_depth:
+            self._skip_depth = None
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+            return
+        if self._skip_depth is not None:
+            return
+        if not any(tag == 'pre' for tag, _ in self._stack):
+            data = _WHITESPACE_RE.sub(' ', data)
+        self._text.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _handle_meta(self, attrs: Dict):
+        if attrs.get('property') == 'og:title' or attrs.get('name') == 'twitter:title':
+            self.meta_title = self.meta_title or (attrs.get('content') or '').strip() or None
+
+    @staticmethod
+    def _is_boilerplate(tag: str, attrs) -> bool:
+        if tag in ('html', 'body', 'article', 'main'):
+            return False
+        for name, value in attrs:
+            if name in ('class', 'id', 'role') and value and _BOILERPLATE_RE.search(value):
+                return True
+        return False
+
+    def _flush(self):
+        text = ''.join(self._text)
+        link_chars = self._link_chars
+        self._text = []
+        self._link_chars = 0
+
+        kind = 'p'
+        for tag, _ in reversed(self._stack):
+            if tag in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'pre', 'blockquote', 'td', 'th'):
+                kind = tag
+                break
+        text = text.strip('\n') if kind == 'pre' else text.strip()
+        if not text:
+            return
+        containers = tuple(node for tag, node in self._stack if tag in CONTAINER_TAGS)
+        self.blocks.append((kind, text, link_chars, containers))
+
+
+class ArticleExtractor:
+    def __init__(self, session: requests.Session, max_bytes: int = 5 * 1024 * 1024, timeout: float = 30,
+                 min_chars: int = 200):
+        """
+        普通HTML文章的轻量正文提取
+
+        限制下载的字节数和总耗时，按文本块的长度、标点与链接密度选出正文所在的容器，
+        输出紧凑的 Markdown 文本。非HTML资源或提取不到足够正文时由调用方交给 markitdown 转换。
+
+        Args:
+            session: 共享连接池的会话
+            max_bytes: 最多下载的字节数，超出的HTML只解析已下载的部分
+            timeout: 下载的总耗时上限（秒）
+            min_chars: 正文少于该字符数时视为提取失败
+        """
+        self.session = session
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.min_chars = min_chars
+
+    def download(self, url: str) -> Dict:
+        """
+        流式下载资源，超过字节数或总耗时上限时停止读取
+
+        Returns:
+            Dict: content 为已下载的字节，content_type 为 Content-Type 头，
+            html 表示是否为HTML，extension 为用于 markitdown 的扩展名，truncated 表示是否未下载完整
+
+        Raises:
+            requests.RequestException: 请求失败或返回错误状态码
+        """
+        deadline = time.monotonic() + self.timeout
+        response = self.session.get(url, stream=True)
+        try:
+            response.raise_for_status()
+            header = response.headers.get('Content-Type', '')
+            chunks = []
+            size = 0
+            truncated = False
+            for chunk in response.iter_content(chunk_size=65536):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > self.max_bytes or time.monotonic() > deadline:
+                    truncated = True
+                    break
+        finally:
+            response.close()
+
+        content = b''.join(chunks)[:self.max_bytes]
+        if truncated:
+            logger.warning(f"文章下载超过 {self.max_bytes} 字节或 {self.timeout} 秒，只保留已下载部分: {url}")
+
+        mime_type = header.split(';', 1)[0].strip().lower()
+        html = mime_type in ('text/html', 'application/xhtml+xml') or (
+            not mime_type and content.lstrip()[:100].lower().startswith((b'<!doctype html', b'<html'))
+        )
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        if html:
+            extension = '.html'
+        elif mime_type and not extension:
+            extension = mimetypes.guess_extension(mime_type) or ''
+        return {
+            'content': content,
+            'content_type': header,
+            'html': html,
+            'extension': extension,
+            'truncated': truncated,
+        }
+
+    def extract(self, content: bytes, content_type: Optional[str] = None) -> Optional[ExtractedArticle]:
+        """
+        从HTML中提取正文
+
+        Returns:
+            Optional[ExtractedArticle]: 正文不足 min_chars 个字符时返回 None
+        """
+        match = _META_CHARSET_RE.search(content[:4096])
+        encoding = detect_encoding(content, content_type=content_type,
+                                   preferred=match.group(1).decode('ascii') if match else None)
+        parser = _ArticleParser()
+        parser.feed(content.decode(encoding, errors='replace'))
+        parser.close()
+
+        blocks = self._select_blocks(parser)
+        text = '\n\n'.join(self._format_block(kind, text) for kind, text in blocks)
+        if len(text) < self.min_chars:
+            return None
+
+        title = _WHITESPACE_RE.sub(' ', ''.join(parser.title_parts)).strip() or parser.meta_title
+        return ExtractedArticle(title, f"# {title}\n\n{text}" if title else text)
+
+    @staticmethod
+    def _select_blocks(parser: _ArticleParser) -> List[Tuple[str, str]]:
+        """给文本块所在的容器及其上一层容器打分，保留得分最高的容器中的文本块"""
+        scores: Dict[int, float] = {}
+        for kind, text, link_chars, containers in parser.blocks:
+            if kind[0] == 'h' or len(text) < MIN_BLOCK_CHARS or link_chars > len(text) * MAX_LINK_DENSITY:
+                continue
+            score = 1 + len(_PUNCTUATION_RE.findall(text)) + min(len(text) / 100, 3)
+            for weight, node in zip((1, 0.5), reversed(containers)):
+                scores[node] = scores.get(node, 0) + score * weight
+        if not scores:
+            return []
+
+        best = max(scores, key=scores.get)
+        return [
+            (kind, text) for kind, text, link_chars, containers in parser.blocks
+            if best in containers and link_chars <= len(text) * MAX_LINK_DENSITY
+        ]
+
+    @staticmethod
+    def _format_block(kind: str, text: str) -> str:
+        if kind[0] == 'h' and kind[1:].isdigit():
+            return f"{'#' * int(kind[1:])} {text}"
+        if kind == 'li':
+            return f"- {text}"
+        if kind == 'pre':
+            return f"```\n{text}\n```"
+        if kind == 'blockquote':
+            return f"> {text}"
+        return text
@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from .checkpoint import ANALYZED
+from .host_health import CircuitOpenError, HostHealth, host_of
+from .metrics import metrics
+from .pipeline import PipelineJob
+from .proxy import ProxyManager
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTransport:
+    # 可重试的网络错误
+    transient_errors = (httpx.TransportError,)
+
+    def __init__(self, http_config: Optional[Dict] = None, proxy_manager: Optional[ProxyManager] = None,
+                 host_health: Optional[HostHealth] = None):
+        """
+        异步引擎使用的HTTP传输层，代理按请求地址由 ProxyManager 决定
+
+        Args:
+            http_config: 与同步传输层相同的 http 配置，另支持 max_connections
+            proxy_manager: 代理管理器
+            host_health: 按主机熔断，与同步传输层共用
+        """
+        http_config = http_config or {}
+        self.proxy_manager = proxy_manager or ProxyManager()
+        self.host_health = host_health
+        proxy_config = self.proxy_manager.proxy_config
+
+        options = dict(
+            limits=httpx.Limits(
+                max_connections=int(http_config.get('max_connections', 200)),
+                max_keepalive_connections=int(http_config.get('pool_hosts', 100))
+            ),
+            timeout=httpx.Timeout(
+                float(http_config.get('read_timeout', 30)),
+                connect=float(http_config.get('connect_timeout', 10))
+            ),
+            headers={'User-Agent': http_config.get('user_agent', 'crss/1.0 (+RSS monitor)')},
+            follow_redirects=True,
+            # 配置了代理时完全由 ProxyManager 决定，不读取环境变量中的代理
+            trust_env=not proxy_config,
+        )
+        self.direct = httpx.AsyncClient(**options)
+        proxy = proxy_config.get('https') or proxy_config.get('http')
+        self.proxied = httpx.AsyncClient(proxy=proxy, **options) if proxy else self.direct
+
+    async def request(self, method: str, url: str, data=None, **kwargs) -> httpx.Response:
+        if isinstance(data, bytes):
+            kwargs['content'] = data
+        elif data is not None:
+            kwargs['data'] = data
+        client = self.proxied if self.proxy_manager.should_use_proxy(url) else self.direct
+        if self.host_health is None:
+            return await client.request(method, url, **kwargs)
+
+        host = host_of(url)
+        self.host_health.before_request(host)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except asyncio.CancelledError:
+            # 取消的请求不计入失败，但需要结束半开状态的探测
+            self.host_health.release(host)
+            raise
+        except Exception:
+            self.host_health.record(host, time.perf_counter() - start, False)
+            raise
+        self.host_health.record(host, time.perf_counter() - start, response.status_code < 500)
+        return response
+
+    async def aclose(self):
+        await self.direct.aclose()
+        if self.proxied is not self.direct:
+            await self.proxied.aclose()
+
+
+class AsyncScanEngine:
+    def __init__(self, monitor):
+        """
+        基于 asyncio 的扫描引擎，在一个事件循环中完成定时调度、RSS源下载、LLM分析与推送
+
+        RSS解析、markitdown转换与数据库操作在线程池中执行，不阻塞事件循环。
+
+        Args:
+            monitor: RSSMonitor 实例，复用其数据库、处理器与扫描记录逻辑
+        """
+        self.monitor = monitor
+        self.feed_processor = monitor.feed_processor
+        self.content_processor = monitor.content_processor
+        self.delivery = monitor.delivery
+
+        engine_config = monitor.config.async_engine
+        self.feed_concurrency = max(1, int(engine_config.get('feed_concurrency', 100)))
+        self.per_host = max(1, int(engine_config.get('per_host', monitor.config.per_host_workers)))
+        self.convert_workers = max(1, int(engine_config.get('convert_workers', 8)))
+        self.executor_workers = max(1, int(engine_config.get('executor_workers', 16)))
+        self.transport: Optional[AsyncTransport] = None
+
+    def run_forever(self):
+        asyncio.run(self.run())
+
+    async def run(self):
+        """立即扫描一次，之后按 schedule_times 定时扫描，推送协程持续运行"""
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.executor_workers,
+                                                     thread_name_prefix='async-worker'))
+        self.transport = AsyncTransport(self.monitor.config.http, self.monitor.transport.proxy_manager,
+                                        self.monitor.host_health)
+        delivery_tasks = [asyncio.create_task(self._delivery_loop()) for _ in range(self.delivery.workers)]
+
+        try:
+            if self.monitor.scheduler is not None:
+                await self._run_adaptive()
+                return
+            await self._safe_scan()
+            while True:
+                delay = self._seconds_until_next_run()
+                if delay is None:
+                    # 未配置定时扫描时只继续推送
+                    await asyncio.gather(*delivery_tasks)
+                    return
+                await asyncio.sleep(delay)
+                await self._safe_scan()
+        finally:
+            for task in delivery_tasks:
+                task.cancel()
+            await asyncio.gather(*delivery_tasks, return_exceptions=True)
+            await self.transport.aclose()
+
+    async def _run_adaptive(self):
+        """按调度器安排的时间扫描到期的RSS源"""
+        while True:
+            try:
+                feeds = await asyncio.to_thread(self.monitor.due_feeds)
+                if feeds:
+                    await self._safe_scan(feeds)
+            except Exception as e:
+                logger.error(f"自适应轮询发生错误: {str(e)}")
+            await asyncio.sleep(self.monitor.next_poll_delay())
+
+    def _seconds_until_next_run(self) -> Optional[float]:
+        """计算距离下一个 schedule_times 时间点的秒数"""
+        now = datetime.now(self.monitor.timezone)
+        runs = []
+        for time_str in self.monitor.schedule_times:
+            hour, minute = (int(part) for part in time_str.split(':')[:2])
+            run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if run <= now:
+                run += timedelta(days=1)
+            runs.append(run)
+        if not runs:
+            return None
+        return (min(runs) - now).total_seconds()
+
+    async def _safe_scan(self, feeds: Optional[List[Dict]] = None):
+        try:
+            await self.scan(feeds)
+        except Exception as e:
+            logger.error(f"异步扫描发生错误: {str(e)}")
+
+    async def scan(self, feeds: Optional[List[Dict]] = None):
+        """
+        执行一次扫描
+
+        Args:
+            feeds: 需要扫描的RSS源，默认为配置中的全部RSS源
+        """
+        feeds, scan_id = await asyncio.to_thread(self.monitor.begin_scan, feeds)
+        logger.info(f"异步扫描 - RSS源并发: {self.feed_concurrency}, 单主机并发: {self.per_host}")
+
+        feed_semaphore = asyncio.Semaphore(self.feed_concurrency)
+        self._convert_semaphore = asyncio.Semaphore(self.convert_workers)
+        host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        async def run(feed: Dict) -> Dict:
+            host = (urlparse(feed.get('url', '')).hostname or '').lower()
+            host_semaphore = host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host))
+            async with feed_semaphore, host_semaphore:
+                return await self._scan_feed(feed, scan_id)
+
+        results = await asyncio.gather(*[run(feed) for feed in feeds])
+        await asyncio.to_thread(self.monitor.finish_scan, scan_id, list(results), feeds)
+
+    async def _scan_feed(self, feed: Dict, scan_id: int) -> Dict:
+        """处理单个RSS源，返回包含成功数、错误数和错误信息的字典"""
+        try:
+            logger.info(f"处理RSS源: {feed['name']}")
+            return await self._process_feed(feed['name'], feed['url'], scan_id)
+        except Exception as e:
+            error_msg = f"处理RSS源 {feed['name']} 时发生错误: {str(e)}"
+            logger.error(error_msg)
+            return {'success': 0, 'error': 1, 'error_msg': error_msg}
+
+    async def _process_feed(self, feed_name: str, feed_url: str, scan_history_id: int) -> Dict:
+        """FeedProcessor.process_feed 的异步版本"""
+        result = {"success": 0, "error": 0, "bytes_saved": 0, "status": "failed"}
+        processor = self.feed_processor
+
+        try:
+            state, headers = await asyncio.to_thread(processor.prepare_fetch, feed_url)
+            try:
+                with metrics.timer('fetch', feed_name):
+                    response = await self.transport.request('GET', feed_url, headers=headers)
+                    if response.status_code != 304:
+                        response.raise_for_status()
+            except (httpx.HTTPError, CircuitOpenError) as e:
+                logger.error(f"RSS下载失败: {str(e)}")
+                logger.error(f"无法下载RSS源 {feed_name}")
+                return result
+
+            fetched = processor.build_fetch_result(state, response.status_code, response.content, response.headers)
+            if fetched['unchanged']:
+                logger.info(f"RSS源未更新，跳过解析 {feed_name}")
+                result["bytes_saved"] = fetched['bytes_saved']
+                result["status"] = "unchanged"
+                return result
+
+            jobs = await asyncio.to_thread(
+                processor.collect_new_jobs, feed_name, feed_url, fetched, scan_history_id, result
+            )
+            if jobs is None:
+                return result
+            result["status"] = "updated" if jobs else "unchanged"
+            metrics.increment('entries_new', len(jobs), feed=feed_name)
+
+            await asyncio.gather(*[self._process_job(job) for job in jobs])
+            await asyncio.to_thread(processor.complete_feed, feed_name, feed_url, fetched, jobs, result)
+
+        except Exception as e:
+            logger.error(f"处理RSS源错误 {feed_name}: {str(e)}")
+        finally:
+            # 每个RSS源的处理结果在一个事务中提交
+            await asyncio.to_thread(self.monitor.database.flush)
+            metrics.increment(f"feeds_{result['status']}", feed=feed_name)
+
+        return result
+
+    async def _process_job(self, job: PipelineJob):
+        """转换与指纹（线程池）-> LLM分析（异步）-> 写入发件箱（线程池）"""
+        try:
+            async with self._convert_semaphore:
+                await asyncio.to_thread(self.feed_processor.convert_job, job)
+            await asyncio.to_thread(self.feed_processor.fingerprint_job, job)
+            if self.feed_processor.near_duplicates is not None:
+                await asyncio.to_thread(self.feed_processor.resolve_duplicate, job)
+            if self.feed_processor.needs_analysis(job):
+                with metrics.timer('analyze', job.feed_name):
+                    job.content = await self.content_processor.aanalyze(job.content, self.transport)
+                await asyncio.to_thread(self.feed_processor.checkpoint, job, ANALYZED)
+            await asyncio.to_thread(self.feed_processor.enqueue_job, job)
+        except Exception as e:
+            job.error = str(e)
+            self.feed_processor.release_fingerprint(job)
+
+    async def _delivery_loop(self):
+        """持续推送发件箱中的条目"""
+        while True:
+            try:
+                delivered = await self.delivery.adeliver_once(self.transport)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"推送协程发生错误: {str(e)}")
+                delivered = 0
+            if not delivered:
+                await asyncio.sleep(self.delivery.poll_interval)
@@ -0,0 +1,98 @@
+import json
+import logging
+from typing import Dict, List, Optional
+
+import feedparser
+
+from .database import Database
+from .pipeline import PipelineJob
+
+logger = logging.getLogger(__name__)
+
+# 条目的处理阶段，按完成顺序排列；转换结果不保存，中断后重新转换
+PENDING = 'pending'
+ANALYZED = 'analyzed'
+QUEUED = 'queued'
+
+# 恢复后判断内容类型与转换所需的RSS条目字段（附件由 feedparser 从 links 中生成）
+ENTRY_FIELDS = ('id', 'link', 'links', 'title', 'media_content', 'itunes_duration')
+
+
+def dump_content(content: Dict) -> str:
+    """序列化分析结果；入队只需要分析结果，正文不保存"""
+    return json.dumps({'analysis': (content or {}).get('analysis')}, ensure_ascii=False, default=str)
+
+
+def load_content(text: Optional[str]) -> Dict:
+    data = json.loads(text) if text else {}
+    return {'analysis': data['analysis']} if data.get('analysis') is not None else {}
+
+
+class ScanCheckpoints:
+    def __init__(self, database: Database):
+        """
+        将扫描中每个条目的处理阶段与中间结果保存到数据库
+
+        进程中断后再次处理同一条目时从最后完成的阶段继续，已完成的LLM分析不再重复执行；
+        扫描正常结束时删除该扫描的记录。分析结果立即写入，入队阶段经由数据库写缓冲批量写入。
+        """
+        self.database = database
+
+    def register(self, jobs: List[PipelineJob]):
+        """保存新条目的工作列表；已有记录的条目恢复其处理阶段与中间结果，并归入本次扫描"""
+        if not jobs:
+            return
+        saved = self.database.get_scan_jobs(job.link_hash for job in jobs)
+        for job in jobs:
+            row = saved.get(job.link_hash)
+            if row is None:
+                continue
+            job.stage = row['stage']
+            job.content = load_content(row['content'])
+            logger.info(f"从检查点恢复条目 {job.link}，已完成阶段: {job.stage}")
+
+        self.database.save_scan_jobs([
+            {
+                'link_hash': job.link_hash,
+                'scan_history_id': job.scan_history_id,
+                'feed_name': job.feed_name,
+                'link': job.link,
+                'title': job.title,
+                'entry': json.dumps({k: job.entry.get(k) for k in ENTRY_FIELDS if k in job.entry},
+                                    ensure_ascii=False, default=str),
+                'stage': job.stage,
+            }
+            for job in jobs
+        ])
+
+    def save(self, job: PipelineJob, stage: str):
+        """
+        记录条目完成的阶段，分析阶段同时保存分析结果
+
+        入队后推送由发件箱负责；入队阶段保留分析结果，已处理项目未写入时可以重新入队。
+        """
+        job.stage = stage
+        content = dump_content(job.content) if stage == ANALYZED else None
+        self.database.update_scan_job(job.link_hash, stage, content)
+
+    def load(self, scan_id: int) -> List[PipelineJob]:
+        """读取中断的扫描尚未完成的条目"""
+        return [
+            PipelineJob(
+                feed_name=row['feed_name'],
+                link=row['link'],
+                title=row['title'],
+                link_hash=row['link_hash'],
+                entry=feedparser.FeedParserDict(json.loads(row['entry'] or '{}')),
+                scan_history_id=scan_id,
+                content=load_content(row['content']),
+                stage=row['stage'],
+                status=None,
+                fingerprint=None,
+                duplicate_of=None
+            )
+            for row in self.database.get_scan_jobs_for_scan(scan_id)
+        ]
+
+    def finish(self, scan_id: int):
+        self.database.delete_scan_jobs(scan_id)
@@ -1,6 +1,6 @@
 import yaml
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class Config:
     def __init__(self, config_path: str):
@@ -44,7 +44,13 @@ class Config:
             'api_url': '',
             'model': '',
             'temperature': 0.1,
-            'max_tokens': 8000
+            'max_tokens': 8000,
+            'context_window': 32000,
+            'max_concurrency': 4,
+            'requests_per_minute': 0,
+            'tokens_per_minute': 0,
+            'timeout': 120,
+            'max_retries': 3
         })
 
     @property
@@ -55,4 +61,226 @@ class Config:
     @property
     def schedule_times(self) -> List[str]:
         """获取定时任务时间列表"""
-        return self.config_data.get('schedule_times', [])
\ No newline at end of file
+        return self.config_data.get('schedule_times', [])
+
+    @property
+    def scan_workers(self) -> int:
+        """获取并发扫描的最大线程数（1 表示顺序扫描）"""
+        return max(1, int(self.config_data.get('scan_workers', 1)))
+
+    @property
+    def per_host_workers(self) -> int:
+        """获取同一主机允许的最大并发扫描数"""
+        return max(1, int(self.config_data.get('per_host_workers', 2)))
+
+    @property
+    def seen_filter(self) -> Optional[Dict]:
+        """获取已处理链接内存过滤器配置，设置为 false 时禁用"""
+        value = self.config_data.get('seen_filter', {})
+        if value is False:
+            return None
+        return {
+            'mode': 'bloom',
+            'false_positive_rate': 0.001,
+            **(value or {})
+        }
+
+    @property
+    def db_write_buffer(self) -> Dict:
+        """获取已处理项目与扫描检查点的批量写入配置"""
+        return {
+            'batch_size': 100,
+            'flush_interval_ms': 1000,
+            **self.config_data.get('db_write_buffer', {})
+        }
+
+    @property
+    def llm_cache(self) -> Optional[Dict]:
+        """获取LLM分析结果缓存配置，设置为 false 时禁用"""
+        value = self.config_data.get('llm_cache', {})
+        if value is False:
+            return None
+        return {
+            'max_entries': 50000,
+            'max_age_days': 30,
+            **(value or {})
+        }
+
+    @property
+    def content_probe(self) -> Optional[Dict]:
+        """获取下载转换前的资源类型探测配置，设置为 false 时禁用"""
+        value = self.config_data.get('content_probe', {})
+        if value is False:
+            return None
+        return {
+            'timeout': 5,
+            'max_bytes': 20 * 1024 * 1024,
+            'cache_size': 10000,
+            'trust_after': 5,
+            **(value or {})
+        }
+
+    @property
+    def article_extractor(self) -> Optional[Dict]:
+        """获取HTML正文提取配置，设置为 false 时所有文章均由 markitdown 转换"""
+        value = self.config_data.get('article_extractor', {})
+        if value is False:
+            return None
+        return {
+            'max_bytes': 5 * 1024 * 1024,
+            'timeout': 30,
+            'min_chars': 200,
+            **(value or {})
+        }
+
+    @property
+    def daily_summary(self) -> Optional[Dict]:
+        """获取每日摘要配置，未启用时返回 None"""
+        value = self.config_data.get('daily_summary') or {}
+        if not value.get('enabled', False):
+            return None
+        return {
+            'time': '21:00',
+            'digest_tokens': 1500,
+            'max_tokens': 2000,
+            **value
+        }
+
+    @property
+    def scan_checkpoints(self) -> bool:
+        """是否保存扫描中各条目的处理阶段，进程中断后重启时继续"""
+        return bool(self.config_data.get('scan_checkpoints', True))
+
+    @property
+    def circuit_breaker(self) -> Optional[Dict]:
+        """获取按主机熔断的配置，设置为 false 时禁用"""
+        value = self.config_data.get('circuit_breaker', {})
+        if value is False:
+            return None
+        return {
+            'failure_threshold': 5,
+            'error_rate': 0.5,
+            'min_requests': 10,
+            'window': 20,
+            'slow_seconds': 0,
+            'cooldown': 300,
+            'max_cooldown': 3600,
+            **(value or {})
+        }
+
+    @property
+    def db_maintenance(self) -> Optional[Dict]:
+        """获取数据库保留期与维护配置，设置为 false 时禁用"""
+        value = self.config_data.get('db_maintenance', {})
+        if value is False:
+            return None
+        return {
+            'retention_days': 90,
+            'interval_hours': 24,
+            'vacuum': True,
+            **(value or {})
+        }
+
+    @property
+    def pipeline(self) -> Dict:
+        """获取条目处理流水线配置，analyze_workers 默认与 llm.max_concurrency 一致"""
+        return self.config_data.get('pipeline', {})
+
+    @property
+    def delivery(self) -> Dict:
+        """获取推送发件箱配置"""
+        return self.config_data.get('delivery', {})
+
+    @property
+    def proxy(self) -> Optional[Dict]:
+        """获取代理配置 (http, https, no_proxy)，未配置时返回 None"""
+        return self.config_data.get('proxy')
+
+    @property
+    def http(self) -> Dict:
+        """获取共享HTTP传输层的连接池与超时配置"""
+        return self.config_data.get('http', {})
+
+    @property
+    def early_exit(self) -> Optional[Dict]:
+        """获取遇到已知条目时提前结束的配置，设置为 false 时每次检查全部条目"""
+        value = self.config_data.get('early_exit', {})
+        if value is False:
+            return None
+        return {
+            'consecutive_hits': 3,
+            'window': 10,
+            **(value or {})
+        }
+
+    @property
+    def streaming_parse(self) -> Optional[Dict]:
+        """获取大型RSS源的流式解析配置，设置为 false 时总是完整下载后解析"""
+        value = self.config_data.get('streaming_parse', {})
+        if value is False:
+            return None
+        return {
+            'threshold_bytes': 1024 * 1024,
+            'max_bytes': 50 * 1024 * 1024,
+            'max_entries': 5000,
+            'max_entry_bytes': 65536,
+            **(value or {})
+        }
+
+    @property
+    def near_duplicate(self) -> Optional[Dict]:
+        """获取近似重复内容检测配置，未启用时返回 None"""
+        value = self.config_data.get('near_duplicate') or {}
+        if not value.get('enabled', False):
+            return None
+        return {
+            'max_distance': 3,
+            'action': 'skip',
+            'max_age_days': 30,
+            'min_tokens': 50,
+            **value
+        }
+
+    @property
+    def adaptive_schedule(self) -> Optional[Dict]:
+        """获取自适应轮询配置，未启用时返回 None 并使用 schedule_times 定时扫描"""
+        value = self.config_data.get('adaptive_schedule') or {}
+        if not value.get('enabled', False):
+            return None
+        return {
+            'min_interval_minutes': 15,
+            'max_interval_minutes': 1440,
+            'default_interval_minutes': 60,
+            'publish_factor': 0.5,
+            'unchanged_backoff': 1.5,
+            'failure_backoff': 2.0,
+            **value
+        }
+
+    @property
+    def metrics(self) -> Optional[Dict]:
+        """获取 Prometheus 指标端点配置，未启用时返回 None"""
+        value = self.config_data.get('metrics') or {}
+        if not value.get('enabled', False):
+            return None
+        return {
+            'host': '127.0.0.1',
+            'port': 9108,
+            **value
+        }
+
+    @property
+    def engine(self) -> str:
+        """获取运行引擎：schedule（线程与定时任务）或 asyncio"""
+        return self.config_data.get('engine', 'schedule')
+
+    @property
+    def async_engine(self) -> Dict:
+        """获取 asyncio 引擎的并发配置"""
+        return {
+            'feed_concurrency': 100,
+            'per_host': self.per_host_workers,
+            'convert_workers': 8,
+            'executor_workers': 16,
+            **self.config_data.get('async_engine', {})
+        }
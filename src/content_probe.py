@@ -0,0 +1,146 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 可由 markitdown 转换为文本的资源类型（前缀匹配）
+CONVERTIBLE_TYPES = (
+    'text/',
+    'application/xhtml',
+    'application/xml',
+    'application/json',
+    'application/pdf',
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument',
+    'application/vnd.ms-excel',
+    'application/vnd.ms-powerpoint',
+)
+
+# 无需请求即可按扩展名判断的资源类型
+EXTENSION_TYPES = {
+    **dict.fromkeys(('.mp3', '.m4a', '.aac', '.ogg', '.oga', '.opus', '.wav', '.flac'), 'audio/*'),
+    **dict.fromkeys(('.mp4', '.m4v', '.mov', '.webm', '.mkv', '.avi'), 'video/*'),
+    **dict.fromkeys(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg'), 'image/*'),
+    **dict.fromkeys(('.zip', '.gz', '.tgz', '.rar', '.7z', '.dmg', '.exe', '.apk', '.iso'),
+                    'application/octet-stream'),
+}
+
+
+class ContentProbe:
+    def __init__(self, session: requests.Session, timeout: float = 5, max_bytes: int = 20 * 1024 * 1024,
+                 cache_size: int = 10000, trust_after: int = 5):
+        """
+        在下载转换之前探测链接指向的资源类型与大小
+
+        优先使用 HEAD 请求，服务器不支持时改用只读取 1 字节的 Range 请求。结果按URL缓存；
+        同一域名连续 trust_after 次探测到可转换的网页后，该域名的链接不再探测。
+
+        Args:
+            session: 共享连接池的会话
+            timeout: 探测请求超时（秒）
+            max_bytes: 超过该大小的资源不下载转换
+            cache_size: 按URL缓存的探测结果数
+            trust_after: 域名连续返回可转换网页多少次后不再探测
+        """
+        self.session = session
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache_size = cache_size
+        self.trust_after = trust_after
+
+        self._lock = threading.Lock()
+        self._cache: OrderedDict = OrderedDict()
+        self._domains: Dict[str, int] = {}
+        self.requests = 0
+        self.cache_hits = 0
+
+    def probe(self, url: str) -> Dict:
+        """
+        Returns:
+            Dict: mime_type 为小写的 MIME 类型（未知时为空字符串），
+            content_length 为资源大小（未知时为 None），convertible 表示是否值得下载转换
+        """
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        if extension in EXTENSION_TYPES:
+            return self._result(EXTENSION_TYPES[extension], None)
+
+        domain = urlparse(url).netloc.lower()
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached is not None:
+                self._cache.move_to_end(url)
+                self.cache_hits += 1
+                return cached
+            if self._domains.get(domain, 0) >= self.trust_after:
+                self.cache_hits += 1
+                return self._result('', None)
+
+        with metrics.timer('probe'):
+            result = self._request(url)
+
+        with self._lock:
+            self.requests += 1
+            self._cache[url] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            # 只有明确返回网页的探测才计入，失败的探测不影响域名的判断
+            if result['mime_type'].startswith(('text/html', 'application/xhtml')):
+                self._domains[domain] = self._domains.get(domain, 0) + 1
+            elif result['mime_type']:
+                self._domains[domain] = 0
+        return result
+
+    def _request(self, url: str) -> Dict:
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+            response.close()
+            if response.status_code < 400:
+                return self._from_response(response, response.headers.get('Content-Length'))
+        except requests.RequestException as e:
+            logger.info(f"HEAD 请求失败，改用 Range 请求: {url}, {str(e)}")
+
+        try:
+            response = self.session.get(url, headers={'Range': 'bytes=0-0'}, stream=True,
+                                        allow_redirects=True, timeout=self.timeout)
+            response.close()
+            if response.status_code >= 400:
+                return self._result('', None)
+            # 206 响应的总大小在 Content-Range 中（bytes 0-0/12345）
+            length = response.headers.get('Content-Range', '').rpartition('/')[2]
+            if response.status_code != 206 or not length.isdigit():
+                length = response.headers.get('Content-Length')
+            return self._from_response(response, length)
+        except requests.RequestException as e:
+            logger.warning(f"探测资源类型失败: {url}, {str(e)}")
+            return self._result('', None)
+
+    def _from_response(self, response: requests.Response, length: Optional[str]) -> Dict:
+        mime_type = response.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        try:
+            content_length = int(length) if length else None
+        except ValueError:
+            content_length = None
+        return self._result(mime_type, content_length)
+
+    def _result(self, mime_type: str, content_length: Optional[int]) -> Dict:
+        # 类型未知时按网页处理，与未探测时的行为一致
+        convertible = (not mime_type or mime_type.startswith(CONVERTIBLE_TYPES)) and (
+            content_length is None or content_length <= self.max_bytes
+        )
+        return {'mime_type': mime_type, 'content_length': content_length, 'convertible': convertible}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'cache_hits': self.cache_hits,
+                'trusted_domains': sum(1 for count in self._domains.values() if count >= self.trust_after),
+            }
@@ -1,14 +1,39 @@
+import asyncio
+import io
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from urllib.parse import urlparse
 
 import markitdown
-import requests
+
+from .article_extractor import ArticleExtractor
+from .content_probe import ContentProbe
+from .host_health import CircuitOpenError
+from .llm_cache import LLMCache
+from .llm_client import LLMClient
+from .metrics import metrics
+from .transport import Transport
+from .text_budget import clean_markdown, split_into_chunks, truncate_to_tokens
+from .utils import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "你是一个专业的文章分析助手，请简洁直接地回答问题。"
+
+SUMMARY_PROMPT = ("作为一名资深编辑，阅读以下文章内容并输出\n"
+                  "1. 一句话核心摘要\n"
+                  "2. 文章结构（列出 3～5个小标题或段落主题）\n"
+                  "3. 建议：是否值得阅读全文？请简要说明理由（20字以内）")
+
+CHUNK_PROMPT = "以下是一篇长文章的其中一部分，请概括这一部分的要点，保留关键事实和数据，不超过300字："
+
+# 估算token存在误差，为提示词预留的余量
+PROMPT_MARGIN_TOKENS = 200
+
 class ContentType(Enum):
     ARTICLE = "article"
     YOUTUBE = "youtube"
@@ -16,13 +41,27 @@ class ContentType(Enum):
     OTHER = "other"
 
 class ContentProcessor:
-    def __init__(self, llm_config: Dict):
+    def __init__(self, llm_config: Dict, cache: Optional[LLMCache] = None, transport: Optional[Transport] = None,
+                 probe: Optional[ContentProbe] = None, extractor: Optional[ArticleExtractor] = None):
+        """
+        Args:
+            probe: 资源类型探测，为空时除RSS条目信息外均按文章下载转换
+            extractor: HTML正文提取，为空时所有文章均由 markitdown 下载转换
+        """
         self.llm_config = llm_config
-        self.md = markitdown.MarkItDown()
-        self.headers = {
-            "Authorization": f"Bearer {llm_config['api_key']}",
-            "Content-Type": "application/json"
-        }
+        self.cache = cache
+        self.probe = probe
+        self.extractor = extractor
+        self.transport = transport or Transport()
+        # markitdown 下载文章时同样使用共享连接池
+        self.md = markitdown.MarkItDown(requests_session=self.transport.session)
+        self.llm_client = LLMClient(llm_config, transport=self.transport)
+        # 长文分块摘要使用的线程池，实际并发由 LLMClient 限制
+        self.chunk_executor = ThreadPoolExecutor(
+            max_workers=self.llm_client.max_concurrency,
+            thread_name_prefix='chunk'
+        )
+        self._usage_lock = threading.Lock()
 
     def detect_content_type(self, url: str, entry: Dict) -> ContentType:
         """检测内容类型"""
@@ -42,12 +81,26 @@ class ContentProcessor:
             for media in entry.media_content:
                 if 'audio' in media.get('type', ''):
                     return ContentType.PODCAST
+
+        # 链接本身是音视频、图片、压缩包或超大文件时不下载转换
+        if self.probe is not None:
+            probed = self.probe.probe(url)
+            if probed['mime_type'].startswith('audio/'):
+                return ContentType.PODCAST
+            if not probed['convertible']:
+                logger.info(f"跳过下载转换: {url}, 类型 {probed['mime_type'] or '未知'}, "
+                            f"大小 {probed['content_length']}")
+                return ContentType.OTHER
         
         # 默认作为文章处理
         return ContentType.ARTICLE
 
     def process_content(self, url: str, entry: Dict, content_type: ContentType) -> Dict:
-        """根据内容类型进行处理"""
+        """根据内容类型进行处理（转换后立即分析）"""
+        return self.analyze(self.convert(url, entry, content_type))
+
+    def convert(self, url: str, entry: Dict, content_type: ContentType) -> Dict:
+        """根据内容类型下载并转换内容，不调用LLM"""
         try:
             if content_type == ContentType.ARTICLE:
                 return self._process_article(url)
@@ -61,15 +114,29 @@ class ContentProcessor:
             logger.error(f"内容处理失败: {str(e)}")
             return {}
 
+    def analyze(self, result: Dict) -> Dict:
+        """
+        对转换成功的文章调用LLM分析，结果写入 result['analysis']
+
+        Raises:
+            CircuitOpenError: LLM主机处于熔断状态，分析未执行
+        """
+        if result.get('type') == 'article' and result.get('markdown_content'):
+            result['analysis'] = self._analyze_with_llm(result['markdown_content'].text_content)
+        return result
+
     def _process_article(self, url: str) -> Dict:
-        """处理文章内容"""
+        """处理文章内容（仅转换，分析由 analyze 完成）"""
         try:
-            markdown_content = self.md.convert_url(url)
+            if self.extractor is None:
+                markdown_content = self.md.convert_url(url)
+            else:
+                markdown_content = self._extract_article(url)
             if markdown_content:
                 return {
                     'type': 'article',
                     'markdown_content': markdown_content,
-                    'analysis': self._analyze_with_llm(markdown_content.text_content)
+                    'analysis': None
                 }
             else:
                 # 转换失败但未抛异常时
@@ -92,6 +159,21 @@ class ContentProcessor:
                 'error': str(e)
             }
 
+    def _extract_article(self, url: str):
+        """普通网页使用轻量正文提取，PDF、Office 文档等或提取失败的网页交给 markitdown 转换已下载的内容"""
+        page = self.extractor.download(url)
+        if page['html']:
+            article = self.extractor.extract(page['content'], page['content_type'])
+            if article is not None:
+                metrics.increment('extract_fast')
+                return article
+            logger.info(f"正文提取失败，改用 markitdown 转换: {url}")
+        elif page['truncated']:
+            raise ValueError(f"资源超过 {self.extractor.max_bytes} 字节或下载超时，无法转换")
+
+        metrics.increment('extract_fallback')
+        return self.md.convert_stream(io.BytesIO(page['content']), file_extension=page['extension'], url=url)
+
     def _process_youtube(self, url: str, entry: Dict) -> Dict:
         """处理YouTube视频"""
         video_id = self._extract_youtube_id(url)
@@ -114,6 +196,15 @@ class ContentProcessor:
                 if 'audio' in enclosure.get('type', ''):
                     audio_url = enclosure.get('href', '')
                     break
+
+        if not audio_url and hasattr(entry, 'media_content'):
+            for media in entry.media_content:
+                if 'audio' in media.get('type', ''):
+                    audio_url = media.get('url', '')
+                    break
+
+        # 没有附件时链接本身即为音频
+        audio_url = audio_url or url
         
         # 尝试获取时长
         if hasattr(entry, 'itunes_duration'):
@@ -145,45 +236,211 @@ class ContentProcessor:
     def _analyze_with_llm(self, content: str) -> Dict:
         """使用LLM分析文章内容"""
         try:
-            # 获取摘要作为描述
-            summary_prompt = ("作为一名资深编辑，阅读以下文章内容并输出\n"
-                              "1. 一句话核心摘要\n"
-                              "2. 文章结构（列出 3～5个小标题或段落主题）\n"
-                              "3. 建议：是否值得阅读全文？请简要说明理由（20字以内）")
-            summary = self._get_llm_response(summary_prompt + "\n\n" + content)
+            content, cache_key, cached = self._prepare_analysis(content)
+            if cached is not None:
+                return cached
+
+            usage = {'input_tokens': 0, 'output_tokens': 0}
+            content, chunks, failed = self._fit_content(content, usage)
+            if chunks and failed == chunks:
+                logger.error(f"全部 {chunks} 个分块摘要失败，跳过合并摘要")
+                return {}
+            summary = self._get_llm_response(SUMMARY_PROMPT + "\n\n" + content, usage=usage)
 
             # 获取标签，要求返回数组格式
             # tags_prompt = "请为这篇文章提供3-5个标签，直接返回标签数组，用逗号分隔："
             # tags = self._get_llm_response(tags_prompt + "\n\n" + content)
 
-            return {
-                'summary': summary.strip(),
-            }
+            # 部分分块失败时摘要不完整，不写入缓存
+            return self._finish_analysis(None if failed else cache_key, summary, content, chunks, usage)
+        except CircuitOpenError:
+            # LLM主机熔断时条目处理失败，不记录为已处理，下次扫描或从检查点恢复时重试
+            raise
         except Exception as e:
             logger.error(f"LLM分析失败: {str(e)}")
             return {}
 
-    def _get_llm_response(self, prompt: str) -> str:
-        """调用LLM API获取响应"""
+    async def aanalyze(self, result: Dict, transport) -> Dict:
+        """analyze 的异步版本，LLM请求通过异步传输层发送"""
+        if result.get('type') == 'article' and result.get('markdown_content'):
+            result['analysis'] = await self._aanalyze_with_llm(result['markdown_content'].text_content, transport)
+        return result
+
+    async def _aanalyze_with_llm(self, content: str, transport) -> Dict:
+        """_analyze_with_llm 的异步版本"""
         try:
-            response = requests.post(
-                self.llm_config['api_url'],
-                headers=self.headers,
-                json={
-                    "model": self.llm_config['model'],
-                    "messages": [
-                        {"role": "system", "content": "你是一个专业的文章分析助手，请简洁直接地回答问题。"},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": self.llm_config['temperature'],
-                    "max_tokens": self.llm_config['max_tokens']
-                }
+            content, cache_key, cached = await asyncio.to_thread(self._prepare_analysis, content)
+            if cached is not None:
+                return cached
+
+            usage = {'input_tokens': 0, 'output_tokens': 0}
+            content, chunks, plan = self._plan_content(content)
+            failed = 0
+            if plan is not None:
+                chunk_summary_tokens, budget = plan
+                partials = await asyncio.gather(*[
+                    self._aget_llm_response(CHUNK_PROMPT + "\n\n" + chunk, transport,
+                                            max_tokens=chunk_summary_tokens, usage=usage)
+                    for chunk in content
+                ])
+                failed = self._count_failed(partials)
+                if failed == chunks:
+                    logger.error(f"全部 {chunks} 个分块摘要失败，跳过合并摘要")
+                    return {}
+                content = self._merge_partials(partials, budget)
+
+            summary = await self._aget_llm_response(SUMMARY_PROMPT + "\n\n" + content, transport, usage=usage)
+            return await asyncio.to_thread(self._finish_analysis, None if failed else cache_key,
+                                           summary, content, chunks, usage)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"LLM分析失败: {str(e)}")
+            return {}
+
+    def _prepare_analysis(self, content: str) -> Tuple[str, Optional[str], Optional[Dict]]:
+        """
+        清理正文并查询缓存
+
+        Returns:
+            Tuple: (清理后的正文, 缓存键, 命中的缓存结果)
+        """
+        content = clean_markdown(content)
+
+        # 相同内容（如转载、镜像）直接复用缓存的分析结果
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(
+                content, SUMMARY_PROMPT, self.llm_config['model'], self.llm_config.get('temperature')
             )
-            response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                # 命中缓存不消耗token
+                return content, cache_key, {**cached, 'input_tokens': 0, 'output_tokens': 0, 'cached': True}
+        return content, cache_key, None
+
+    def _finish_analysis(self, cache_key: Optional[str], summary: str, content: str, chunks: int,
+                         usage: Dict) -> Dict:
+        """组装分析结果并写入缓存"""
+        result = {
+            'summary': summary.strip(),
+            'content_tokens': estimate_tokens(content),
+            'chunks': chunks,
+            **usage
+        }
+        # 调用失败时返回空摘要，不写入缓存
+        if cache_key and result['summary']:
+            self.cache.put(cache_key, self.llm_config['model'], result)
+        return result
+
+    def _plan_content(self, content: str):
+        """
+        按上下文窗口预算规划正文的处理方式
+
+        略超预算的内容直接截断；远超预算的内容切分为多块，由调用方分别摘要后合并。
+
+        Returns:
+            Tuple: (正文或分块列表, 分块数, 分块时为 (每块摘要的最大输出, 合并后的预算) 否则为 None)
+        """
+        context_window = int(self.llm_config.get('context_window', 32000))
+        max_tokens = int(self.llm_config.get('max_tokens', 8000))
+        overhead = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(SUMMARY_PROMPT) + PROMPT_MARGIN_TOKENS
+        budget = max(1000, context_window - max_tokens - overhead)
+
+        tokens = estimate_tokens(content)
+        if tokens <= budget:
+            return content, 0, None
+        if tokens <= budget * float(self.llm_config.get('truncate_ratio', 1.5)):
+            logger.info(f"正文约 {tokens} tokens，截断至 {budget} tokens")
+            return truncate_to_tokens(content, budget), 0, None
+
+        chunk_summary_tokens = int(self.llm_config.get('chunk_summary_tokens', 1000))
+        chunk_budget = max(1000, context_window - chunk_summary_tokens - overhead)
+        chunks = split_into_chunks(content, chunk_budget)
+        max_chunks = int(self.llm_config.get('max_chunks', 8))
+        if len(chunks) > max_chunks:
+            logger.info(f"正文切分为 {len(chunks)} 块，仅处理前 {max_chunks} 块")
+            chunks = chunks[:max_chunks]
+        logger.info(f"正文约 {tokens} tokens，切分为 {len(chunks)} 块分别摘要")
+        return chunks, len(chunks), (chunk_summary_tokens, budget)
+
+    @staticmethod
+    def _count_failed(partials) -> int:
+        """统计调用失败（返回空摘要）的分块数"""
+        failed = sum(1 for partial in partials if not partial.strip())
+        if failed:
+            logger.warning(f"{len(partials)} 个分块中有 {failed} 个摘要失败，分析结果不写入缓存")
+        return failed
+
+    @staticmethod
+    def _merge_partials(partials, budget: int) -> str:
+        """合并各分块的摘要（reduce）"""
+        merged = "\n\n".join(
+            f"【第{i}部分】\n{partial.strip()}" for i, partial in enumerate(partials, 1) if partial.strip()
+        )
+        return truncate_to_tokens(merged, budget)
+
+    def _fit_content(self, content: str, usage: Dict) -> Tuple[str, int, int]:
+        """
+        按上下文窗口预算准备正文，需要分块时并行摘要各块（map）后合并
+
+        Returns:
+            Tuple[str, int, int]: 准备好的正文、切分的片段数（未切分为 0）和摘要失败的片段数
+        """
+        content, chunks, plan = self._plan_content(content)
+        if plan is None:
+            return content, chunks, 0
+
+        chunk_summary_tokens, budget = plan
+        partials = list(self.chunk_executor.map(
+            lambda chunk: self._get_llm_response(
+                CHUNK_PROMPT + "\n\n" + chunk, max_tokens=chunk_summary_tokens, usage=usage
+            ),
+            content
+        ))
+        return self._merge_partials(partials, budget), chunks, self._count_failed(partials)
+
+    def _get_llm_response(self, prompt: str, max_tokens: Optional[int] = None,
+                          usage: Optional[Dict] = None) -> str:
+        """调用LLM API获取响应，usage 不为空时累计估算的token数"""
+        try:
+            response = self.llm_client.chat(self._messages(prompt), max_tokens=max_tokens)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"LLM API调用失败: {str(e)}")
-            return ""
+            response = ""
+
+        self._count_usage(usage, prompt, response)
+        return response
+
+    async def _aget_llm_response(self, prompt: str, transport, max_tokens: Optional[int] = None,
+                                 usage: Optional[Dict] = None) -> str:
+        """_get_llm_response 的异步版本"""
+        try:
+            response = await self.llm_client.achat(self._messages(prompt), transport, max_tokens=max_tokens)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"LLM API调用失败: {str(e)}")
+            response = ""
+
+        self._count_usage(usage, prompt, response)
+        return response
+
+    @staticmethod
+    def _messages(prompt: str):
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _count_usage(self, usage: Optional[Dict], prompt: str, response: str):
+        if usage is None:
+            return
+        with self._usage_lock:
+            usage['input_tokens'] += estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt)
+            usage['output_tokens'] += estimate_tokens(response)
 
     def convert_to_markdown(self, url: str) -> Optional[str]:
         """将文章转换为Markdown格式"""
@@ -1,26 +1,131 @@
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta
 import json
 from contextlib import contextmanager
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional, Set, Tuple
 
 import logging
 
+from .metrics import metrics
+from .seen_filter import SeenFilter
+
 logger = logging.getLogger(__name__)
 
+# SQLite 单条语句允许的参数个数上限（旧版本为999）
+MAX_SQL_VARIABLES = 900
+
+INSERT_PROCESSED_ITEM_SQL = '''
+    INSERT INTO processed_items
+    (feed_name, item_link, item_title, link_hash, processed_time, scan_history_id, status, error_message,
+     input_tokens, output_tokens, summary)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# content 为空时保留已保存的结果
+UPDATE_SCAN_JOB_SQL = '''
+    UPDATE scan_jobs SET stage = ?, content = COALESCE(?, content), updated_at = ? WHERE link_hash = ?
+'''
+
+
 class Database:
-    def __init__(self, db_path):
+    def __init__(self, db_path, seen_filter_config: Optional[Dict] = None,
+                 write_buffer_config: Optional[Dict] = None):
+        """
+        Args:
+            db_path: 数据库文件路径
+            seen_filter_config: 已处理链接内存过滤器配置，为空时不启用
+            write_buffer_config: 已处理项目与扫描检查点的批量写入配置 (batch_size, flush_interval_ms)，
+                为空时逐条写入
+        """
         self.db_path = db_path
+        # 每个线程持有一个长连接，避免每次查询都重新建立连接；线程结束后连接在下次建立连接时关闭
+        self._local = threading.local()
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
         self.init_db()
 
+        # 已处理项目的写缓冲
+        write_buffer_config = write_buffer_config or {}
+        self.batch_size = max(1, int(write_buffer_config.get('batch_size', 1)))
+        self.flush_interval = float(write_buffer_config.get('flush_interval_ms', 1000)) / 1000
+        self._pending_items = []
+        self._pending_hashes = set()
+        self._pending_checkpoints: Dict[str, Tuple] = {}
+        self._pending_since = None
+        self._pending_lock = threading.RLock()
+        # 流水线停顿、没有新的写入时由后台线程按 flush_interval_ms 写入缓冲
+        self._closed = threading.Event()
+        self._flusher = None
+        if self.batch_size > 1:
+            self._flusher = threading.Thread(target=self._flush_periodically, name='db-flush', daemon=True)
+            self._flusher.start()
+
+        self.seen_filter = None
+        self._seen_filter_config = seen_filter_config
+        self._seen_filter_lock = threading.Lock()
+        if seen_filter_config:
+            self.load_seen_filter()
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建新连接并设置性能相关的PRAGMA"""
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-16000')
+        return conn
+
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._close_dead_connections()
+                self._connections.append((threading.current_thread(), conn))
         try:
             yield conn
         finally:
-            conn.close()
+            # 连接会被复用，未提交的事务必须回滚以释放写锁
+            if conn.in_transaction:
+                conn.rollback()
+
+    def _close_dead_connections(self):
+        """
+        关闭已结束线程的连接（调用方持有 _connections_lock）
+
+        每次扫描都会创建新的线程池，不关闭时连接与文件描述符会随扫描次数一直增加。
+        """
+        alive = []
+        for thread, conn in self._connections:
+            if thread.is_alive():
+                alive.append((thread, conn))
+                continue
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._connections = alive
+
+    def close(self):
+        """写入缓冲中的数据并关闭所有线程的数据库连接"""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        with self._connections_lock:
+            for _, conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
 
     def init_db(self):
         """初始化数据库表"""
@@ -36,9 +141,13 @@ class Database:
                     total_feeds INTEGER,
                     success_count INTEGER,
                     error_count INTEGER,
-                    error_detail TEXT
+                    error_detail TEXT,
+                    bytes_saved INTEGER DEFAULT 0
                 )
             ''')
+            self._ensure_column(cursor, 'scan_history', 'bytes_saved', 'INTEGER DEFAULT 0')
+            # 各阶段耗时汇总与事件计数（JSON）
+            self._ensure_column(cursor, 'scan_history', 'stage_metrics', 'TEXT')
 
             # 创建已处理项目表
             cursor.execute('''
@@ -52,9 +161,29 @@ class Database:
                     scan_history_id INTEGER,
                     status TEXT,
                     error_message TEXT,
+                    input_tokens INTEGER,
+                    output_tokens INTEGER,
                     UNIQUE(link_hash)
                 )
             ''')
+            self._ensure_column(cursor, 'processed_items', 'input_tokens', 'INTEGER')
+            self._ensure_column(cursor, 'processed_items', 'output_tokens', 'INTEGER')
+            # 条目的LLM分析结果，每日摘要直接使用，不再重新抓取和分析
+            self._ensure_column(cursor, 'processed_items', 'summary', 'TEXT')
+            # 按时间（及RSS源）查询最近条目与清理旧条目时使用
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_processed_items_time ON processed_items(processed_time)')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_processed_items_feed_time
+                ON processed_items(feed_name, processed_time)
+            ''')
+
+            # 超过保留期的已处理项目只保留链接哈希，保证去重仍然有效
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS seen_hashes (
+                    link_hash CHAR(32) PRIMARY KEY,
+                    archived_at TIMESTAMP
+                ) WITHOUT ROWID
+            ''')
             
             # 创建每日摘要表
             cursor.execute('''
@@ -67,9 +196,184 @@ class Database:
                     UNIQUE(date)
                 )
             ''')
-            
+            # 生成摘要时已汇总到的最大条目ID，新条目到达后缓存失效
+            self._ensure_column(cursor, 'daily_summaries', 'source_item_id', 'INTEGER')
+            self._ensure_column(cursor, 'daily_summaries', 'sent_at', 'TIMESTAMP')
+
+            # 创建每日各RSS源的增量要点表，条目到达后追加，生成每日摘要时合并
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feed_digests (
+                    date DATE NOT NULL,
+                    feed_name TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    item_count INTEGER DEFAULT 0,
+                    last_item_id INTEGER DEFAULT 0,
+                    updated_at TIMESTAMP,
+                    PRIMARY KEY (date, feed_name)
+                )
+            ''')
+
+            # 创建RSS源状态表（条件请求校验信息）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feed_state (
+                    feed_url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash CHAR(32),
+                    content_length INTEGER DEFAULT 0,
+                    encoding TEXT,
+                    updated_at TIMESTAMP
+                )
+            ''')
+            self._ensure_column(cursor, 'feed_state', 'encoding', 'TEXT')
+            # 上次扫描时最新条目的标识，用于遇到已知条目时提前结束
+            self._ensure_column(cursor, 'feed_state', 'newest_guid', 'TEXT')
+            self._ensure_column(cursor, 'feed_state', 'newest_link_hash', 'CHAR(32)')
+            self._ensure_column(cursor, 'feed_state', 'newest_published', 'REAL')
+
+            # 创建LLM分析结果缓存表（按内容寻址）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    cache_key CHAR(32) PRIMARY KEY,
+                    model TEXT,
+                    result TEXT NOT NULL,
+                    created_at TIMESTAMP,
+                    last_used_at TIMESTAMP,
+                    hit_count INTEGER DEFAULT 0
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used_at)')
+
+            # 创建推送发件箱表，由推送线程异步投递
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    link_hash CHAR(32) NOT NULL,
+                    feed_name TEXT,
+                    title TEXT,
+                    link TEXT NOT NULL,
+                    description TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL DEFAULT 0,
+                    leased_until REAL,
+                    last_error TEXT,
+                    created_at TIMESTAMP,
+                    delivered_at TIMESTAMP,
+                    UNIQUE(link_hash)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status, next_attempt_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_outbox_created ON outbox(created_at)')
+
+            # 创建近似重复检测使用的内容指纹表及其 LSH 分段表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS content_fingerprints (
+                    link_hash CHAR(32) PRIMARY KEY,
+                    simhash INTEGER NOT NULL,
+                    created_at TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS fingerprint_bands (
+                    band INTEGER NOT NULL,
+                    band_value INTEGER NOT NULL,
+                    link_hash CHAR(32) NOT NULL,
+                    PRIMARY KEY (band, band_value, link_hash)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_fingerprint_bands_link ON fingerprint_bands(link_hash)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_content_fingerprints_created ON content_fingerprints(created_at)')
+
+            # 创建RSS源自适应轮询状态表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feed_schedule (
+                    feed_url TEXT PRIMARY KEY,
+                    poll_interval REAL,
+                    next_check_at REAL,
+                    publish_interval REAL,
+                    hint_interval REAL,
+                    unchanged_count INTEGER DEFAULT 0,
+                    failure_count INTEGER DEFAULT 0,
+                    last_checked_at REAL
+                )
+            ''')
+
+            # 创建数据库维护记录表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS maintenance_state (
+                    task TEXT PRIMARY KEY,
+                    last_run_at REAL
+                )
+            ''')
+
+            # 创建扫描工作列表，记录每个条目完成的处理阶段与中间结果，进程中断后据此继续
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scan_jobs (
+                    link_hash CHAR(32) PRIMARY KEY,
+                    scan_history_id INTEGER NOT NULL,
+                    feed_name TEXT NOT NULL,
+                    link TEXT NOT NULL,
+                    title TEXT,
+                    entry TEXT,
+                    stage TEXT NOT NULL,
+                    content TEXT,
+                    updated_at TIMESTAMP
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_scan_jobs_scan ON scan_jobs(scan_history_id)')
+
+            # 创建主机健康状态表（熔断状态与滚动延迟、错误率）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS host_health (
+                    host TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    requests INTEGER DEFAULT 0,
+                    consecutive_failures INTEGER DEFAULT 0,
+                    error_rate REAL DEFAULT 0,
+                    latency REAL DEFAULT 0,
+                    opened_until REAL DEFAULT 0,
+                    cooldown REAL DEFAULT 0,
+                    updated_at REAL
+                )
+            ''')
+
             conn.commit()
 
+    @staticmethod
+    def _ensure_column(cursor, table: str, column: str, definition: str):
+        """为旧版本数据库补充缺失的列"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+    def load_seen_filter(self):
+        """从 processed_items 表构建内存过滤器，构建完成后整体替换旧过滤器"""
+        with self._seen_filter_lock, self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT (SELECT COUNT(*) FROM processed_items) + (SELECT COUNT(*) FROM seen_hashes)')
+            count = cursor.fetchone()[0]
+            # 预留一倍余量，避免刚启动就需要扩容
+            seen_filter = SeenFilter(
+                mode=self._seen_filter_config.get('mode', 'bloom'),
+                capacity=count * 2,
+                false_positive_rate=float(self._seen_filter_config.get('false_positive_rate', 0.001))
+            )
+            cursor.execute('SELECT link_hash FROM processed_items UNION ALL SELECT link_hash FROM seen_hashes')
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                seen_filter.update(row[0] for row in rows)
+            # 缓冲中尚未写入的链接同样需要保留；不获取 _pending_lock，写缓冲持有该锁时会等待本锁，
+            # 之后加入的链接由 _remember_seen 在本锁释放后写入新的过滤器
+            seen_filter.update(self._pending_hashes.copy())
+
+            if self.seen_filter is not None:
+                seen_filter.inherit_stats(self.seen_filter)
+            self.seen_filter = seen_filter
+        logger.info(f"已加载已处理链接过滤器: {seen_filter.stats()}")
+
     def start_scan(self, total_feeds):
         """开始新的扫描记录"""
         with self.get_connection() as conn:
@@ -81,82 +385,738 @@ class Database:
             conn.commit()
             return cursor.lastrowid
 
-    def end_scan(self, scan_id, success_count, error_count, error_detail):
-        """更新扫描记录"""
+    def end_scan(self, scan_id, success_count, error_count, error_detail, bytes_saved=0, stage_metrics=None):
+        """更新扫描记录，stage_metrics 为各阶段耗时汇总"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 UPDATE scan_history
-                SET end_time = ?, success_count = ?, error_count = ?, error_detail = ?
+                SET end_time = ?, success_count = ?, error_count = ?, error_detail = ?, bytes_saved = ?,
+                    stage_metrics = ?
                 WHERE id = ?
-            ''', (datetime.now(), success_count, error_count, json.dumps(error_detail), scan_id))
+            ''', (datetime.now(), success_count, error_count, json.dumps(error_detail), bytes_saved,
+                  json.dumps(stage_metrics, ensure_ascii=False) if stage_metrics is not None else None, scan_id))
+            conn.commit()
+
+    def get_unfinished_scans(self) -> List[Dict]:
+        """获取没有结束时间的扫描记录（进程在扫描中途退出）"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM scan_history WHERE end_time IS NULL ORDER BY id')
+            return [dict(row) for row in cursor.fetchall()]
+
+    def save_scan_jobs(self, jobs: List[Dict]):
+        """写入扫描的工作列表；条目已存在时保留其阶段与中间结果，只归入新的扫描"""
+        now = datetime.now()
+        with metrics.timer('db_write'), self.get_connection() as conn:
+            conn.executemany('''
+                INSERT INTO scan_jobs (link_hash, scan_history_id, feed_name, link, title, entry, stage, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(link_hash) DO UPDATE SET scan_history_id = excluded.scan_history_id
+            ''', [
+                (job['link_hash'], job['scan_history_id'], job['feed_name'], job['link'], job['title'],
+                 job['entry'], job['stage'], now)
+                for job in jobs
+            ])
+            conn.commit()
+
+    def update_scan_job(self, link_hash: str, stage: str, content: Optional[str] = None):
+        """
+        记录条目完成的处理阶段，content 为空时保留已保存的结果
+
+        带结果的阶段（LLM分析）立即写入，进程中断后不会重复分析；只有阶段的更新（入队）
+        在启用写缓冲时与已处理项目一起批量写入，中断时这些条目重新入队，重复的记录会被忽略。
+        """
+        row = (stage, content, datetime.now(), link_hash)
+        if self.batch_size <= 1 or content is not None:
+            with self._pending_lock:
+                self._pending_checkpoints.pop(link_hash, None)
+            with metrics.timer('db_write'), self.get_connection() as conn:
+                conn.execute(UPDATE_SCAN_JOB_SQL, row)
+                conn.commit()
+            return
+
+        with self._pending_lock:
+            self._pending_checkpoints[link_hash] = row
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if (len(self._pending_items) + len(self._pending_checkpoints) >= self.batch_size
+                    or time.monotonic() - self._pending_since >= self.flush_interval):
+                self.flush()
+
+    def get_scan_jobs(self, link_hashes: Iterable[str]) -> Dict[str, Dict]:
+        """批量查询条目的工作记录"""
+        # 先写入缓冲中的检查点，读到的阶段与结果是最新的
+        self.flush()
+        link_hashes = list(link_hashes)
+        jobs = {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for i in range(0, len(link_hashes), MAX_SQL_VARIABLES):
+                chunk = link_hashes[i:i + MAX_SQL_VARIABLES]
+                cursor.execute(f'''
+                    SELECT * FROM scan_jobs WHERE link_hash IN ({','.join('?' * len(chunk))})
+                ''', chunk)
+                jobs.update((row['link_hash'], dict(row)) for row in cursor.fetchall())
+        return jobs
+
+    def get_scan_jobs_for_scan(self, scan_id: int) -> List[Dict]:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM scan_jobs WHERE scan_history_id = ? ORDER BY rowid', (scan_id,))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def delete_scan_jobs(self, scan_id: int):
+        """扫描结束后删除其工作列表"""
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM scan_jobs WHERE scan_history_id = ?', (scan_id,))
+            conn.commit()
+
+    def get_feed_state(self, feed_url: str) -> Optional[Dict]:
+        """获取RSS源的条件请求状态"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM feed_state WHERE feed_url = ?', (feed_url,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def save_feed_state(self, feed_url: str, etag: Optional[str], last_modified: Optional[str],
+                        content_hash: str, content_length: int, encoding: Optional[str] = None,
+                        newest: Optional[Dict] = None):
+        """
+        保存RSS源的条件请求状态
+
+        Args:
+            newest: 最新条目的标识 (guid, link_hash, published)，为空时保留原有记录
+        """
+        newest = newest or {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO feed_state (feed_url, etag, last_modified, content_hash, content_length, encoding,
+                                        newest_guid, newest_link_hash, newest_published, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(feed_url) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    content_hash = excluded.content_hash,
+                    content_length = excluded.content_length,
+                    encoding = excluded.encoding,
+                    newest_guid = CASE WHEN excluded.newest_link_hash IS NULL
+                        THEN feed_state.newest_guid ELSE excluded.newest_guid END,
+                    newest_link_hash = CASE WHEN excluded.newest_link_hash IS NULL
+                        THEN feed_state.newest_link_hash ELSE excluded.newest_link_hash END,
+                    newest_published = CASE WHEN excluded.newest_link_hash IS NULL
+                        THEN feed_state.newest_published ELSE excluded.newest_published END,
+                    updated_at = excluded.updated_at
+            ''', (feed_url, etag, last_modified, content_hash, content_length, encoding,
+                  newest.get('guid'), newest.get('link_hash'), newest.get('published'), datetime.now()))
+            conn.commit()
+
+    def clear_feed_high_water(self, feed_url: str):
+        """清除RSS源的最新条目标记"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE feed_state SET newest_guid = NULL, newest_link_hash = NULL, newest_published = NULL
+                WHERE feed_url = ?
+            ''', (feed_url,))
             conn.commit()
 
     def is_processed(self, link_hash):
         """检查链接是否已处理"""
+        if link_hash in self._pending_hashes:
+            return True
+        if self.seen_filter is not None:
+            if not self.seen_filter.might_contain(link_hash):
+                return False
+            if self.seen_filter.exact:
+                return True
+
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT 1 FROM processed_items WHERE link_hash = ?', (link_hash,))
-            return cursor.fetchone() is not None
+            cursor.execute('''
+                SELECT 1 FROM processed_items WHERE link_hash = ?
+                UNION ALL
+                SELECT 1 FROM seen_hashes WHERE link_hash = ?
+                LIMIT 1
+            ''', (link_hash, link_hash))
+            found = cursor.fetchone() is not None
+
+        if self.seen_filter is not None and not found:
+            self.seen_filter.record_false_positive()
+        return found
+
+    def get_processed_hashes(self, link_hashes: Iterable[str]) -> Set[str]:
+        """批量查询已处理的链接哈希，返回其中已存在的部分"""
+        link_hashes = set(link_hashes)
+        with self._pending_lock:
+            pending = link_hashes & self._pending_hashes
+        link_hashes = list(link_hashes - pending)
+        if self.seen_filter is not None:
+            # 仅对过滤器判定为可能存在的链接查询数据库
+            link_hashes = [h for h in link_hashes if self.seen_filter.might_contain(h)]
+            if self.seen_filter.exact:
+                return set(link_hashes) | pending
+
+        processed = set(pending)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # 每个链接在两张表中各查询一次，参数数量翻倍
+            step = MAX_SQL_VARIABLES // 2
+            for i in range(0, len(link_hashes), step):
+                chunk = link_hashes[i:i + step]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT link_hash FROM processed_items WHERE link_hash IN ({placeholders})
+                    UNION
+                    SELECT link_hash FROM seen_hashes WHERE link_hash IN ({placeholders})
+                ''', chunk + chunk)
+                processed.update(row[0] for row in cursor.fetchall())
 
-    def add_processed_item(self, feed_name, item_link, item_title, link_hash, scan_history_id, status='success', error_message=None):
-        """添加已处理项目"""
+        if self.seen_filter is not None:
+            self.seen_filter.record_false_positive(len(link_hashes) + len(pending) - len(processed))
+        return processed
+
+    def add_processed_item(self, feed_name, item_link, item_title, link_hash, scan_history_id, status='success',
+                           error_message=None, input_tokens=None, output_tokens=None, summary=None):
+        """
+        添加已处理项目
+
+        input_tokens/output_tokens 为该条目LLM分析估算消耗的token数，summary 为LLM分析结果。
+
+        启用写缓冲时项目先进入缓冲区，达到 batch_size 条或超过 flush_interval_ms 后批量写入。
+
+        Returns:
+            bool: 是否新增；链接已在 processed_items 或写缓冲中时返回 False
+        """
+        row = (feed_name, item_link, item_title, link_hash, datetime.now(), scan_history_id, status, error_message,
+               input_tokens, output_tokens, summary)
+
+        if self.batch_size <= 1:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # 只有写入成功或链接已存在时才加入内存过滤器，写入失败（如数据库锁定）的条目下次仍会处理
+                try:
+                    cursor.execute(INSERT_PROCESSED_ITEM_SQL, row)
+                    conn.commit()
+                    inserted = True
+                except sqlite3.IntegrityError:
+                    inserted = False
+                self._remember_seen(link_hash)
+                return inserted
+
+        # 与逐条写入一样，已存在的链接视为重复
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute('SELECT 1 FROM processed_items WHERE link_hash = ?', (link_hash,))
+            if cursor.fetchone() is not None:
+                self._remember_seen(link_hash)
+                return False
+
+        with self._pending_lock:
+            if link_hash in self._pending_hashes:
+                return False
+            self._pending_items.append(row)
+            self._pending_hashes.add(link_hash)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            # 写入失败的条目留在缓冲中，下次写入时重试
+            self._remember_seen(link_hash)
+
+            if (len(self._pending_items) >= self.batch_size
+                    or time.monotonic() - self._pending_since >= self.flush_interval):
+                self.flush()
+        return True
+
+    def flush(self) -> int:
+        """
+        在一个事务中批量写入缓冲的已处理项目，之后写入缓冲的扫描检查点
+
+        检查点在已处理项目之后写入，中断时条目最多停留在上一个阶段，重新入队时重复的记录会被忽略。
+
+        Returns:
+            int: 实际写入的已处理项目条数（重复的链接不计入）
+        """
+        with self._pending_lock:
+            rows = self._pending_items
+            checkpoints = list(self._pending_checkpoints.values())
+            if not rows and not checkpoints:
+                return 0
+
+            inserted = self._write_processed_items(rows) if rows else 0
+            # 写入提交后才移出缓冲，查询期间这些链接始终可见
+            self._pending_items = []
+            self._pending_hashes.clear()
+            self._pending_since = None
+            if checkpoints:
+                with metrics.timer('db_write'), self.get_connection() as conn:
+                    conn.executemany(UPDATE_SCAN_JOB_SQL, checkpoints)
+                    conn.commit()
+                self._pending_checkpoints.clear()
+
+        if inserted < len(rows):
+            logger.info(f"批量写入已处理项目: {inserted} 条，忽略重复 {len(rows) - inserted} 条")
+        return inserted
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._pending_lock:
+                due = (self._pending_since is not None
+                       and time.monotonic() - self._pending_since >= self.flush_interval)
+            if not due:
+                continue
             try:
-                cursor.execute('''
-                    INSERT INTO processed_items 
-                    (feed_name, item_link, item_title, link_hash, processed_time, scan_history_id, status, error_message)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (feed_name, item_link, item_title, link_hash, datetime.now(), scan_history_id, status, error_message))
+                self.flush()
+            except Exception as e:
+                logger.error(f"定时写入缓冲失败: {str(e)}")
+
+    def _write_processed_items(self, rows) -> int:
+        with metrics.timer('db_write'), self.get_connection() as conn:
+            try:
+                conn.executemany(INSERT_PROCESSED_ITEM_SQL, rows)
                 conn.commit()
-                return True
+                return len(rows)
             except sqlite3.IntegrityError:
-                return False
+                conn.rollback()
+
+            # 存在重复链接时逐行插入，与单条写入一样忽略重复项
+            inserted = 0
+            for row in rows:
+                try:
+                    conn.execute(INSERT_PROCESSED_ITEM_SQL, row)
+                    inserted += 1
+                except sqlite3.IntegrityError:
+                    pass
+            conn.commit()
+            return inserted
+
+    def _remember_seen(self, link_hash: str):
+        """将链接加入内存过滤器，超出容量时从数据库重建"""
+        if self.seen_filter is None:
+            return
+        # 与重建互斥，避免重建期间写入的链接丢失
+        with self._seen_filter_lock:
+            self.seen_filter.add(link_hash)
+            rebuild = self.seen_filter.needs_rebuild()
+        if rebuild:
+            self.load_seen_filter()
+
+    def enqueue_outbox(self, link_hash: str, feed_name: str, title: str, link: str, description: str) -> bool:
+        """将待推送条目写入发件箱，已存在时忽略"""
+        with metrics.timer('db_write'), self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR IGNORE INTO outbox (link_hash, feed_name, title, link, description, status, created_at)
+                VALUES (?, ?, ?, ?, ?, 'pending', ?)
+            ''', (link_hash, feed_name, title, link, description, datetime.now()))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def claim_outbox(self, limit: int, lease_seconds: float) -> List[Dict]:
+        """
+        领取到期的待推送条目，并在租约期内标记为发送中
+
+        租约过期仍未完成的条目（如进程崩溃）会被重新领取。
+        """
+        now = time.time()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # 立即获取写锁，避免多个推送线程领取同一条目
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT * FROM outbox
+                WHERE (status = 'pending' AND next_attempt_at <= ?)
+                   OR (status = 'sending' AND leased_until < ?)
+                ORDER BY id
+                LIMIT ?
+            ''', (now, now, limit))
+            rows = [dict(row) for row in cursor.fetchall()]
+            if rows:
+                cursor.executemany(
+                    "UPDATE outbox SET status = 'sending', leased_until = ? WHERE id = ?",
+                    [(now + lease_seconds, row['id']) for row in rows]
+                )
+            conn.commit()
+            return rows
+
+    def mark_outbox_delivered(self, items: List[Dict]):
+        """标记条目推送成功"""
+        self.flush()
+        now = datetime.now()
+        with metrics.timer('db_write'), self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "UPDATE outbox SET status = 'delivered', delivered_at = ?, leased_until = NULL WHERE id = ?",
+                [(now, item['id']) for item in items]
+            )
+            cursor.executemany(
+                "UPDATE processed_items SET status = 'success', error_message = NULL WHERE link_hash = ?",
+                [(item['link_hash'],) for item in items]
+            )
+            conn.commit()
+
+    def reschedule_outbox(self, item: Dict, error: str, next_attempt_at: Optional[float]):
+        """
+        记录推送失败；next_attempt_at 为空时进入死信状态，不再重试
+        """
+        self.flush()
+        with metrics.timer('db_write'), self.get_connection() as conn:
+            cursor = conn.cursor()
+            if next_attempt_at is None:
+                cursor.execute('''
+                    UPDATE outbox SET status = 'dead', attempts = attempts + 1, last_error = ?, leased_until = NULL
+                    WHERE id = ?
+                ''', (error, item['id']))
+                cursor.execute(
+                    "UPDATE processed_items SET status = 'failed', error_message = ? WHERE link_hash = ?",
+                    (error, item['link_hash'])
+                )
+            else:
+                cursor.execute('''
+                    UPDATE outbox SET status = 'pending', attempts = attempts + 1, last_error = ?,
+                        next_attempt_at = ?, leased_until = NULL
+                    WHERE id = ?
+                ''', (error, next_attempt_at, item['id']))
+            conn.commit()
+
+    def get_outbox_stats(self) -> Dict[str, int]:
+        """按状态统计发件箱条目数"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status')
+            return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def get_feed_schedules(self) -> Dict[str, Dict]:
+        """获取所有RSS源的轮询状态，按 feed_url 索引"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM feed_schedule')
+            return {row['feed_url']: dict(row) for row in cursor.fetchall()}
+
+    def save_feed_schedule(self, schedule: Dict):
+        """保存单个RSS源的轮询状态"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO feed_schedule
+                (feed_url, poll_interval, next_check_at, publish_interval, hint_interval,
+                 unchanged_count, failure_count, last_checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                schedule['feed_url'], schedule['poll_interval'], schedule['next_check_at'],
+                schedule.get('publish_interval'), schedule.get('hint_interval'),
+                schedule.get('unchanged_count', 0), schedule.get('failure_count', 0),
+                schedule.get('last_checked_at')
+            ))
+            conn.commit()
+
+    def get_llm_cache(self, cache_key: str) -> Optional[str]:
+        """获取缓存的LLM分析结果，命中时更新使用时间"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT result FROM llm_cache WHERE cache_key = ?', (cache_key,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            cursor.execute('''
+                UPDATE llm_cache SET last_used_at = ?, hit_count = hit_count + 1
+                WHERE cache_key = ?
+            ''', (datetime.now(), cache_key))
+            conn.commit()
+            return row[0]
+
+    def save_llm_cache(self, cache_key: str, model: str, result: str):
+        """保存LLM分析结果"""
+        now = datetime.now()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO llm_cache (cache_key, model, result, created_at, last_used_at, hit_count)
+                VALUES (?, ?, ?, ?, ?, 0)
+            ''', (cache_key, model, result, now, now))
+            conn.commit()
+
+    def evict_llm_cache(self, max_entries: int, max_age_days: int) -> int:
+        """
+        清理LLM缓存：删除超过 max_age_days 未使用的条目，并只保留最近使用的 max_entries 条
+
+        Returns:
+            int: 删除的条目数
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM llm_cache WHERE last_used_at < datetime('now', 'localtime', ?)
+            ''', (f'-{max_age_days} days',))
+            deleted = cursor.rowcount
+            cursor.execute('''
+                DELETE FROM llm_cache WHERE cache_key IN (
+                    SELECT cache_key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (max_entries,))
+            deleted += cursor.rowcount
+            conn.commit()
+            return deleted
 
-    def save_daily_summary(self, date: str, summary_content: str) -> bool:
-        """保存每日摘要"""
+    def find_fingerprint_candidates(self, band_keys: List[Tuple[int, int]]) -> List[Tuple[str, int]]:
+        """查询任一分段相同的内容指纹，返回 (link_hash, simhash) 列表"""
+        if not band_keys:
+            return []
+        conditions = ' OR '.join(['(b.band = ? AND b.band_value = ?)'] * len(band_keys))
+        params = [value for key in band_keys for value in key]
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT DISTINCT f.link_hash, f.simhash
+                FROM fingerprint_bands b JOIN content_fingerprints f ON f.link_hash = b.link_hash
+                WHERE {conditions}
+            ''', params)
+            return [(row[0], row[1]) for row in cursor.fetchall()]
+
+    def save_fingerprint(self, link_hash: str, simhash: int, band_keys: List[Tuple[int, int]]):
+        """保存内容指纹及其分段"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO content_fingerprints (link_hash, simhash, created_at)
+                VALUES (?, ?, ?)
+            ''', (link_hash, simhash, datetime.now()))
+            cursor.execute('DELETE FROM fingerprint_bands WHERE link_hash = ?', (link_hash,))
+            cursor.executemany('''
+                INSERT OR IGNORE INTO fingerprint_bands (band, band_value, link_hash) VALUES (?, ?, ?)
+            ''', [(band, value, link_hash) for band, value in band_keys])
+            conn.commit()
+
+    def evict_fingerprints(self, max_age_days: int) -> int:
+        """
+        删除超过 max_age_days 的内容指纹及其分段
+
+        Returns:
+            int: 删除的指纹数
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM content_fingerprints WHERE created_at < datetime('now', 'localtime', ?)
+            ''', (f'-{max_age_days} days',))
+            deleted = cursor.rowcount
+            if deleted:
+                cursor.execute('''
+                    DELETE FROM fingerprint_bands
+                    WHERE link_hash NOT IN (SELECT link_hash FROM content_fingerprints)
+                ''')
+            conn.commit()
+            return deleted
+
+    def get_outbox_description(self, link_hash: str) -> Optional[str]:
+        """获取发件箱中条目的描述（LLM摘要）"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT description FROM outbox WHERE link_hash = ?', (link_hash,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def save_daily_summary(self, date: str, summary_content: str, source_item_id: Optional[int] = None) -> bool:
+        """保存每日摘要，source_item_id 为摘要已汇总到的最大条目ID"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                INSERT OR REPLACE INTO daily_summaries (date, summary_content, updated_at)
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-                ''', (date, summary_content))
+                INSERT INTO daily_summaries (date, summary_content, source_item_id, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(date) DO UPDATE SET
+                    summary_content = excluded.summary_content,
+                    source_item_id = excluded.source_item_id,
+                    updated_at = excluded.updated_at
+                ''', (date, summary_content, source_item_id))
                 conn.commit()
                 return True
         except Exception as e:
             logger.error(f"保存每日摘要失败: {str(e)}")
             return False
 
-    def get_daily_summary(self, date: str) -> Optional[str]:
-        """获取指定日期的每日摘要"""
+    def get_daily_summary(self, date: str, source_item_id: Optional[int] = None) -> Optional[str]:
+        """获取指定日期的每日摘要；指定 source_item_id 时只返回汇总到该条目的摘要"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                SELECT summary_content FROM daily_summaries
+                SELECT summary_content, source_item_id FROM daily_summaries
                 WHERE date = ?
                 ''', (date,))
                 result = cursor.fetchone()
-                return result[0] if result else None
+                if result is None or (source_item_id is not None and result[1] != source_item_id):
+                    return None
+                return result[0]
         except Exception as e:
             logger.error(f"获取每日摘要失败: {str(e)}")
             return None
 
-    def get_recent_items(self, days: int = 1) -> List[Dict]:
-        """获取最近几天的文章条目"""
+    def is_daily_summary_sent(self, date: str) -> bool:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT sent_at FROM daily_summaries WHERE date = ?', (date,))
+            row = cursor.fetchone()
+            return row is not None and row[0] is not None
+
+    def mark_daily_summary_sent(self, date: str):
+        with self.get_connection() as conn:
+            conn.execute('UPDATE daily_summaries SET sent_at = ? WHERE date = ?', (datetime.now(), date))
+            conn.commit()
+
+    def get_items_for_digest(self, start: datetime, end: datetime, after_id: int) -> List[Dict]:
+        """获取时间范围内 ID 大于 after_id 且有LLM分析结果的条目，按ID排序"""
+        self.flush()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, feed_name, item_title, item_link, summary
+                FROM processed_items
+                WHERE processed_time >= ? AND processed_time < ? AND id > ?
+                    AND summary IS NOT NULL AND summary != ''
+                ORDER BY id
+            ''', (start, end, after_id))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_feed_digests(self, date: str) -> Dict[str, Dict]:
+        """获取指定日期各RSS源的要点，按RSS源名称索引"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT feed_name, digest, item_count, last_item_id FROM feed_digests
+                WHERE date = ? ORDER BY feed_name
+            ''', (date,))
+            return {row['feed_name']: dict(row) for row in cursor.fetchall()}
+
+    def save_feed_digests(self, date: str, digests: List[Dict]):
+        """在一个事务中保存多个RSS源的要点"""
+        now = datetime.now()
+        with self.get_connection() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO feed_digests (date, feed_name, digest, item_count, last_item_id, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(date, d['feed_name'], d['digest'], d['item_count'], d['last_item_id'], now) for d in digests])
+            conn.commit()
+
+    def get_recent_items(self, days: int = 1, feed_name: Optional[str] = None) -> List[Dict]:
+        """
+        获取最近几天的文章条目
+
+        起始时间在查询前算好，条件直接比较 processed_time 以便使用索引。
+
+        Args:
+            days: 天数，从 days 天前的零点开始
+            feed_name: 只返回指定RSS源的条目
+        """
+        since = datetime.combine((datetime.now() - timedelta(days=days)).date(), datetime.min.time())
+        query = '''
+            SELECT feed_name, item_title, item_link, processed_time
+            FROM processed_items
+            WHERE processed_time >= ?
+        '''
+        params = [since]
+        if feed_name is not None:
+            query += ' AND feed_name = ?'
+            params.append(feed_name)
+        query += ' ORDER BY processed_time DESC'
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                SELECT feed_name, item_title, item_link, processed_time
-                FROM processed_items
-                WHERE date(processed_time) >= date('now', ?)
-                ORDER BY processed_time DESC
-                ''', (f'-{days} days',))
+                cursor.execute(query, params)
                 return [dict(zip(['feed_name', 'title', 'link', 'time'], row)) 
                        for row in cursor.fetchall()]
         except Exception as e:
             logger.error(f"获取最近文章失败: {str(e)}")
-            return [] 
\ No newline at end of file
+            return []
+
+    def compact_processed_items(self, retention_days: int) -> int:
+        """
+        将超过 retention_days 的已处理项目压缩到 seen_hashes，只保留链接哈希用于去重；
+        同时删除超过保留期的已推送或死信发件箱条目
+
+        Returns:
+            int: 压缩的已处理项目数
+        """
+        self.flush()
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # 尚未推送完成的条目仍被发件箱引用，保留完整记录
+            cursor.execute('''
+                INSERT OR IGNORE INTO seen_hashes (link_hash, archived_at)
+                SELECT link_hash, ? FROM processed_items
+                WHERE processed_time < ? AND status IS NOT 'queued'
+            ''', (datetime.now(), cutoff))
+            cursor.execute('''
+                DELETE FROM processed_items WHERE processed_time < ? AND status IS NOT 'queued'
+            ''', (cutoff,))
+            compacted = cursor.rowcount
+            cursor.execute('''
+                DELETE FROM outbox WHERE status IN ('delivered', 'dead') AND created_at < ?
+            ''', (cutoff,))
+            outbox_deleted = cursor.rowcount
+            cursor.execute('DELETE FROM feed_digests WHERE date < ?', (cutoff.strftime('%Y-%m-%d'),))
+            cursor.execute('DELETE FROM host_health WHERE updated_at < ?', (cutoff.timestamp(),))
+            conn.commit()
+        if compacted or outbox_deleted:
+            logger.info(f"压缩已处理项目 {compacted} 条，删除发件箱条目 {outbox_deleted} 条")
+        return compacted
+
+    def optimize(self, vacuum: bool = False):
+        """
+        更新查询规划器的统计信息，可选 VACUUM 回收空闲页并截断 WAL 文件
+
+        VACUUM 需要独占数据库，失败时留到下次维护。
+        """
+        self.flush()
+        with self.get_connection() as conn:
+            conn.execute('ANALYZE')
+            conn.commit()
+            if not vacuum:
+                return
+            try:
+                conn.execute('VACUUM')
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            except sqlite3.OperationalError as e:
+                logger.warning(f"VACUUM 失败，下次维护时重试: {str(e)}")
+
+    def get_maintenance_time(self, task: str) -> Optional[float]:
+        """获取维护任务上次执行的时间戳"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT last_run_at FROM maintenance_state WHERE task = ?', (task,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def set_maintenance_time(self, task: str, last_run_at: float):
+        with self.get_connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO maintenance_state (task, last_run_at) VALUES (?, ?)
+            ''', (task, last_run_at))
+            conn.commit()
+
+    def get_host_health(self) -> Dict[str, Dict]:
+        """获取各主机保存的健康状态"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT host, state, requests, consecutive_failures, error_rate, latency, opened_until, cooldown
+                FROM host_health
+            ''')
+            return {row['host']: {k: row[k] for k in row.keys() if k != 'host'} for row in cursor.fetchall()}
+
+    def save_host_health(self, rows: List[Dict]):
+        """保存主机健康状态"""
+        now = time.time()
+        with self.get_connection() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO host_health
+                (host, state, requests, consecutive_failures, error_rate, latency, opened_until, cooldown, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (row['host'], row['state'], row['requests'], row['consecutive_failures'], row['error_rate'],
+                 row['latency'], row['opened_until'], row['cooldown'], now)
+                for row in rows
+            ])
+            conn.commit()
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .database import Database
+from .host_health import HostHealth, host_of
+from .http_client import HTTPClient
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryService:
+    def __init__(self, database: Database, http_client: HTTPClient, delivery_config: Optional[Dict] = None,
+                 host_health: Optional[HostHealth] = None):
+        """
+        从发件箱异步推送条目到目标API
+
+        目标主机熔断期间不领取条目，避免消耗重试次数。
+
+        Args:
+            delivery_config: 推送配置，支持：
+                mode: 'single' 每条一个请求；'batch' JSON数组；'ndjson' 每行一个JSON
+                batch_size: 每次领取（批量模式下每个请求）的条目数
+                workers: 推送线程数
+                max_attempts: 最大尝试次数，超过后进入死信状态
+                backoff_base / backoff_max: 重试退避的基础与最大秒数
+                poll_interval: 发件箱为空时的轮询间隔（秒）
+                timeout: 单次请求超时（秒）
+            host_health: 按主机熔断，为空时不启用
+        """
+        delivery_config = delivery_config or {}
+        self.database = database
+        self.http_client = http_client
+        self.host_health = host_health
+        self.mode = delivery_config.get('mode', 'single')
+        self.batch_size = max(1, int(delivery_config.get('batch_size', 20)))
+        self.workers = max(1, int(delivery_config.get('workers', 2)))
+        self.max_attempts = max(1, int(delivery_config.get('max_attempts', 8)))
+        self.backoff_base = float(delivery_config.get('backoff_base', 30))
+        self.backoff_max = float(delivery_config.get('backoff_max', 3600))
+        self.poll_interval = float(delivery_config.get('poll_interval', 5))
+        self.timeout = float(delivery_config.get('timeout', 30))
+        # 租约需覆盖一批条目的发送耗时
+        self.lease_seconds = self.timeout * self.batch_size + 60
+
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self.failed = 0
+
+    def start(self):
+        """启动推送线程，重复调用无副作用"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'delivery-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        with self._lock:
+            self._stop.set()
+            self._wakeup.set()
+            threads, self._threads = self._threads, []
+        # 推送线程更新计数时需要获取 self._lock，等待线程结束前先释放锁
+        for thread in threads:
+            thread.join()
+
+    def notify(self):
+        """有新条目入队时唤醒推送线程"""
+        self._wakeup.set()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """在当前线程推送所有到期条目，用于关闭前或测试；返回是否已清空"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            if not self.deliver_once():
+                # 目标主机熔断时无法清空
+                return self._target_available()
+        return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.deliver_once():
+                    continue
+            except Exception as e:
+                logger.error(f"推送线程发生错误: {str(e)}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def deliver_once(self) -> int:
+        """
+        领取并推送一批条目
+
+        Returns:
+            int: 本次领取的条目数，0 表示没有到期条目
+        """
+        if not self._target_available():
+            return 0
+        items = self.database.claim_outbox(self.batch_size, self.lease_seconds)
+        if not items:
+            return 0
+
+        if self.batched:
+            try:
+                self.http_client.send_batch(self._payloads(items), mode=self.mode, timeout=self.timeout)
+                self._delivered(items)
+            except Exception as e:
+                self._batch_failed(items, e)
+        else:
+            for item in items:
+                if self.http_client.send_item(item['title'], item['link'], item['description'],
+                                              timeout=self.timeout):
+                    self._delivered([item])
+                else:
+                    self._failed(item, 'HTTP发送失败')
+        return len(items)
+
+    async def adeliver_once(self, transport) -> int:
+        """
+        deliver_once 的异步版本，请求通过异步传输层发送，数据库操作在线程池中执行
+
+        Returns:
+            int: 本次领取的条目数，0 表示没有到期条目
+        """
+        if not self._target_available():
+            return 0
+        items = await asyncio.to_thread(self.database.claim_outbox, self.batch_size, self.lease_seconds)
+        if not items:
+            return 0
+
+        async def post(**kwargs):
+            with metrics.timer('deliver'):
+                response = await transport.request('POST', self.http_client.target_api, timeout=self.timeout, **kwargs)
+                response.raise_for_status()
+
+        if self.batched:
+            try:
+                await post(**self.http_client.batch_request_kwargs(self._payloads(items), self.mode))
+                await asyncio.to_thread(self._delivered, items)
+            except Exception as e:
+                await asyncio.to_thread(self._batch_failed, items, e)
+        else:
+            async def send(item):
+                try:
+                    await post(json=self.http_client.build_payload(item['title'], item['link'], item['description']))
+                    await asyncio.to_thread(self._delivered, [item])
+                except Exception as e:
+                    logger.error(f"发送失败: {str(e)}, URL: {item['link']}")
+                    await asyncio.to_thread(self._failed, item, 'HTTP发送失败')
+            await asyncio.gather(*[send(item) for item in items])
+        return len(items)
+
+    def _target_available(self) -> bool:
+        return self.host_health is None or self.host_health.available(host_of(self.http_client.target_api))
+
+    @property
+    def batched(self) -> bool:
+        return self.mode in ('batch', 'ndjson')
+
+    def _payloads(self, items: List[Dict]) -> List[Dict]:
+        return [self.http_client.build_payload(i['title'], i['link'], i['description']) for i in items]
+
+    def _batch_failed(self, items: List[Dict], error: Exception):
+        logger.error(f"批量推送失败: {str(error)}, 条目数: {len(items)}")
+        for item in items:
+            self._failed(item, str(error))
+
+    def _delivered(self, items: List[Dict]):
+        self.database.mark_outbox_delivered(items)
+        for item in items:
+            metrics.increment('items_delivered', feed=item.get('feed_name') or '')
+        with self._lock:
+            self.delivered += len(items)
+
+    def _failed(self, item: Dict, error: str):
+        attempts = item['attempts'] + 1
+        if attempts >= self.max_attempts:
+            logger.error(f"推送失败次数达到上限，进入死信: {item['link']}")
+            next_attempt_at = None
+        else:
+            # 指数退避并加随机抖动
+            delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+            next_attempt_at = time.time() + delay * random.uniform(0.8, 1.2)
+        self.database.reschedule_outbox(item, error, next_attempt_at)
+        metrics.increment('deliver_errors', feed=item.get('feed_name') or '')
+        with self._lock:
+            self.failed += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {'delivered': self.delivered, 'failed_attempts': self.failed}
+        stats['outbox'] = self.database.get_outbox_stats()
+        return stats
@@ -1,48 +1,201 @@
 import logging
-from typing import Dict, Optional
+import xml.etree.ElementTree as ET
+from hashlib import blake2b
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import feedparser
+import requests
 
+from .checkpoint import ANALYZED, PENDING, QUEUED, ScanCheckpoints
 from .content_processor import ContentProcessor
 from .database import Database
+from .delivery import DeliveryService
+from .feed_stream import StreamingFeedParser
 from .http_client import HTTPClient
-from .utils import get_link_hash
+from .metrics import metrics
+from .near_duplicate import NearDuplicateIndex
+from .pipeline import Pipeline, PipelineJob
+from .scheduler import extract_schedule_hints
+from .transport import Transport
+from .utils import detect_encoding, entry_timestamp, get_link_hash, to_utf8_xml
 
 logger = logging.getLogger(__name__)
 
+# 流式下载时每次读取的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 不能提前结束时每批查询的条目数
+FULL_SCAN_BATCH = 500
+
+# 复用摘要的近似重复条目等待原条目完成处理的最长秒数
+DUPLICATE_WAIT_SECONDS = 600
+
 class FeedProcessor:
-    def __init__(self, database: Database, http_client: HTTPClient, content_processor: ContentProcessor):
+    def __init__(self, database: Database, http_client: HTTPClient, content_processor: ContentProcessor,
+                 pipeline_config: Optional[Dict] = None, delivery: Optional[DeliveryService] = None,
+                 transport: Optional[Transport] = None, early_exit_config: Optional[Dict] = None,
+                 near_duplicates: Optional[NearDuplicateIndex] = None, duplicate_action: str = 'skip',
+                 streaming_config: Optional[Dict] = None, checkpoints: Optional[ScanCheckpoints] = None):
+        """
+        Args:
+            pipeline_config: 流水线配置 (convert_workers, analyze_workers, enqueue_workers, queue_size)
+            early_exit_config: 遇到已知条目时提前结束的配置 (consecutive_hits, window)，为空时检查全部条目
+            near_duplicates: 近似重复内容索引，为空时不检测
+            duplicate_action: 近似重复条目的处理方式，'skip' 不推送；'reuse' 复用原条目的摘要推送
+            streaming_config: 流式解析配置 (threshold_bytes, max_bytes, max_entries, max_entry_bytes)，
+                为空时总是完整下载后由 feedparser 解析
+            delivery: 推送服务，条目入队后唤醒其推送线程
+            transport: 共享的HTTP传输层，默认使用 http_client 的传输层
+            checkpoints: 保存条目处理阶段的检查点，为空时进程中断后重新处理未入队的条目
+        """
         self.database = database
         self.http_client = http_client
         self.content_processor = content_processor
+        self.delivery = delivery
+        self.near_duplicates = near_duplicates
+        self.duplicate_action = duplicate_action
+        self.session = (transport or http_client.transport).session
+        self.streaming = streaming_config
+        self.checkpoints = checkpoints
+        self.early_exit = None
+        if early_exit_config:
+            self.early_exit = {
+                'consecutive_hits': max(1, int(early_exit_config.get('consecutive_hits', 3))),
+                'window': max(1, int(early_exit_config.get('window', 10))),
+            }
+
+        # 多个RSS源共享的 转换 -> 分析 -> 入队 流水线
+        pipeline_config = pipeline_config or {}
+        self.pipeline = Pipeline([
+            ('convert', self.convert_job, int(pipeline_config.get('convert_workers', 4))),
+            ('fingerprint', self.fingerprint_job, int(pipeline_config.get('fingerprint_workers', 1))),
+            ('analyze', self.analyze_job,
+             int(pipeline_config.get('analyze_workers', content_processor.llm_client.max_concurrency))),
+            ('enqueue', self.enqueue_job, int(pipeline_config.get('enqueue_workers', 1))),
+        ], queue_size=int(pipeline_config.get('queue_size', 100)))
+
+    def fetch_feed(self, feed_url: str, conditional: bool = True, stream: bool = False) -> Optional[Dict]:
+        """
+        使用条件请求 (ETag / Last-Modified) 下载RSS源
+
+        Args:
+            feed_url: RSS源地址
+            conditional: 是否发送条件请求头并与上次内容比较
+            stream: 是否允许流式解析；启用流式解析且 Content-Length 超过 threshold_bytes 时
+                不读取内容，结果中的 response 由调用方逐块读取并关闭
+
+        Returns:
+            Optional[Dict]: 下载结果，unchanged 为 True 时表示内容未变化，无需解析；
+            下载失败时返回 None
+        """
+        state, headers = self.prepare_fetch(feed_url, conditional)
+        try:
+            response = self.session.get(feed_url, headers=headers, stream=True)
+            if response.status_code != 304:
+                response.raise_for_status()
+            if stream and self.should_stream(response):
+                return self.build_stream_result(state, response)
+            content = response.content
+        except requests.RequestException as e:
+            logger.error(f"RSS下载失败: {str(e)}")
+            if e.response is not None:
+                e.response.close()
+            return None
 
-    def parse_feed(self, feed_url: str) -> Optional[feedparser.FeedParserDict]:
+        return self.build_fetch_result(state, response.status_code, content, response.headers, conditional)
+
+    def should_stream(self, response: requests.Response) -> bool:
+        """
+        只有声明了长度且超过阈值的响应使用流式解析
+
+        长度未知的响应（分块传输、动态生成的RSS源）多数并不大，完整下载后可以按内容哈希跳过未变化的RSS源。
+        """
+        if self.streaming is None or response.status_code != 200:
+            return False
+        length = response.headers.get('Content-Length')
+        return bool(length and length.isdigit() and int(length) > self.streaming['threshold_bytes'])
+
+    @staticmethod
+    def build_stream_result(state: Dict, response: requests.Response) -> Dict:
+        """构建流式解析的下载结果，内容哈希未知，不做内容比较"""
+        return {
+            'unchanged': False,
+            'bytes_saved': 0,
+            'content': None,
+            'response': response,
+            'headers': {k.lower(): v for k, v in response.headers.items()},
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': None,
+            'content_length': 0,
+            'encoding': state.get('encoding'),
+            'high_water': FeedProcessor.high_water(state),
+        }
+
+    @staticmethod
+    def high_water(state: Dict) -> Dict:
+        """上次扫描记录的最新条目标识"""
+        return {
+            'guid': state.get('newest_guid'),
+            'link_hash': state.get('newest_link_hash'),
+            'published': state.get('newest_published'),
+        }
+
+    def prepare_fetch(self, feed_url: str, conditional: bool = True):
+        """读取RSS源状态并构建条件请求头，返回 (状态, 请求头)"""
+        state = self.database.get_feed_state(feed_url) or {}
+        headers = {}
+        if conditional:
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+            if state.get('last_modified'):
+                headers['If-Modified-Since'] = state['last_modified']
+        return state, headers
+
+    @staticmethod
+    def build_fetch_result(state: Dict, status_code: int, content: bytes, headers, conditional: bool = True) -> Dict:
+        """根据响应构建下载结果，304 或内容哈希未变化时标记为 unchanged"""
+        if status_code == 304:
+            return {'unchanged': True, 'bytes_saved': state.get('content_length') or 0}
+
+        content_hash = blake2b(content, digest_size=16).hexdigest()
+        return {
+            'unchanged': conditional and content_hash == state.get('content_hash'),
+            'bytes_saved': 0,
+            'content': content,
+            'headers': {k.lower(): v for k, v in headers.items()},
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'content_hash': content_hash,
+            'content_length': len(content),
+            'encoding': state.get('encoding'),
+            'high_water': FeedProcessor.high_water(state),
+        }
+
+    def parse_feed(self, feed_url: str, fetched: Optional[Dict] = None) -> Optional[feedparser.FeedParserDict]:
         """
         解析RSS源, 处理可能的编码问题
+
+        原始字节只下载一次，编码由 BOM、HTTP 头、XML 声明及试探解码确定，
+        统一转为utf-8后只解析一次。确定的编码记录在 fetched['encoding'] 中。
         """
         try:
-            # 首先尝试直接解析
-            feed = feedparser.parse(feed_url)
-            
-            # 如果发现编码错误，尝试使用不同的编码重新解析
-            if feed.bozo and isinstance(feed.bozo_exception, feedparser.CharacterEncodingOverride):
-                # 获取原始内容
-                import requests
-                response = requests.get(feed_url, timeout=10)
-                
-                # 尝试使用 UTF-8 编码
-                response.encoding = 'utf-8'
-                feed = feedparser.parse(response.text)
-                
-                # 如果还是失败，尝试其他常见编码
-                if feed.bozo:
-                    for encoding in ['gb2312', 'gbk', 'iso-8859-1']:
-                        response.encoding = encoding
-                        feed = feedparser.parse(response.text)
-                        if not feed.bozo:
-                            break
-            
-            return feed
+            if fetched is None:
+                fetched = self.fetch_feed(feed_url, conditional=False)
+                if fetched is None:
+                    return None
+
+            encoding = detect_encoding(
+                fetched['content'],
+                content_type=fetched['headers'].get('content-type'),
+                preferred=fetched.get('encoding')
+            )
+            fetched['encoding'] = encoding
+
+            headers = dict(fetched['headers'])
+            headers['content-type'] = 'application/xml; charset=utf-8'
+            return feedparser.parse(to_utf8_xml(fetched['content'], encoding), response_headers=headers)
         except Exception as e:
             logger.error(f"RSS解析失败: {str(e)}")
             return None
@@ -54,71 +207,417 @@ class FeedProcessor:
         Returns:
             Dict[str, int]: 包含成功和失败计数的字典
         """
-        result = {"success": 0, "error": 0}
+        result = {"success": 0, "error": 0, "bytes_saved": 0, "status": "failed"}
         
         try:
-            feed = self.parse_feed(feed_url)
-            
-            if feed is None:
-                logger.error(f"无法解析RSS源 {feed_name}")
+            with metrics.timer('fetch', feed_name):
+                fetched = self.fetch_feed(feed_url, stream=True)
+            if fetched is None:
+                logger.error(f"无法下载RSS源 {feed_name}")
                 return result
-            
-            if feed.bozo and not isinstance(feed.bozo_exception, feedparser.CharacterEncodingOverride):
-                logger.error(f"RSS解析错误 {feed_name}: {feed.bozo_exception}")
+
+            if fetched['unchanged']:
+                logger.info(f"RSS源未更新，跳过解析 {feed_name}")
+                result["bytes_saved"] = fetched['bytes_saved']
+                result["status"] = "unchanged"
                 return result
-            
-            for entry in feed.entries:
-                try:
-                    link = entry.link
-                    title = entry.title
-                    link_hash = get_link_hash(link)
-                    
-                    # 检查是否已处理
-                    if self.database.is_processed(link_hash):
-                        logger.info(f"已存在处理记录 {link}")
-                        continue
 
-                    content_type = self.content_processor.detect_content_type(link, {})
-                    analyze_ret = self.content_processor.process_content(link, {}, content_type)
-
-                    # 安全获取 summary
-                    summary = ""
-                    if analyze_ret.get('analysis') and isinstance(analyze_ret['analysis'], dict):
-                        summary = analyze_ret['analysis'].get('summary', '')
-                    # 如果 analysis 是 None 或没有 summary，summary 就是空字符串
-
-                    # 发送到目标API
-                    if self.http_client.send_item(title, link, summary):
-                        self.database.add_processed_item(
-                            feed_name=feed_name,
-                            item_link=link,
-                            item_title=title,
-                            link_hash=link_hash,
-                            scan_history_id=scan_history_id,
-                            status='success'
-                        )
-                        result["success"] += 1
-                    else:
-                        self.database.add_processed_item(
-                            feed_name=feed_name,
-                            item_link=link,
-                            item_title=title,
-                            link_hash=link_hash,
-                            scan_history_id=scan_history_id,
-                            status='failed',
-                            error_message='HTTP发送失败'
-                        )
-                        result["error"] += 1
-                
-                except Exception as e:
-                    logger.error(f"处理条目错误 {feed_name}: {str(e)}")
-                    result["error"] += 1
+            jobs = self.collect_new_jobs(feed_name, feed_url, fetched, scan_history_id, result)
+            if jobs is None:
+                return result
+            result["status"] = "updated" if jobs else "unchanged"
+            metrics.increment('entries_new', len(jobs), feed=feed_name)
+
+            # 新条目进入流水线，转换、分析、入队在不同条目之间并行
+            for job in jobs:
+                self.pipeline.submit(job)
+            for job in jobs:
+                job.wait()
+
+            self.complete_feed(feed_name, feed_url, fetched, jobs, result)
                     
         except Exception as e:
             logger.error(f"处理RSS源错误 {feed_name}: {str(e)}")
+        finally:
+            # 每个RSS源的处理结果在一个事务中提交
+            self.database.flush()
+            metrics.increment(f"feeds_{result['status']}", feed=feed_name)
             
         return result 
 
+    def collect_new_jobs(self, feed_name: str, feed_url: str, fetched: Dict, scan_history_id: int,
+                         result: Dict) -> Optional[List[PipelineJob]]:
+        """
+        解析RSS源并为未处理的条目创建任务
+
+        解析成功时在 result['schedule_hints'] 中记录供调度器使用的发布时间与更新频率提示。
+
+        Returns:
+            Optional[List[PipelineJob]]: 新条目任务列表，解析失败时返回 None
+        """
+        scanned = None
+        if fetched.get('response') is not None:
+            try:
+                # 流式解析时下载、解析与查重交替进行，统一计入 stream_parse
+                with metrics.timer('stream_parse', feed_name):
+                    scanned = self.scan_stream(feed_name, fetched)
+            except ET.ParseError as e:
+                logger.warning(f"流式解析失败，改为完整解析 {feed_name}: {str(e)}")
+                full = self.fetch_feed(feed_url, conditional=False)
+                if full is None:
+                    logger.error(f"无法下载RSS源 {feed_name}")
+                    return None
+                fetched.update(full)
+
+        if scanned is not None:
+            channel, candidates, processed_hashes = scanned
+            entries = [entry for entry, _ in candidates]
+        else:
+            with metrics.timer('parse', feed_name):
+                feed = self.parse_feed(feed_url, fetched)
+
+            if feed is None:
+                logger.error(f"无法解析RSS源 {feed_name}")
+                return None
+
+            if feed.bozo and not isinstance(feed.bozo_exception, feedparser.CharacterEncodingOverride):
+                logger.error(f"RSS解析错误 {feed_name}: {feed.bozo_exception}")
+                return None
+
+            channel, entries = feed.feed, feed.entries
+            with metrics.timer('dedup', feed_name):
+                candidates, processed_hashes = self.scan_entries(feed_name, entries, fetched.get('high_water'))
+
+        result["schedule_hints"] = extract_schedule_hints(channel, entries)
+        fetched['newest'] = self.newest_entry(entries)
+
+        # 筛选出未处理的条目
+        jobs = []
+        for entry, link_hash in candidates:
+            try:
+                link = entry.link
+                title = entry.title
+                
+                # 检查是否已处理
+                if link_hash in processed_hashes:
+                    logger.info(f"已存在处理记录 {link}")
+                    continue
+                processed_hashes.add(link_hash)
+                jobs.append(PipelineJob(
+                    feed_name=feed_name,
+                    link=link,
+                    title=title,
+                    link_hash=link_hash,
+                    entry=entry,
+                    scan_history_id=scan_history_id,
+                    content={},
+                    stage=PENDING,
+                    status=None,
+                    fingerprint=None,
+                    duplicate_of=None
+                ))
+
+            except Exception as e:
+                logger.error(f"处理条目错误 {feed_name}: {str(e)}")
+                result["error"] += 1
+
+        # 保存工作列表，上次中断时未完成的条目从已完成的阶段继续
+        if self.checkpoints is not None:
+            self.checkpoints.register(jobs)
+        return jobs
+
+    def scan_entries(self, feed_name: str, entries: Iterable, high_water: Optional[Dict]) -> Tuple[List, Set[str]]:
+        """
+        按RSS源中的顺序查找可能未处理的条目
+
+        条目按发布时间从新到旧排列时分批查询，遇到上次扫描的最新条目或连续
+        consecutive_hits 个已处理条目即停止，之后的条目不再计算哈希与查询数据库；
+        首次扫描或顺序被打乱时查询全部条目。
+
+        Args:
+            entries: 条目列表，或流式解析产生的迭代器（停止迭代后不再读取剩余内容）
+
+        Returns:
+            Tuple[List, Set[str]]: ((条目, 链接哈希) 列表, 其中已处理的链接哈希)
+        """
+        def with_hash(entry):
+            link = entry.get('link')
+            return entry, get_link_hash(link) if link else None
+
+        high_water = high_water or {}
+        early_exit = self.early_exit is not None and bool(high_water.get('link_hash'))
+        if isinstance(entries, list):
+            if not early_exit or not self.is_ordered(entries, high_water.get('published')):
+                candidates = [with_hash(entry) for entry in entries]
+                # 一次查询取出本源所有已处理的链接
+                return candidates, self.database.get_processed_hashes(h for _, h in candidates if h)
+            total = len(entries)
+        else:
+            # 流式解析无法预先检查顺序，在读取过程中检查
+            total = '?'
+
+        window = self.early_exit['window'] if early_exit else FULL_SCAN_BATCH
+        candidates = []
+        processed_hashes = set()
+        hits = 0
+        last_time = None
+        iterator = iter(entries)
+        while True:
+            chunk = [with_hash(entry) for entry in islice(iterator, window)]
+            if not chunk:
+                return candidates, processed_hashes
+            processed_hashes |= self.database.get_processed_hashes(h for _, h in chunk if h)
+            for entry, link_hash in chunk:
+                candidates.append((entry, link_hash))
+                if not early_exit:
+                    continue
+
+                published = entry_timestamp(entry)
+                if published is not None:
+                    newest_published = high_water.get('published')
+                    if ((last_time is not None and published > last_time)
+                            or (last_time is None and newest_published and published < newest_published)):
+                        logger.info(f"RSS源 {feed_name} 条目顺序被打乱，检查全部条目")
+                        early_exit = False
+                        window = FULL_SCAN_BATCH
+                        continue
+                    last_time = published
+
+                if link_hash is not None and (link_hash == high_water['link_hash']
+                                              or (high_water.get('guid') and entry.get('id') == high_water['guid'])):
+                    logger.info(f"RSS源 {feed_name} 在第 {len(candidates)}/{total} 个条目处遇到上次的最新条目")
+                    return candidates, processed_hashes
+                hits = hits + 1 if link_hash in processed_hashes else 0
+                if hits >= self.early_exit['consecutive_hits']:
+                    logger.info(f"RSS源 {feed_name} 在第 {len(candidates)}/{total} 个条目处"
+                                f"连续遇到 {hits} 个已处理条目，提前结束")
+                    return candidates, processed_hashes
+
+    def scan_stream(self, feed_name: str, fetched: Dict) -> Tuple[feedparser.FeedParserDict, List, Set[str]]:
+        """
+        边下载边解析RSS源并查找可能未处理的条目，满足提前结束条件后不再读取剩余内容
+
+        Returns:
+            Tuple: (频道信息, (条目, 链接哈希) 列表, 其中已处理的链接哈希)
+
+        Raises:
+            xml.etree.ElementTree.ParseError: XML 格式错误
+        """
+        response = fetched.pop('response')
+        parser = StreamingFeedParser(
+            max_bytes=self.streaming['max_bytes'],
+            max_entries=self.streaming['max_entries'],
+            max_entry_bytes=self.streaming['max_entry_bytes']
+        )
+        try:
+            entries = parser.iter_entries(
+                response.iter_content(chunk_size=STREAM_CHUNK_SIZE),
+                content_type=fetched['headers'].get('content-type'),
+                preferred=fetched.get('encoding')
+            )
+            candidates, processed_hashes = self.scan_entries(feed_name, entries, fetched.get('high_water'))
+        finally:
+            response.close()
+
+        fetched['encoding'] = parser.encoding
+        fetched['content_length'] = parser.bytes_read
+        logger.info(f"流式解析RSS源 {feed_name} - 读取 {parser.bytes_read} 字节, 条目 {parser.entry_count}"
+                    f"{', 已达到上限' if parser.truncated else ''}")
+        return parser.feed, candidates, processed_hashes
+
+    @staticmethod
+    def is_ordered(entries: List, newest_published: Optional[float]) -> bool:
+        """判断条目是否按时间从新到旧排列，且最新条目不早于上次记录的最新条目"""
+        times = [t for t in map(entry_timestamp, entries) if t is not None]
+        if any(newer < older for newer, older in zip(times, times[1:])):
+            return False
+        return not (times and newest_published and times[0] < newest_published)
+
+    @staticmethod
+    def newest_entry(entries: List) -> Optional[Dict]:
+        """获取最新条目的标识，用作下次扫描的高水位标记"""
+        dated = [(entry_timestamp(e), i, e) for i, e in enumerate(entries) if e.get('link')]
+        if not dated:
+            return None
+        # 有时间信息时取最新的条目，否则取第一个条目
+        published, _, entry = max(dated, key=lambda d: (d[0] is not None, d[0] or 0, -d[1]))
+        return {'guid': entry.get('id'), 'link_hash': get_link_hash(entry.link), 'published': published}
+
+    def complete_feed(self, feed_name: str, feed_url: str, fetched: Dict, jobs: List[PipelineJob], result: Dict):
+        """汇总已完成任务的结果，全部成功时保存RSS源状态"""
+        for job in jobs:
+            metrics.increment(f"items_{job.status or 'failed'}", feed=feed_name)
+            if job.status in ('queued', 'duplicate'):
+                result["success"] += 1
+            else:
+                if job.error:
+                    logger.error(f"处理条目错误 {feed_name}: {job.error}")
+                result["error"] += 1
+
+        # 仅在全部条目处理完成后保存校验信息，确保出错的条目下次仍会重试
+        if result["error"] > 0:
+            # 清除高水位标记，下次完整检查所有条目，避免出错的条目被提前结束跳过
+            self.database.clear_feed_high_water(feed_url)
+        else:
+            self.database.save_feed_state(
+                feed_url,
+                etag=fetched['etag'],
+                last_modified=fetched['last_modified'],
+                content_hash=fetched['content_hash'],
+                content_length=fetched['content_length'],
+                encoding=fetched.get('encoding'),
+                newest=fetched.get('newest')
+            )
+
+    def convert_job(self, job: PipelineJob):
+        """流水线阶段：下载并转换内容，已从检查点恢复分析结果时跳过"""
+        if job.stage != PENDING:
+            return
+        with metrics.timer('convert', job.feed_name):
+            # 传入RSS条目，附件与 media 信息用于判断播客等非文章内容
+            content_type = self.content_processor.detect_content_type(job.link, job.entry)
+            job.content = self.content_processor.convert(job.link, job.entry, content_type) or {}
+        metrics.increment(f"content_{content_type.value}", feed=job.feed_name)
+
+    def fingerprint_job(self, job: PipelineJob):
+        """流水线阶段：计算正文指纹并查找近似重复的已处理内容"""
+        markdown_content = job.content.get('markdown_content')
+        if self.near_duplicates is None or not markdown_content:
+            return
+
+        with metrics.timer('fingerprint', job.feed_name):
+            job.fingerprint = self.near_duplicates.fingerprint(markdown_content.text_content)
+            if job.fingerprint is None:
+                return
+            match = self.near_duplicates.find(job.link_hash, job.fingerprint)
+        if match is None:
+            return
+
+        logger.info(f"近似重复内容 {job.link}，海明距离 {match['distance']}")
+        job.duplicate_of = match['link_hash']
+        if self.duplicate_action == 'reuse' and not match['pending']:
+            # 复用原条目的摘要，不再调用LLM；原条目仍在处理中或没有摘要时由分析阶段处理
+            self.reuse_analysis(job)
+
+    def reuse_analysis(self, job: PipelineJob) -> bool:
+        """使用原条目发件箱中的摘要作为分析结果，原条目不在发件箱中时返回 False"""
+        summary = self.database.get_outbox_description(job.duplicate_of)
+        if summary is None:
+            return False
+        job.content['analysis'] = {
+            'summary': summary, 'duplicate_of': job.duplicate_of, 'input_tokens': 0, 'output_tokens': 0
+        }
+        return True
+
+    def resolve_duplicate(self, job: PipelineJob):
+        """
+        近似重复条目的原条目仍在处理中时等待其完成
+
+        原条目入队后，跳过的条目保持重复状态，复用摘要的条目读取原条目的摘要；原条目处理失败时重新查找，
+        剩余副本中只有一个调用LLM。等待超时或原条目没有摘要时，复用摘要的条目改为单独分析。
+        """
+        if job.duplicate_of is None or job.content.get('analysis') is not None:
+            return
+        while True:
+            if not self.near_duplicates.wait(job.duplicate_of, DUPLICATE_WAIT_SECONDS):
+                match = None if self.duplicate_action == 'reuse' else {'link_hash': job.duplicate_of, 'pending': False}
+            else:
+                match = self.near_duplicates.find(job.link_hash, job.fingerprint, record_stats=False)
+            if match is None:
+                logger.info(f"近似重复的原条目未完成处理，单独分析 {job.link}")
+                job.duplicate_of = None
+                return
+            job.duplicate_of = match['link_hash']
+            if match['pending']:
+                continue
+            if self.duplicate_action == 'reuse' and not self.reuse_analysis(job):
+                logger.info(f"近似重复的原条目没有摘要，单独分析 {job.link}")
+                job.duplicate_of = None
+            return
+
+    def release_fingerprint(self, job: PipelineJob):
+        """条目处理失败时撤销预留的指纹，等待它的近似重复条目改为单独分析"""
+        if self.near_duplicates is not None and job.fingerprint is not None and job.duplicate_of is None:
+            self.near_duplicates.release(job.link_hash)
+
+    def analyze_job(self, job: PipelineJob):
+        """流水线阶段：LLM分析，近似重复或已从检查点恢复分析结果的条目跳过"""
+        if self.near_duplicates is not None:
+            self.resolve_duplicate(job)
+        if not self.needs_analysis(job):
+            return
+        try:
+            with metrics.timer('analyze', job.feed_name):
+                job.content = self.content_processor.analyze(job.content)
+        except Exception:
+            self.release_fingerprint(job)
+            raise
+        self.checkpoint(job, ANALYZED)
+
+    @staticmethod
+    def needs_analysis(job: PipelineJob) -> bool:
+        return job.duplicate_of is None and job.stage not in (ANALYZED, QUEUED)
+
+    def enqueue_job(self, job: PipelineJob):
+        """流水线阶段：写入推送发件箱并记录处理结果，实际推送由 DeliveryService 异步完成"""
+        try:
+            self._enqueue(job)
+        except Exception:
+            self.release_fingerprint(job)
+            raise
+
+    def _enqueue(self, job: PipelineJob):
+        # 近似重复的条目只记录，不推送
+        if job.duplicate_of is not None and self.duplicate_action == 'skip':
+            self.database.add_processed_item(
+                feed_name=job.feed_name,
+                item_link=job.link,
+                item_title=job.title,
+                link_hash=job.link_hash,
+                scan_history_id=job.scan_history_id,
+                status='duplicate',
+                error_message=f"近似重复: {job.duplicate_of}"
+            )
+            job.status = 'duplicate'
+            self.checkpoint(job, QUEUED)
+            return
+
+        # 安全获取 summary
+        analysis = job.content.get('analysis')
+        if not isinstance(analysis, dict):
+            analysis = {}
+        summary = analysis.get('summary', '')
+        # 如果 analysis 是 None 或没有 summary，summary 就是空字符串
+
+        # 先记录处理结果再写入发件箱：推送线程标记推送结果前会写入缓冲，更新时该记录一定存在
+        self.database.add_processed_item(
+            feed_name=job.feed_name,
+            item_link=job.link,
+            item_title=job.title,
+            link_hash=job.link_hash,
+            scan_history_id=job.scan_history_id,
+            status='queued',
+            input_tokens=analysis.get('input_tokens'),
+            output_tokens=analysis.get('output_tokens'),
+            summary=summary or None
+        )
+        self.database.enqueue_outbox(job.link_hash, job.feed_name, job.title, job.link, summary)
+        if job.fingerprint is not None and job.duplicate_of is None:
+            self.near_duplicates.add(job.link_hash, job.fingerprint)
+        job.status = 'queued'
+        self.checkpoint(job, QUEUED)
+        if self.delivery is not None:
+            self.delivery.notify()
+
+    def checkpoint(self, job: PipelineJob, stage: str):
+        """记录条目完成的阶段，进程中断后从该阶段继续"""
+        if self.checkpoints is not None:
+            self.checkpoints.save(job, stage)
+
+    def close(self):
+        """停止流水线工作线程"""
+        self.pipeline.stop()
+
     def process_entry(self, entry, feed_name: str, process_content: bool) -> Dict:
         """处理单个RSS条目"""
         analysis = {}
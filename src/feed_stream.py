@@ -0,0 +1,302 @@
+import codecs
+import logging
+import re
+import xml.etree.ElementTree as ET
+from html.entities import name2codepoint
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import feedparser
+from feedparser.datetimes import _parse_date
+
+from .utils import detect_encoding
+
+logger = logging.getLogger(__name__)
+
+# 用于确定编码的文件头字节数
+HEAD_BYTES = 4096
+
+# 条目元素（RSS 的 item，Atom 的 entry）
+ENTRY_TAGS = {'item', 'entry'}
+
+# 需要收集文本的条目字段
+ENTRY_TEXT_FIELDS = {'title', 'link', 'guid', 'id', 'pubDate', 'published', 'date', 'issued', 'updated', 'modified'}
+
+# 需要收集文本的频道字段（用于自适应轮询）
+CHANNEL_TEXT_FIELDS = {'title', 'ttl', 'updatePeriod', 'updateFrequency'}
+
+# XML 预定义实体以外的 HTML 命名实体改写为数字引用，expat 不认识这些实体
+_XML_ENTITIES = {'amp', 'lt', 'gt', 'quot', 'apos'}
+_ENTITY_RE = re.compile(r'&([A-Za-z][A-Za-z0-9]{1,31});')
+_CDATA_START = '<![CDATA['
+_CDATA_END = ']]>'
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _replace_entity(match) -> str:
+    name = match.group(1)
+    if name in _XML_ENTITIES or name not in name2codepoint:
+        return match.group(0)
+    return f'&#{name2codepoint[name]};'
+
+
+class _EntityRewriter:
+    """
+    分块改写 HTML 命名实体，跳过 CDATA 段（其中的文本按原样保留）
+
+    可能被块边界截断的实体、CDATA 起止标记留到下一块再处理。
+    """
+
+    def __init__(self):
+        self.in_cdata = False
+        self.pending = ''
+
+    def feed(self, text: str, final: bool = False) -> str:
+        text = self.pending + text
+        self.pending = ''
+        out = []
+        pos = 0
+        while pos < len(text):
+            if self.in_cdata:
+                end = text.find(_CDATA_END, pos)
+                if end == -1:
+                    stop = len(text) if final else max(pos, len(text) - len(_CDATA_END) + 1)
+                    out.append(text[pos:stop])
+                    self.pending = text[stop:]
+                    break
+                out.append(text[pos:end + len(_CDATA_END)])
+                pos = end + len(_CDATA_END)
+                self.in_cdata = False
+            else:
+                start = text.find(_CDATA_START, pos)
+                stop = len(text) if start == -1 else start
+                if start == -1 and not final:
+                    stop = self._safe_end(text, pos)
+                    self.pending = text[stop:]
+                out.append(_ENTITY_RE.sub(_replace_entity, text[pos:stop]))
+                if start == -1:
+                    break
+                pos = start
+                self.in_cdata = True
+        return ''.join(out)
+
+    @staticmethod
+    def _safe_end(text: str, pos: int) -> int:
+        """返回不会截断实体或 CDATA 起始标记的位置"""
+        stop = len(text)
+        cut = text.rfind('&', pos)
+        if cut != -1 and ';' not in text[cut:] and len(text) - cut < 34:
+            stop = cut
+        cut = text.rfind('<', pos)
+        if cut != -1 and _CDATA_START.startswith(text[cut:]):
+            stop = min(stop, cut)
+        return stop
+
+
+class _FeedTarget:
+    def __init__(self, max_entry_bytes: int):
+        """
+        ElementTree 解析目标，只保留条目的标识、标题、时间与附件信息
+
+        正文等其他内容在解析时直接丢弃，每个条目收集的文本不超过 max_entry_bytes 个字符。
+        """
+        self.max_entry_bytes = max_entry_bytes
+        self.channel: Dict[str, str] = {}
+        self.entries: List[feedparser.FeedParserDict] = []
+
+        self._entry: Optional[Dict] = None
+        self._entry_size = 0
+        self._field: Optional[str] = None
+        self._text: List[str] = []
+
+    def start(self, tag, attrib):
+        name = _local_name(tag)
+        if name in ENTRY_TAGS:
+            self._entry = {'links': [], 'enclosures': []}
+            self._entry_size = 0
+            self._field = None
+            return
+
+        if self._entry is None:
+            if name in CHANNEL_TEXT_FIELDS and name not in self.channel:
+                self._field = name
+                self._text = []
+            return
+
+        if name == 'link' and attrib.get('href'):
+            # Atom 链接
+            self._entry['links'].append(attrib)
+            if attrib.get('rel') == 'enclosure':
+                self._entry['enclosures'].append(attrib)
+        elif name == 'enclosure' and attrib.get('url'):
+            self._entry['enclosures'].append({**attrib, 'href': attrib['url']})
+        elif name == 'guid':
+            self._entry['guid_is_permalink'] = attrib.get('isPermaLink', 'true').lower() != 'false'
+
+        # 带 href 的 link（Atom 链接）没有文本，不作为 link 字段收集，避免占用其后的 RSS <link>
+        if name in ENTRY_TEXT_FIELDS and name not in self._entry and not (name == 'link' and attrib.get('href')):
+            self._field = name
+            self._text = []
+
+    def data(self, data):
+        if self._field is None:
+            return
+        if self._entry is not None:
+            remaining = self.max_entry_bytes - self._entry_size
+            if remaining <= 0:
+                return
+            data = data[:remaining]
+            self._entry_size += len(data)
+        self._text.append(data)
+
+    def end(self, tag):
+        name = _local_name(tag)
+        if self._entry is not None and name in ENTRY_TAGS:
+            self.entries.append(self._build_entry(self._entry))
+            self._entry = None
+            return
+
+        if self._field == name:
+            target = self._entry if self._entry is not None else self.channel
+            target[name] = ''.join(self._text).strip()
+            self._field = None
+            self._text = []
+
+    def close(self):
+        return None
+
+    @staticmethod
+    def _build_entry(raw: Dict) -> feedparser.FeedParserDict:
+        """转换为与 feedparser 条目字段一致的结构"""
+        entry = feedparser.FeedParserDict()
+        entry['title'] = raw.get('title', '')
+
+        link = raw.get('link')
+        if not link:
+            alternate = [l for l in raw['links'] if l.get('rel', 'alternate') == 'alternate']
+            if alternate:
+                link = alternate[0]['href']
+            elif raw.get('guid') and raw.get('guid_is_permalink', True):
+                link = raw['guid']
+        if link:
+            entry['link'] = link
+
+        guid = raw.get('guid') or raw.get('id')
+        if guid:
+            entry['id'] = guid
+
+        published = raw.get('pubDate') or raw.get('published') or raw.get('date') or raw.get('issued')
+        if published:
+            entry['published'] = published
+            entry['published_parsed'] = _parse_date(published)
+        updated = raw.get('updated') or raw.get('modified')
+        if updated:
+            entry['updated'] = updated
+            entry['updated_parsed'] = _parse_date(updated)
+
+        # feedparser 的 enclosures 由 rel 为 enclosure 的链接生成，直接赋值无法读取
+        entry['links'] = [
+            feedparser.FeedParserDict({'rel': 'alternate', **l}) for l in raw['links'] if l.get('rel') != 'enclosure'
+        ] + [
+            feedparser.FeedParserDict({**e, 'rel': 'enclosure'}) for e in raw['enclosures']
+        ]
+        return entry
+
+
+class StreamingFeedParser:
+    def __init__(self, max_bytes: int = 50 * 1024 * 1024, max_entries: int = 5000, max_entry_bytes: int = 65536):
+        """
+        增量解析RSS/Atom源，逐个产出条目
+
+        调用方停止迭代时不再读取剩余内容，内存占用与RSS源大小无关。
+
+        Args:
+            max_bytes: 最多读取的字节数（解压后）
+            max_entries: 最多产出的条目数
+            max_entry_bytes: 每个条目最多收集的文本字符数
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+
+        self.feed = feedparser.FeedParserDict()
+        self.encoding: Optional[str] = None
+        self.bytes_read = 0
+        self.entry_count = 0
+        self.truncated = False
+
+    def iter_entries(self, chunks: Iterable[bytes], content_type: Optional[str] = None,
+                     preferred: Optional[str] = None) -> Iterator[feedparser.FeedParserDict]:
+        """
+        Args:
+            chunks: 响应内容的字节块
+            content_type: HTTP Content-Type 头
+            preferred: 上次检测到的编码
+
+        Raises:
+            xml.etree.ElementTree.ParseError: XML 格式错误
+        """
+        target = _FeedTarget(self.max_entry_bytes)
+        # 输入统一转为utf-8，覆盖XML声明中的编码（expat 不支持多字节编码）
+        parser = ET.XMLParser(target=target, encoding='utf-8')
+        decoder = None
+        head = b''
+        rewriter = _EntityRewriter()
+
+        def feed(text: str, final: bool = False):
+            parser.feed(rewriter.feed(text, final).encode('utf-8'))
+
+        def drain():
+            self._update_feed(target.channel)
+            for entry in target.entries:
+                if self.entry_count >= self.max_entries:
+                    self.truncated = True
+                    return
+                self.entry_count += 1
+                yield entry
+            target.entries.clear()
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            self.bytes_read += len(chunk)
+            if self.bytes_read > self.max_bytes:
+                logger.warning(f"RSS源超过 {self.max_bytes} 字节，停止读取")
+                self.truncated = True
+                return
+
+            if decoder is None:
+                head += chunk
+                if len(head) < HEAD_BYTES:
+                    continue
+                chunk, head = head, b''
+                decoder = self._start(chunk, content_type, preferred)
+
+            feed(decoder.decode(chunk))
+            yield from drain()
+            if self.truncated:
+                return
+
+        if decoder is None:
+            decoder = self._start(head, content_type, preferred)
+            feed(decoder.decode(head))
+        feed(decoder.decode(b'', final=True), final=True)
+        parser.close()
+        yield from drain()
+
+    def _update_feed(self, channel: Dict[str, str]):
+        """频道信息使用与 feedparser 相同的字段名"""
+        for source, name in (('title', 'title'), ('ttl', 'ttl'),
+                             ('updatePeriod', 'sy_updateperiod'), ('updateFrequency', 'sy_updatefrequency')):
+            if source in channel:
+                self.feed[name] = channel[source]
+
+    def _start(self, head: bytes, content_type: Optional[str], preferred: Optional[str]):
+        """根据文件头确定编码，返回增量解码器"""
+        # 在 '>' 处截断再试探编码，避免截断多字节字符（'>' 不会出现在 UTF-8/GB18030 的后续字节中）
+        boundary = head.rfind(b'>')
+        sample = head[:boundary + 1] if boundary != -1 else head
+        self.encoding = detect_encoding(sample, content_type=content_type, preferred=preferred)
+        return codecs.getincrementaldecoder(self.encoding)(errors='replace')
@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List
+from urllib.parse import urlparse
+
+import requests
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def host_of(url: str) -> str:
+    """熔断按 主机:端口 区分"""
+    return urlparse(url).netloc.lower()
+
+
+class CircuitOpenError(requests.ConnectionError):
+    def __init__(self, host: str, retry_after: float):
+        """主机处于熔断状态，请求未发出"""
+        super().__init__(f"主机 {host} 熔断中，{retry_after:.0f} 秒后重试")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class HostHealth:
+    def __init__(self, database=None, failure_threshold: int = 5, error_rate: float = 0.5, min_requests: int = 10,
+                 window: int = 20, slow_seconds: float = 0, cooldown: float = 300, max_cooldown: float = 3600,
+                 slow_exempt: Iterable[str] = ()):
+        """
+        按主机记录请求延迟与错误率，连续失败或错误率过高时熔断
+
+        熔断期间该主机的请求直接失败，不再等待超时；冷却期结束后放行一个探测请求（半开），
+        成功则恢复，失败则以加倍的冷却期重新熔断。状态保存在数据库中，重启后继续生效。
+
+        Args:
+            database: 数据库实例，为空时不持久化
+            failure_threshold: 连续失败多少次后熔断
+            error_rate: 滚动错误率达到该值且请求数不少于 min_requests 时熔断
+            min_requests: 按错误率熔断前至少记录的请求数
+            window: 滚动统计（指数加权）相当的请求数
+            slow_seconds: 响应慢于该秒数的请求按失败计算，用于识别拖延连接的主机；0 表示不限
+            cooldown / max_cooldown: 首次熔断的冷却秒数与冷却期加倍的上限
+            slow_exempt: 不按 slow_seconds 判断的主机，例如响应本来就慢的LLM接口与推送接口
+        """
+        self.database = database
+        self.failure_threshold = max(1, failure_threshold)
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.alpha = 2 / (max(1, window) + 1)
+        self.slow_seconds = slow_seconds
+        self.slow_exempt = {host.lower() for host in slow_exempt if host}
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict] = {}
+        self._dirty = set()
+        self._skipped: Dict[str, int] = {}
+        if database is not None:
+            self._hosts = database.get_host_health()
+
+    def before_request(self, host: str):
+        """
+        请求前检查主机状态
+
+        Raises:
+            CircuitOpenError: 主机处于熔断状态，或半开状态下已有探测请求
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state['state'] == CLOSED:
+                return
+            now = time.time()
+            if state['state'] == OPEN and now >= state['opened_until']:
+                state['state'] = HALF_OPEN
+                state['probing'] = False
+                logger.info(f"主机 {host} 冷却期结束，放行探测请求")
+            if state['state'] == HALF_OPEN and not state.get('probing'):
+                state['probing'] = True
+                return
+            self._skipped[host] = self._skipped.get(host, 0) + 1
+            retry_after = max(0.0, state['opened_until'] - now)
+        metrics.increment('requests_skipped')
+        raise CircuitOpenError(host, retry_after)
+
+    def available(self, host: str) -> bool:
+        """主机是否可以发送请求（不改变状态）"""
+        with self._lock:
+            state = self._hosts.get(host)
+            return state is None or state['state'] != OPEN or time.time() >= state['opened_until']
+
+    def record(self, host: str, latency: float, ok: bool):
+        """
+        记录一次请求的结果
+
+        Args:
+            latency: 请求耗时（秒）
+            ok: 是否成功；网络错误、超时与 5xx 响应为失败
+        """
+        if ok and self.slow_seconds and latency > self.slow_seconds and host not in self.slow_exempt:
+            ok = False
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = {
+                    'state': CLOSED, 'requests': 0, 'consecutive_failures': 0, 'error_rate': 0.0,
+                    'latency': latency, 'opened_until': 0.0, 'cooldown': self.cooldown,
+                }
+            state['requests'] += 1
+            state['latency'] += (latency - state['latency']) * self.alpha
+            state['error_rate'] += ((0.0 if ok else 1.0) - state['error_rate']) * self.alpha
+            state['probing'] = False
+            self._dirty.add(host)
+
+            if ok:
+                state['consecutive_failures'] = 0
+                if state['state'] != CLOSED:
+                    logger.info(f"主机 {host} 探测成功，恢复请求")
+                    state.update(state=CLOSED, error_rate=0.0, cooldown=self.cooldown)
+                return
+
+            state['consecutive_failures'] += 1
+            if state['state'] == HALF_OPEN:
+                self._open(host, state, min(self.max_cooldown, state['cooldown'] * 2))
+            elif state['state'] == CLOSED and (
+                    state['consecutive_failures'] >= self.failure_threshold
+                    or (state['requests'] >= self.min_requests and state['error_rate'] >= self.error_rate)):
+                self._open(host, state, self.cooldown)
+
+    def release(self, host: str):
+        """请求被取消、没有结果时结束半开状态的探测"""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state['probing'] = False
+
+    def _open(self, host: str, state: Dict, cooldown: float):
+        state.update(state=OPEN, cooldown=cooldown, opened_until=time.time() + cooldown)
+        logger.warning(f"主机 {host} 熔断 {cooldown:.0f} 秒: 连续失败 {state['consecutive_failures']} 次, "
+                       f"错误率 {state['error_rate']:.2f}, 平均延迟 {state['latency']:.2f}s")
+        metrics.increment('circuit_opened')
+
+    def reset_scan(self):
+        with self._lock:
+            self._skipped.clear()
+
+    def scan_report(self) -> List[str]:
+        """本次扫描中因熔断跳过的请求，写入 scan_history.error_detail"""
+        with self._lock:
+            return [
+                f"主机 {host} 熔断（{self._hosts[host]['state']}，连续失败 "
+                f"{self._hosts[host]['consecutive_failures']} 次），跳过 {count} 个请求"
+                for host, count in sorted(self._skipped.items())
+            ]
+
+    def save(self):
+        """将有变化的主机状态写入数据库"""
+        if self.database is None:
+            return
+        with self._lock:
+            rows = [{'host': host, **self._hosts[host]} for host in self._dirty]
+            self._dirty.clear()
+        if rows:
+            self.database.save_host_health(rows)
+
+    def stats(self, limit: int = 5) -> Dict:
+        """熔断中的主机与平均延迟最高的几个主机"""
+        with self._lock:
+            hosts = dict(self._hosts)
+        slowest = sorted(hosts.items(), key=lambda item: item[1]['latency'], reverse=True)[:limit]
+        return {
+            'hosts': len(hosts),
+            'open': sorted(host for host, state in hosts.items() if state['state'] != CLOSED),
+            'slowest': {
+                host: {'latency': round(state['latency'], 3), 'error_rate': round(state['error_rate'], 3)}
+                for host, state in slowest
+            },
+        }
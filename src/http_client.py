@@ -1,30 +1,45 @@
+import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 import requests
 
-from .proxy import ProxyManager
+from .metrics import metrics
+from .transport import Transport
 
 logger = logging.getLogger(__name__)
 
 
 class HTTPClient:
-    def __init__(self, target_api: str, proxy_config: Optional[Dict] = None):
+    def __init__(self, target_api: str, proxy_config: Optional[Dict] = None, transport: Optional[Transport] = None):
         """
         初始化HTTP客户端
         
         Args:
             target_api: 目标API地址
-            proxy_config: 代理配置
+            proxy_config: 代理配置（未提供 transport 时使用）
+            transport: 共享的HTTP传输层
         """
         self.target_api = target_api
-        self.proxy_manager = ProxyManager(proxy_config)
+        self.transport = transport or Transport(proxy_config=proxy_config)
+        self.proxy_manager = self.transport.proxy_manager
         
-        # 创建session并配置代理
-        self.session = requests.Session()
-        self.session.proxies.update(self.proxy_manager.get_session_proxies())
+        # 共享连接池，代理按请求地址由传输层决定
+        self.session = self.transport.session
 
-    def send_item(self, title: str, url: str, description: str) -> bool:
+    @staticmethod
+    def build_payload(title: str, url: str, description: str) -> Dict[str, Any]:
+        """构建单个条目的推送请求体"""
+        return {
+            "type": "url",
+            "content": url,
+            "title": title,
+            "folder": "RSS",
+            "tags": [],
+            "description": description
+        }
+
+    def send_item(self, title: str, url: str, description: str, timeout: float = 10) -> bool:
         """
         发送处理后的内容到目标API
         
@@ -32,30 +47,52 @@ class HTTPClient:
             title: 文章标题
             url: 原始URL
             description: 描述
+            timeout: 请求超时（秒）
         """
 
         # 构建基础请求体
-        payload = {
-            "type": "url",
-            "content": url,
-            "title": title,
-            "folder": "RSS",
-            "tags": [],
-            "description": description
-        }
+        payload = self.build_payload(title, url, description)
 
         try:
-            response = self.session.post(
-                self.target_api,
-                json=payload,
-                timeout=10
-            )
-            response.raise_for_status()
+            with metrics.timer('deliver'):
+                response = self.session.post(
+                    self.target_api,
+                    json=payload,
+                    timeout=timeout
+                )
+                response.raise_for_status()
             return True
         except requests.RequestException as e:
             logger.error(f"发送失败: {str(e)}, URL: {url}")
             return False
 
+    def send_batch(self, payloads: List[Dict[str, Any]], mode: str = 'batch', timeout: float = 30) -> None:
+        """
+        在一个请求中发送多个条目
+
+        Args:
+            payloads: 由 build_payload 构建的请求体列表
+            mode: 'batch' 发送JSON数组，'ndjson' 每行一个JSON对象
+            timeout: 请求超时（秒）
+
+        Raises:
+            requests.RequestException: 发送失败
+        """
+        with metrics.timer('deliver'):
+            response = self.session.post(self.target_api, timeout=timeout, **self.batch_request_kwargs(payloads, mode))
+            response.raise_for_status()
+
+    @staticmethod
+    def batch_request_kwargs(payloads: List[Dict[str, Any]], mode: str) -> Dict[str, Any]:
+        """构建批量请求的请求体参数"""
+        if mode == 'ndjson':
+            data = '\n'.join(json.dumps(payload, ensure_ascii=False) for payload in payloads) + '\n'
+            return {
+                'data': data.encode('utf-8'),
+                'headers': {'Content-Type': 'application/x-ndjson'}
+            }
+        return {'json': payloads}
+
     def send_processed_item(self, title: str, link: str, analysis: Dict) -> bool:
         """发送处理后的RSS条目"""
         payload = {
@@ -89,18 +126,11 @@ class HTTPClient:
         Returns:
             Dict: 响应数据
         """
-        if not self.proxy_manager.should_use_proxy(self.target_api):
-            # 如果目标API不需要代理，临时禁用代理
-            original_proxies = self.session.proxies
-            self.session.proxies = {}
-            try:
-                response = self.session.post(self.target_api, json=data)
-                response.raise_for_status()
-                return response.json()
-            finally:
-                self.session.proxies = original_proxies
-        else:
-            # 使用配置的代理
-            response = self.session.post(self.target_api, json=data)
-            response.raise_for_status()
+        # 是否使用代理由传输层按 no_proxy 判断
+        response = self.session.post(self.target_api, json=data)
+        response.raise_for_status()
+        try:
             return response.json()
+        except ValueError:
+            # 目标API可能不返回JSON
+            return {}
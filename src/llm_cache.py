@@ -0,0 +1,78 @@
+import json
+import logging
+import threading
+from hashlib import blake2b
+from typing import Dict, Optional
+
+from .database import Database
+from .utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    def __init__(self, database: Database, max_entries: int = 50000, max_age_days: int = 30):
+        """
+        按内容寻址的LLM分析结果缓存
+
+        Args:
+            database: 数据库实例
+            max_entries: 最多保留的缓存条目数
+            max_age_days: 超过该天数未使用的条目会被清理
+        """
+        self.database = database
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(content: str, prompt: str, model: str, temperature) -> str:
+        """由规范化正文、提示词、模型和温度计算缓存键"""
+        digest = blake2b(digest_size=16)
+        for part in (normalize_text(content), prompt, model, str(temperature)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            cached = self.database.get_llm_cache(key)
+        except Exception as e:
+            logger.error(f"读取LLM缓存失败: {str(e)}")
+            cached = None
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(cached)
+
+    def put(self, key: str, model: str, result: Dict):
+        try:
+            self.database.save_llm_cache(key, model, json.dumps(result, ensure_ascii=False))
+        except Exception as e:
+            logger.error(f"写入LLM缓存失败: {str(e)}")
+
+    def evict(self) -> int:
+        """按时间和数量清理缓存"""
+        deleted = self.database.evict_llm_cache(self.max_entries, self.max_age_days)
+        if deleted:
+            logger.info(f"清理LLM缓存 {deleted} 条")
+        return deleted
+
+    def reset_stats(self):
+        """每次扫描开始时重置命中统计"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+from .host_health import CircuitOpenError
+from .transport import Transport
+from .utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 需要重试的HTTP状态码
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        """
+        令牌桶限流器
+
+        Args:
+            per_minute: 每分钟允许的令牌数，0 表示不限制
+        """
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: int = 1) -> float:
+        """
+        尝试获取令牌
+
+        Returns:
+            float: 0 表示已获取；否则为需要等待的秒数
+        """
+        if self.capacity <= 0:
+            return 0.0
+        # 单次请求超过桶容量时按容量计算，避免永远等待
+        amount = min(amount, self.capacity)
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def acquire(self, amount: int = 1):
+        """阻塞直到获得指定数量的令牌"""
+        while True:
+            wait = self.reserve(amount)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, amount: int = 1):
+        """异步等待直到获得指定数量的令牌"""
+        while True:
+            wait = self.reserve(amount)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class LLMClient:
+    def __init__(self, llm_config: Dict, transport: Optional[Transport] = None):
+        """
+        OpenAI 兼容接口的LLM客户端，带并发限制、限流与重试
+
+        Args:
+            llm_config: LLM配置，除 api_key/api_url/model 等外还支持：
+                max_concurrency: 同时进行的请求数
+                requests_per_minute / tokens_per_minute: 限流，0 表示不限制
+                timeout: 单次请求超时（秒）
+                max_retries: 429/5xx/网络错误的最大重试次数
+                retry_backoff: 重试退避的基础秒数
+            transport: 共享的HTTP传输层
+        """
+        self.llm_config = llm_config
+        self.max_concurrency = max(1, int(llm_config.get('max_concurrency', 4)))
+        self.timeout = float(llm_config.get('timeout', 120))
+        self.max_retries = int(llm_config.get('max_retries', 3))
+        self.retry_backoff = float(llm_config.get('retry_backoff', 2))
+
+        self.request_limiter = TokenBucket(int(llm_config.get('requests_per_minute', 0)))
+        self.token_limiter = TokenBucket(int(llm_config.get('tokens_per_minute', 0)))
+        self.semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        # 异步引擎使用的信号量，在事件循环中首次调用时创建
+        self._async_semaphore = None
+
+        self.session = (transport or Transport()).session
+        # 共享 Session 会访问其他主机，鉴权头只随LLM请求发送
+        self.headers = {
+            "Authorization": f"Bearer {llm_config.get('api_key', '')}",
+            "Content-Type": "application/json"
+        }
+
+    def chat(self, messages: List[Dict], max_tokens: Optional[int] = None) -> str:
+        """
+        发送对话请求并返回回复内容
+
+        Raises:
+            requests.RequestException: 重试耗尽后仍失败
+        """
+        payload, estimated = self._build_payload(messages, max_tokens)
+
+        for attempt in range(self.max_retries + 1):
+            self.request_limiter.acquire()
+            self.token_limiter.acquire(estimated)
+            try:
+                with self.semaphore:
+                    response = self.session.post(
+                        self.llm_config['api_url'],
+                        headers=self.headers,
+                        json=payload,
+                        timeout=self.timeout
+                    )
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    self._sleep_before_retry(attempt, response.headers.get('Retry-After'))
+                    logger.warning(f"LLM API返回 {response.status_code}，第 {attempt + 1} 次重试")
+                    continue
+                response.raise_for_status()
+                return response.json()['choices'][0]['message']['content']
+            except CircuitOpenError:
+                # 熔断中的主机不重试，等待冷却期结束
+                raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f"LLM API请求失败: {str(e)}，第 {attempt + 1} 次重试")
+                self._sleep_before_retry(attempt)
+
+        raise requests.RequestException("LLM API重试次数耗尽")
+
+    async def achat(self, messages: List[Dict], transport, max_tokens: Optional[int] = None) -> str:
+        """
+        chat 的异步版本，通过异步传输层发送请求
+
+        Args:
+            transport: 提供 request() 协程与 transient_errors 的异步传输层
+        """
+        payload, estimated = self._build_payload(messages, max_tokens)
+        if self._async_semaphore is None:
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        for attempt in range(self.max_retries + 1):
+            await self.request_limiter.acquire_async()
+            await self.token_limiter.acquire_async(estimated)
+            try:
+                async with self._async_semaphore:
+                    response = await transport.request(
+                        'POST',
+                        self.llm_config['api_url'],
+                        headers=self.headers,
+                        json=payload,
+                        timeout=self.timeout
+                    )
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    await asyncio.sleep(self._retry_delay(attempt, response.headers.get('Retry-After')))
+                    logger.warning(f"LLM API返回 {response.status_code}，第 {attempt + 1} 次重试")
+                    continue
+                response.raise_for_status()
+                return response.json()['choices'][0]['message']['content']
+            except transport.transient_errors as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f"LLM API请求失败: {str(e)}，第 {attempt + 1} 次重试")
+                await asyncio.sleep(self._retry_delay(attempt))
+
+        raise requests.RequestException("LLM API重试次数耗尽")
+
+    def _build_payload(self, messages: List[Dict], max_tokens: Optional[int]):
+        """构建请求体并估算本次请求计入TPM的token数"""
+        max_tokens = max_tokens or self.llm_config.get('max_tokens', 8000)
+        payload = {
+            "model": self.llm_config['model'],
+            "messages": messages,
+            "temperature": self.llm_config.get('temperature', 0.1),
+            "max_tokens": max_tokens
+        }
+        # 提供商按提示词加最大输出计算TPM
+        estimated = sum(estimate_tokens(m.get('content', '')) for m in messages) + max_tokens
+        return payload, estimated
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """按指数退避加随机抖动计算等待时间，优先遵循 Retry-After"""
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        return min(delay, 60)
+
+    def _sleep_before_retry(self, attempt: int, retry_after: Optional[str] = None):
+        time.sleep(self._retry_delay(attempt, retry_after))
@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 耗时直方图的桶上界（秒）
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        # counts[i] 为落入第 i 个桶的次数，最后一项为超过所有桶上界的次数
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """按桶估算分位数，返回所在桶的上界（超过所有桶时返回最大值）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'total_seconds': round(self.sum, 3),
+            'avg_seconds': round(self.sum / self.count, 3) if self.count else 0.0,
+            'p95_seconds': self.quantile(0.95),
+            'max_seconds': round(self.max, 3),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        """
+        按阶段和RSS源统计耗时直方图与事件计数
+
+        累计值用于 Prometheus 端点；每次扫描的汇总在扫描开始时重置，结束时写入 scan_history。
+        """
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._scan_histograms: Dict[str, Histogram] = {}
+        self._scan_counters: Dict[str, float] = {}
+
+    def observe(self, stage: str, seconds: float, feed: str = ''):
+        with self._lock:
+            key = (stage, feed or '')
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(seconds)
+            if stage not in self._scan_histograms:
+                self._scan_histograms[stage] = Histogram()
+            self._scan_histograms[stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str, feed: str = ''):
+        """统计代码块耗时，异常时同样计入"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, feed)
+
+    def increment(self, event: str, amount: float = 1, feed: str = ''):
+        with self._lock:
+            key = (event, feed or '')
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._scan_counters[event] = self._scan_counters.get(event, 0) + amount
+
+    def reset_scan(self):
+        with self._lock:
+            self._scan_histograms.clear()
+            self._scan_counters.clear()
+
+    def scan_summary(self) -> Dict:
+        """本次扫描各阶段的耗时汇总与事件计数"""
+        with self._lock:
+            return {
+                'stages': {stage: h.summary() for stage, h in sorted(self._scan_histograms.items())},
+                'events': dict(sorted(self._scan_counters.items())),
+            }
+
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式输出累计指标"""
+        lines = [
+            '# HELP crss_stage_seconds Time spent in each processing stage.',
+            '# TYPE crss_stage_seconds histogram',
+        ]
+        with self._lock:
+            for (stage, feed), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{_escape(stage)}",feed="{_escape(feed)}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'crss_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'crss_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'crss_stage_seconds_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'crss_stage_seconds_count{{{labels}}} {histogram.count}')
+
+            lines.append('# HELP crss_events_total Number of processing events.')
+            lines.append('# TYPE crss_events_total counter')
+            for (event, feed), value in sorted(self._counters.items()):
+                lines.append(f'crss_events_total{{event="{_escape(event)}",feed="{_escape(feed)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# 全局指标，各模块直接引用
+metrics = Metrics()
+
+
+class MetricsServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 9108, registry: Optional[Metrics] = None):
+        """
+        在后台线程中提供 Prometheus 文本格式的 /metrics 端点
+
+        Args:
+            host: 监听地址，默认只监听本机
+            port: 监听端口，0 表示随机端口
+            registry: 指标实例，默认使用全局指标
+        """
+        registry = registry or metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True)
+        self.thread.start()
+        logger.info(f"指标端点已启动: http://{self.server.server_address[0]}:{self.port}/metrics")
+
+    def stop(self):
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server.server_close()
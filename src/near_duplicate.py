@@ -0,0 +1,170 @@
+import logging
+import re
+import threading
+from collections import Counter
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+
+from .database import Database
+from .text_budget import clean_markdown
+from .utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+SIMHASH_BITS = 64
+
+# 中日韩文字逐字切分，其他文字按单词切分
+_TOKEN_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[^\W_]+')
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize_text(text).lower())
+
+
+def simhash(tokens: List[str], shingle_size: int = 3) -> int:
+    """计算按词组（shingle）出现次数加权的64位 SimHash"""
+    shingles = Counter(
+        ' '.join(tokens[i:i + shingle_size]) for i in range(max(1, len(tokens) - shingle_size + 1))
+    )
+    weights = [0] * SIMHASH_BITS
+    for shingle, count in shingles.items():
+        value = int.from_bytes(blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            if value >> bit & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def to_signed(value: int) -> int:
+    """转换为有符号64位整数以存入 SQLite"""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << SIMHASH_BITS) if value < 0 else value
+
+
+class NearDuplicateIndex:
+    def __init__(self, database: Database, max_distance: int = 3, max_age_days: int = 30,
+                 min_tokens: int = 50, shingle_size: int = 3):
+        """
+        基于 SimHash 与分段 LSH 的近似重复内容索引
+
+        64位指纹被切分为 max_distance + 1 段，海明距离不超过 max_distance 的两个指纹
+        至少有一段完全相同，因此只需按段查询候选再计算距离。
+
+        Args:
+            database: 数据库实例，指纹与分段持久化在其中
+            max_distance: 判定为近似重复的最大海明距离
+            max_age_days: 超过该天数的指纹会被清理
+            min_tokens: 正文少于该词数时不计算指纹，短文本的指纹不可靠
+            shingle_size: 每个词组包含的词数
+        """
+        self.database = database
+        self.max_distance = max(0, min(int(max_distance), 15))
+        self.max_age_days = max_age_days
+        self.min_tokens = min_tokens
+        self.shingle_size = shingle_size
+
+        self.bands = self.max_distance + 1
+        self.band_bits = SIMHASH_BITS // self.bands
+        self._lock = threading.Lock()
+        # 已通过检查、尚未写入数据库的指纹 {link_hash: (指纹, 写入或撤销时触发的事件)}
+        self._pending: Dict[str, Tuple[int, threading.Event]] = {}
+        self._reserve_lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+
+    def fingerprint(self, text: str) -> Optional[int]:
+        """计算正文指纹，正文过短时返回 None"""
+        tokens = tokenize(clean_markdown(text))
+        if len(tokens) < self.min_tokens:
+            return None
+        return simhash(tokens, self.shingle_size)
+
+    def band_keys(self, fingerprint: int) -> List[Tuple[int, int]]:
+        """
+        计算指纹的各段 (段标识, 段值)
+
+        段标识包含分段数，修改 max_distance 后旧分段不会与新分段混淆。
+        """
+        mask = (1 << self.band_bits) - 1
+        return [
+            (self.bands * 100 + band, fingerprint >> (band * self.band_bits) & mask)
+            for band in range(self.bands)
+        ]
+
+    def find(self, link_hash: str, fingerprint: int, record_stats: bool = True) -> Optional[Dict]:
+        """
+        查找与指纹近似的已收录或处理中的内容，没有时预留该指纹
+
+        预留的指纹在 add 时写入数据库，在 release 时撤销。同一次扫描中同一篇文章的多个副本
+        只有第一个通过检查，其余的不会再调用LLM。原条目处理完成后重新检查时 record_stats 为 False，不重复计数。
+
+        Returns:
+            Optional[Dict]: 最接近的内容 {'link_hash', 'distance', 'pending'}，pending 表示该内容仍在处理中；
+            没有时返回 None
+        """
+        with self._reserve_lock:
+            candidates = [(h, to_unsigned(c), False)
+                          for h, c in self.database.find_fingerprint_candidates(self.band_keys(fingerprint))]
+            candidates += [(h, c, True) for h, (c, _) in self._pending.items()]
+            best = None
+            for candidate_hash, candidate, pending in candidates:
+                if candidate_hash == link_hash:
+                    continue
+                distance = hamming_distance(fingerprint, candidate)
+                if distance <= self.max_distance and (best is None or distance < best['distance']):
+                    best = {'link_hash': candidate_hash, 'distance': distance, 'pending': pending}
+            if best is None:
+                self._pending[link_hash] = (fingerprint, threading.Event())
+
+        if record_stats:
+            with self._lock:
+                self.checked += 1
+                self.duplicates += best is not None
+        return best
+
+    def add(self, link_hash: str, fingerprint: int):
+        """写入指纹并结束预留"""
+        try:
+            self.database.save_fingerprint(link_hash, to_signed(fingerprint), self.band_keys(fingerprint))
+        except Exception as e:
+            logger.error(f"写入内容指纹失败: {str(e)}")
+        finally:
+            self.release(link_hash)
+
+    def release(self, link_hash: str):
+        """结束指纹预留；条目处理失败时调用，之后的副本不再视为该条目的重复"""
+        with self._reserve_lock:
+            reserved = self._pending.pop(link_hash, None)
+        if reserved is not None:
+            reserved[1].set()
+
+    def wait(self, link_hash: str, timeout: float) -> bool:
+        """等待处理中的条目写入或撤销指纹，超时返回 False"""
+        with self._reserve_lock:
+            reserved = self._pending.get(link_hash)
+        return reserved is None or reserved[1].wait(timeout)
+
+    def evict(self) -> int:
+        """清理超过 max_age_days 的指纹"""
+        deleted = self.database.evict_fingerprints(self.max_age_days)
+        if deleted:
+            logger.info(f"清理内容指纹 {deleted} 条")
+        return deleted
+
+    def reset_stats(self):
+        with self._lock:
+            self.checked = 0
+            self.duplicates = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'checked': self.checked, 'duplicates': self.duplicates}
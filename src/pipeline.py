@@ -0,0 +1,146 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 通知工作线程退出的哨兵
+_STOP = object()
+
+
+class PipelineJob:
+    def __init__(self, **fields):
+        """
+        在流水线各阶段之间传递的任务
+
+        各阶段通过属性读写数据；error 不为空时后续阶段不再处理该任务。
+        """
+        self.__dict__.update(fields)
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+
+    def mark_done(self):
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+
+class PipelineStage:
+    def __init__(self, name: str, func: Callable[[PipelineJob], None], workers: int, queue_size: int):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        # 有界队列：下游处理不过来时阻塞上游，形成背压
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.next_stage: Optional['PipelineStage'] = None
+        self.threads: List[threading.Thread] = []
+
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'{self.name}-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is _STOP:
+                break
+
+            if job.error is None:
+                start = time.monotonic()
+                try:
+                    self.func(job)
+                except Exception as e:
+                    logger.error(f"流水线阶段 {self.name} 处理失败: {str(e)}")
+                    job.error = f"{self.name}: {str(e)}"
+                elapsed = time.monotonic() - start
+                with self._lock:
+                    self.processed += 1
+                    self.failed += job.error is not None
+                    self.busy_seconds += elapsed
+
+            if self.next_stage is not None:
+                self.next_stage.queue.put(job)
+            else:
+                job.mark_done()
+
+    def reset_stats(self):
+        with self._lock:
+            self.processed = 0
+            self.failed = 0
+            self.busy_seconds = 0.0
+
+    def stats(self, elapsed: float) -> Dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'processed': self.processed,
+                'failed': self.failed,
+                'queued': self.queue.qsize(),
+                'avg_seconds': round(self.busy_seconds / self.processed, 3) if self.processed else 0.0,
+                'items_per_second': round(self.processed / elapsed, 3) if elapsed > 0 else 0.0,
+            }
+
+
+class Pipeline:
+    def __init__(self, stages: List[Tuple[str, Callable[[PipelineJob], None], int]], queue_size: int = 100):
+        """
+        由有界队列连接的多阶段流水线，每个阶段有独立的工作线程
+
+        Args:
+            stages: (阶段名, 处理函数, 线程数) 列表，处理函数原地修改任务
+            queue_size: 每个阶段输入队列的容量
+        """
+        self.stages = [PipelineStage(name, func, workers, queue_size) for name, func, workers in stages]
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next_stage = next_stage
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._stats_since = time.monotonic()
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            for stage in self.stages:
+                stage.start()
+            self._started = True
+
+    def submit(self, job: PipelineJob):
+        """提交任务，第一个阶段队列已满时阻塞"""
+        self.start()
+        self.stages[0].queue.put(job)
+
+    def stop(self):
+        """逐个阶段停止工作线程，已提交的任务会先处理完"""
+        if not self._started:
+            return
+        for stage in self.stages:
+            for _ in stage.threads:
+                stage.queue.put(_STOP)
+            for thread in stage.threads:
+                thread.join()
+            stage.threads.clear()
+        self._started = False
+
+    def reset_stats(self):
+        self._stats_since = time.monotonic()
+        for stage in self.stages:
+            stage.reset_stats()
+
+    def stats(self) -> Dict[str, Dict]:
+        elapsed = time.monotonic() - self._stats_since
+        return {stage.name: stage.stats(elapsed) for stage in self.stages}
+
+    def log_stats(self):
+        for name, stats in self.stats().items():
+            logger.info(f"流水线阶段 {name}: {stats}")
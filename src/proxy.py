@@ -1,4 +1,3 @@
-import os
 from typing import Dict, Optional, List
 from urllib.parse import urlparse
 
@@ -17,17 +16,6 @@ class ProxyManager:
             }
         """
         self.proxy_config = proxy_config or {}
-        self._setup_proxy_env()
-    
-    def _setup_proxy_env(self):
-        """设置系统环境变量中的代理"""
-        if self.proxy_config:
-            if 'http' in self.proxy_config:
-                os.environ['HTTP_PROXY'] = self.proxy_config['http']
-            if 'https' in self.proxy_config:
-                os.environ['HTTPS_PROXY'] = self.proxy_config['https']
-            if 'no_proxy' in self.proxy_config:
-                os.environ['NO_PROXY'] = ','.join(self.proxy_config['no_proxy'])
     
     def get_session_proxies(self) -> Dict[str, str]:
         """获取用于requests.Session的代理配置"""
@@ -39,6 +27,14 @@ class ProxyManager:
                 proxies['https'] = self.proxy_config['https']
         return proxies
     
+    def get_request_proxies(self, url: str) -> Dict[str, str]:
+        """
+        获取单个请求使用的代理配置，no_proxy 中的主机直连
+        """
+        if not self.should_use_proxy(url):
+            return {}
+        return self.get_session_proxies()
+
     def should_use_proxy(self, url: str) -> bool:
         """
         判断给定URL是否应该使用代理
@@ -0,0 +1,189 @@
+import heapq
+import logging
+import random
+import statistics
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .database import Database
+from .utils import entry_timestamp
+
+logger = logging.getLogger(__name__)
+
+# sy:updatePeriod 对应的秒数
+UPDATE_PERIOD_SECONDS = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 7 * 86400,
+    'monthly': 30 * 86400,
+    'yearly': 365 * 86400,
+}
+
+# 估算发布间隔时最多使用的条目数
+MAX_SAMPLE_ENTRIES = 20
+
+# 退避次数上限，间隔最终受 max_interval 限制
+MAX_BACKOFF_STEPS = 20
+
+
+def extract_schedule_hints(channel, entries) -> Dict:
+    """
+    从RSS源的频道信息与条目中提取轮询提示
+
+    Returns:
+        Dict: entry_times 为条目发布/更新时间戳（秒，新的在前），
+        hint_interval 为 <ttl> 或 sy:updatePeriod/sy:updateFrequency 给出的最小轮询间隔（秒）
+    """
+    entry_times = [t for t in map(entry_timestamp, entries) if t is not None]
+    entry_times.sort(reverse=True)
+
+    hint_interval = None
+    try:
+        if channel.get('ttl'):
+            hint_interval = int(channel['ttl']) * 60
+        period = UPDATE_PERIOD_SECONDS.get(str(channel.get('sy_updateperiod', '')).strip().lower())
+        if period:
+            frequency = max(1, int(channel.get('sy_updatefrequency') or 1))
+            hint_interval = max(hint_interval or 0, period / frequency)
+    except (TypeError, ValueError):
+        logger.warning(f"无法解析RSS源的更新频率提示: ttl={channel.get('ttl')}, "
+                       f"updatePeriod={channel.get('sy_updateperiod')}")
+
+    return {'entry_times': entry_times[:MAX_SAMPLE_ENTRIES], 'hint_interval': hint_interval}
+
+
+def estimate_publish_interval(entry_times: List[float], now: float) -> Optional[float]:
+    """
+    根据条目时间估算发布间隔（秒）
+
+    取相邻条目间隔的中位数；最新条目距今已超过该间隔时，以距今时间为准，
+    使停更的RSS源逐渐降低轮询频率。
+    """
+    if not entry_times:
+        return None
+    gaps = [a - b for a, b in zip(entry_times, entry_times[1:]) if a > b]
+    since_newest = max(0.0, now - entry_times[0])
+    if not gaps:
+        return since_newest or None
+    return max(statistics.median(gaps), since_newest)
+
+
+class FeedScheduler:
+    def __init__(self, database: Database, schedule_config: Dict):
+        """
+        按RSS源发布频率自适应调整轮询间隔的调度器
+
+        每个RSS源的下次检查时间保存在优先队列中，轮询状态持久化到数据库，
+        重启后不会立即重新抓取所有RSS源。
+
+        Args:
+            schedule_config: 调度配置，支持：
+                min_interval_minutes / max_interval_minutes: 轮询间隔上下限
+                default_interval_minutes: 无法估算发布频率时的轮询间隔
+                publish_factor: 轮询间隔相对发布间隔的比例
+                unchanged_backoff: 连续未更新时每次间隔放大的倍数
+                failure_backoff: 连续失败时每次间隔放大的倍数
+        """
+        self.database = database
+        self.min_interval = float(schedule_config.get('min_interval_minutes', 15)) * 60
+        self.max_interval = float(schedule_config.get('max_interval_minutes', 1440)) * 60
+        self.default_interval = float(schedule_config.get('default_interval_minutes', 60)) * 60
+        self.publish_factor = float(schedule_config.get('publish_factor', 0.5))
+        self.unchanged_backoff = float(schedule_config.get('unchanged_backoff', 1.5))
+        self.failure_backoff = float(schedule_config.get('failure_backoff', 2.0))
+
+        self._lock = threading.Lock()
+        self._heap: List = []
+        self._feeds: Dict[str, Dict] = {}
+        self._states: Dict[str, Dict] = {}
+
+    def sync(self, feeds: List[Dict]):
+        """按当前配置的RSS源重建优先队列，新增的RSS源立即到期"""
+        states = self.database.get_feed_schedules()
+        now = time.time()
+        with self._lock:
+            self._feeds = {feed['url']: feed for feed in feeds}
+            self._states = {url: states.get(url) or {'feed_url': url, 'next_check_at': now}
+                            for url in self._feeds}
+            self._heap = [(state['next_check_at'], url) for url, state in self._states.items()]
+            heapq.heapify(self._heap)
+
+    def due(self, now: Optional[float] = None) -> List[Dict]:
+        """取出所有已到期的RSS源"""
+        now = time.time() if now is None else now
+        feeds = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                next_check_at, url = heapq.heappop(self._heap)
+                state = self._states.get(url)
+                # 跳过已从配置中移除或已重新调度的过期条目
+                if state is None or state['next_check_at'] != next_check_at:
+                    continue
+                feeds.append(self._feeds[url])
+        return feeds
+
+    def seconds_until_due(self, now: Optional[float] = None) -> Optional[float]:
+        """距离最早到期的RSS源的秒数，没有RSS源时返回 None"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - now)
+
+    def record(self, feed: Dict, result: Dict, now: Optional[float] = None):
+        """
+        根据一次扫描的结果计算RSS源的下次检查时间
+
+        result 中的 status 为 updated / unchanged / failed，
+        schedule_hints 为 extract_schedule_hints 的结果。
+        """
+        now = time.time() if now is None else now
+        url = feed['url']
+        with self._lock:
+            state = dict(self._states.get(url) or {'feed_url': url})
+
+        status = result.get('status', 'failed')
+        hints = result.get('schedule_hints') or {}
+        estimate = estimate_publish_interval(hints.get('entry_times', []), now)
+        if estimate is not None:
+            previous = state.get('publish_interval')
+            # 指数平滑，避免单次异常间隔造成大幅波动
+            state['publish_interval'] = estimate if not previous else 0.5 * previous + 0.5 * estimate
+        if 'hint_interval' in hints:
+            state['hint_interval'] = hints['hint_interval']
+
+        if status == 'failed':
+            state['failure_count'] = (state.get('failure_count') or 0) + 1
+        elif status == 'unchanged':
+            state['failure_count'] = 0
+            state['unchanged_count'] = (state.get('unchanged_count') or 0) + 1
+        else:
+            state['failure_count'] = 0
+            state['unchanged_count'] = 0
+
+        interval = self.compute_interval(state)
+        state['poll_interval'] = interval
+        state['last_checked_at'] = now
+        # 加入少量抖动，避免大量RSS源在同一时刻到期
+        state['next_check_at'] = now + interval * random.uniform(0.9, 1.1)
+        self.database.save_feed_schedule(state)
+
+        with self._lock:
+            if url in self._feeds:
+                self._states[url] = state
+                heapq.heappush(self._heap, (state['next_check_at'], url))
+        logger.info(f"RSS源 {feed.get('name', url)} 状态 {status}，"
+                    f"下次检查间隔 {interval / 60:.1f} 分钟")
+
+    def compute_interval(self, state: Dict) -> float:
+        """按发布间隔、更新频率提示与退避次数计算轮询间隔（秒）"""
+        if state.get('publish_interval'):
+            interval = state['publish_interval'] * self.publish_factor
+        else:
+            interval = self.default_interval
+        # 不比RSS源声明的更新频率更频繁
+        interval = max(interval, state.get('hint_interval') or 0)
+        interval *= self.unchanged_backoff ** min(state.get('unchanged_count') or 0, MAX_BACKOFF_STEPS)
+        interval *= self.failure_backoff ** min(state.get('failure_count') or 0, MAX_BACKOFF_STEPS)
+        return min(self.max_interval, max(self.min_interval, interval))
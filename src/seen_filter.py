@@ -0,0 +1,106 @@
+import math
+import sys
+import threading
+from typing import Dict, Iterable
+
+
+class SeenFilter:
+    def __init__(self, mode: str = 'bloom', capacity: int = 100000, false_positive_rate: float = 0.001):
+        """
+        已处理链接的内存成员过滤器
+
+        Args:
+            mode: 'set' 为精确哈希集合；'bloom' 为布隆过滤器（可能误判存在，但不会漏判）
+            capacity: 布隆过滤器的初始容量，超出时自动扩容
+            false_positive_rate: 布隆过滤器的目标误判率
+        """
+        if mode not in ('set', 'bloom'):
+            raise ValueError(f"不支持的过滤器类型: {mode}")
+        self.mode = mode
+        self.false_positive_rate = false_positive_rate
+        self._lock = threading.Lock()
+        self._count = 0
+
+        # 统计信息
+        self.negatives = 0
+        self.probable_hits = 0
+        self.false_positives = 0
+
+        if mode == 'set':
+            self._items = set()
+        else:
+            self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        """按容量和误判率分配位数组"""
+        self.capacity = max(1000, capacity)
+        self._num_bits = int(-self.capacity * math.log(self.false_positive_rate) / (math.log(2) ** 2))
+        self._num_hashes = max(1, round(self._num_bits / self.capacity * math.log(2)))
+        self._bits = bytearray((self._num_bits + 7) // 8)
+
+    def _positions(self, link_hash: str):
+        # link_hash 已是均匀分布的摘要，直接拆分为两个整数做双重哈希
+        h1 = int(link_hash[:16], 16)
+        h2 = int(link_hash[16:32], 16) | 1
+        return [(h1 + i * h2) % self._num_bits for i in range(self._num_hashes)]
+
+    @property
+    def exact(self) -> bool:
+        """精确集合的命中无需再查询数据库确认"""
+        return self.mode == 'set'
+
+    def needs_rebuild(self) -> bool:
+        """布隆过滤器元素数超出容量后误判率会上升，需要扩容重建"""
+        return self.mode == 'bloom' and self._count > self.capacity
+
+    def inherit_stats(self, other: 'SeenFilter'):
+        """扩容重建时沿用旧过滤器的统计计数"""
+        self.negatives = other.negatives
+        self.probable_hits = other.probable_hits
+        self.false_positives = other.false_positives
+
+    def add(self, link_hash: str):
+        with self._lock:
+            self._count += 1
+            if self.mode == 'set':
+                self._items.add(link_hash)
+                return
+            for pos in self._positions(link_hash):
+                self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def update(self, link_hashes: Iterable[str]):
+        for link_hash in link_hashes:
+            self.add(link_hash)
+
+    def might_contain(self, link_hash: str) -> bool:
+        """返回 False 时链接一定未处理；返回 True 时需要查询数据库确认"""
+        if self.mode == 'set':
+            found = link_hash in self._items
+        else:
+            found = all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(link_hash))
+        if found:
+            self.probable_hits += 1
+        else:
+            self.negatives += 1
+        return found
+
+    def record_false_positive(self, count: int = 1):
+        self.false_positives += count
+
+    @property
+    def memory_bytes(self) -> int:
+        """估算过滤器占用的内存"""
+        if self.mode == 'bloom':
+            return sys.getsizeof(self._bits)
+        # 哈希集合本身加上每个32位十六进制字符串
+        return sys.getsizeof(self._items) + len(self._items) * sys.getsizeof('0' * 32)
+
+    def stats(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'items': self._count,
+            'memory_bytes': self.memory_bytes,
+            'negatives': self.negatives,
+            'probable_hits': self.probable_hits,
+            'false_positives': self.false_positives,
+        }
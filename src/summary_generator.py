@@ -0,0 +1,225 @@
+import logging
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from .content_processor import SYSTEM_PROMPT, ContentProcessor
+from .database import Database
+from .text_budget import truncate_to_tokens
+from .utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+NO_ARTICLES = "今天没有新的文章。"
+
+DIGEST_PROMPT = ("以下是某个RSS源今天的文章要点列表，请在保留每篇文章标题和核心信息的前提下合并压缩，"
+                 "输出不超过{limit}字的要点列表：")
+
+PARTIAL_PROMPT = "以下是今天部分RSS源的文章要点，请归纳其中的主要话题和重要信息，不超过{limit}字："
+
+DAILY_PROMPT = ("作为一名资深编辑，根据以下今天各RSS源的文章要点撰写每日摘要：\n"
+                "1. 今日要闻（3～5条，每条一句话）\n"
+                "2. 按话题归类的其他值得关注的内容\n"
+                "3. 最值得阅读全文的 1～3 篇文章及理由")
+
+# 条目摘要中用作要点的首行，去掉序号和“核心摘要”等前缀
+_LEADING_LABEL_RE = re.compile(r'^\s*(?:[#>*\-]+\s*)?(?:\d+[.、)]\s*)?(?:\**[^：:\n]{0,12}摘要\**\s*[：:]\s*)?')
+
+# 每篇文章要点的最大字符数
+ITEM_POINT_CHARS = 200
+
+
+def item_point(title: str, summary: str) -> str:
+    """取条目摘要的第一行作为要点"""
+    first_line = ''
+    for line in (summary or '').splitlines():
+        line = _LEADING_LABEL_RE.sub('', line).strip(' *')
+        if line:
+            first_line = line
+            break
+    return f"- {title}：{first_line[:ITEM_POINT_CHARS]}" if first_line else f"- {title}"
+
+
+class SummaryGenerator:
+    def __init__(self, content_processor: ContentProcessor, database: Database, llm_config: Optional[Dict] = None,
+                 summary_config: Optional[Dict] = None):
+        """
+        基于已保存的条目分析结果增量生成每日摘要
+
+        条目入库后按RSS源追加到当天的要点中，要点过长时才调用LLM压缩；生成每日摘要时
+        将各RSS源的要点按上下文窗口分组逐层合并，只需少量LLM调用，不再重新抓取和分析文章。
+
+        Args:
+            content_processor: 内容处理器，使用其LLM客户端
+            database: 数据库实例
+            llm_config: LLM配置，用于计算上下文窗口预算
+            summary_config: 每日摘要配置，支持：
+                digest_tokens: 每个RSS源要点的token上限，超出时调用LLM压缩
+                max_tokens: 每日摘要及中间合并结果的最大输出token数
+        """
+        self.content_processor = content_processor
+        self.database = database
+        self.llm_config = llm_config or content_processor.llm_config
+        summary_config = summary_config or {}
+        self.digest_tokens = int(summary_config.get('digest_tokens', 1500))
+        self.max_tokens = int(summary_config.get('max_tokens', 2000))
+        self._lock = threading.Lock()
+        self._calls_lock = threading.Lock()
+        self.llm_calls = 0
+
+    def update_digests(self, date: Optional[str] = None) -> int:
+        """
+        将当天新增的条目分析结果追加到各RSS源的要点中
+
+        Returns:
+            int: 新追加的条目数
+        """
+        date = date or datetime.now().strftime('%Y-%m-%d')
+        # 同一时间只允许一个线程更新，避免重复追加
+        with self._lock:
+            digests = self.database.get_feed_digests(date)
+            after_id = max((d['last_item_id'] for d in digests.values()), default=0)
+            start = datetime.strptime(date, '%Y-%m-%d')
+            items = self.database.get_items_for_digest(start, start + timedelta(days=1), after_id)
+            if not items:
+                return 0
+
+            changed = {}
+            for item in items:
+                digest = changed.get(item['feed_name']) or digests.get(item['feed_name']) or {
+                    'feed_name': item['feed_name'], 'digest': '', 'item_count': 0, 'last_item_id': 0
+                }
+                point = item_point(item['item_title'], item['summary'])
+                changed[item['feed_name']] = {
+                    **digest,
+                    'digest': f"{digest['digest']}\n{point}".strip(),
+                    'item_count': digest['item_count'] + 1,
+                    'last_item_id': item['id'],
+                }
+
+            for digest in changed.values():
+                if estimate_tokens(digest['digest']) > self.digest_tokens:
+                    digest['digest'] = self._compress_digest(digest)
+
+            self.database.save_feed_digests(date, list(changed.values()))
+        logger.info(f"更新每日要点: {len(items)} 条，涉及 {len(changed)} 个RSS源")
+        return len(items)
+
+    def generate_daily_summary(self, date: Optional[str] = None) -> str:
+        """
+        生成每日摘要；要点未变化时直接返回缓存的摘要
+
+        Returns:
+            str: 摘要内容，没有文章时返回 NO_ARTICLES
+        """
+        date = date or datetime.now().strftime('%Y-%m-%d')
+        self.update_digests(date)
+        digests = self.database.get_feed_digests(date)
+        if not digests:
+            return NO_ARTICLES
+
+        source_item_id = max(d['last_item_id'] for d in digests.values())
+        cached = self.database.get_daily_summary(date, source_item_id=source_item_id)
+        if cached is not None:
+            logger.info(f"使用缓存的每日摘要: {date}")
+            return cached
+
+        sections = [
+            f"## {d['feed_name']}（{d['item_count']}篇）\n{d['digest']}" for d in digests.values()
+        ]
+        calls_before = self.llm_calls
+        summary = self._merge(sections, DAILY_PROMPT)
+        if not summary:
+            logger.error(f"生成每日摘要失败: {date}")
+            return NO_ARTICLES
+
+        self.database.save_daily_summary(date, summary, source_item_id=source_item_id)
+        logger.info(f"生成每日摘要: {date}，{len(digests)} 个RSS源，"
+                    f"{sum(d['item_count'] for d in digests.values())} 篇文章，"
+                    f"LLM调用 {self.llm_calls - calls_before} 次")
+        return summary
+
+    def _merge(self, sections: List[str], prompt: str) -> str:
+        """
+        逐层合并：放得进一次请求时直接生成，否则按预算分组生成中间结果后继续合并
+        """
+        budget = self._input_budget(prompt)
+        text = "\n\n".join(sections)
+        if estimate_tokens(text) <= budget or len(sections) == 1:
+            return self._chat(prompt + "\n\n" + truncate_to_tokens(text, budget))
+
+        partial_prompt = PARTIAL_PROMPT.format(limit=self.max_tokens // 2)
+        groups = self._group(sections, self._input_budget(partial_prompt))
+        if len(groups) >= len(sections):
+            # 上下文窗口过小、无法分组时截断后直接生成
+            return self._chat(prompt + "\n\n" + truncate_to_tokens(text, budget))
+        partials = [
+            p for p in self.content_processor.chunk_executor.map(
+                lambda group: self._chat(partial_prompt + "\n\n" + "\n\n".join(group),
+                                         max_tokens=self.max_tokens // 2),
+                groups
+            ) if p
+        ]
+        if not partials:
+            return ''
+        logger.info(f"每日摘要分 {len(groups)} 组合并")
+        return self._merge(partials, prompt)
+
+    @staticmethod
+    def _group(sections: List[str], budget: int) -> List[List[str]]:
+        """按token预算将段落分组，单个超长段落截断后单独成组"""
+        groups = []
+        current = []
+        current_tokens = 0
+        for section in sections:
+            tokens = estimate_tokens(section)
+            if tokens > budget:
+                section = truncate_to_tokens(section, budget)
+                tokens = budget
+            if current and current_tokens + tokens > budget:
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            current.append(section)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def _compress_digest(self, digest: Dict) -> str:
+        """要点超过 digest_tokens 时调用LLM压缩"""
+        limit = self.digest_tokens // 2
+        compressed = self._chat(DIGEST_PROMPT.format(limit=limit) + "\n\n" + digest['digest'],
+                                max_tokens=self.digest_tokens)
+        if not compressed:
+            # 压缩失败时只保留最近的要点
+            lines = []
+            tokens = 0
+            for line in reversed(digest['digest'].splitlines()):
+                tokens += estimate_tokens(line)
+                if lines and tokens > self.digest_tokens:
+                    break
+                lines.append(line)
+            return '\n'.join(reversed(lines))
+        logger.info(f"压缩RSS源要点: {digest['feed_name']}, {digest['item_count']} 篇")
+        return compressed
+
+    def _input_budget(self, prompt: str) -> int:
+        context_window = int(self.llm_config.get('context_window', 32000))
+        overhead = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt) + 200
+        return max(1000, context_window - self.max_tokens - overhead)
+
+    def _chat(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        try:
+            response = self.content_processor.llm_client.chat(
+                [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+                max_tokens=max_tokens or self.max_tokens
+            )
+        except Exception as e:
+            logger.error(f"LLM API调用失败: {str(e)}")
+            return ''
+        finally:
+            with self._calls_lock:
+                self.llm_calls += 1
+        return (response or '').strip()
@@ -0,0 +1,81 @@
+import re
+from typing import List
+
+from .utils import estimate_tokens
+
+# Markdown 图片、HTML 注释以及只包含链接的行通常是导航或页面模板
+_IMAGE_RE = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+_LINK_ONLY_LINE_RE = re.compile(r'^\s*(?:[-*+|]\s*)*(?:\[[^\]]*\]\([^)]*\)[\s|·•,/-]*)+$')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def clean_markdown(text: str) -> str:
+    """去除图片、注释、纯链接行和重复出现的行等页面模板内容"""
+    text = _COMMENT_RE.sub('', text or '')
+    text = _IMAGE_RE.sub('', text)
+
+    lines = []
+    seen = set()
+    for line in text.splitlines():
+        stripped = line.strip()
+        if _LINK_ONLY_LINE_RE.match(stripped):
+            continue
+        # 页眉页脚等重复的短行只保留第一次出现
+        if stripped and len(stripped) < 80:
+            if stripped in seen:
+                continue
+            seen.add(stripped)
+        lines.append(line.rstrip())
+
+    return _BLANK_LINES_RE.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """按估算的token数截断文本，尽量在段落或句子边界处截断"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    tokens = 0.0
+    end = len(text)
+    for i, ch in enumerate(text):
+        tokens += 1 if ord(ch) > 127 else 0.25
+        if tokens >= max_tokens:
+            end = i
+            break
+
+    head = text[:end]
+    for sep in ('\n\n', '\n', '。', '. '):
+        cut = head.rfind(sep)
+        # 边界太靠前时直接按字符截断，避免丢弃过多内容
+        if cut > end * 0.8:
+            return head[:cut + len(sep)].rstrip()
+    return head
+
+
+def split_into_chunks(text: str, chunk_tokens: int) -> List[str]:
+    """按段落将文本切分为每块不超过 chunk_tokens 的片段"""
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for paragraph in text.split('\n\n'):
+        paragraph_tokens = estimate_tokens(paragraph)
+        if current and current_tokens + paragraph_tokens > chunk_tokens:
+            chunks.append('\n\n'.join(current))
+            current, current_tokens = [], 0
+
+        # 单个段落超出预算时继续按长度切分
+        while paragraph_tokens > chunk_tokens:
+            piece = truncate_to_tokens(paragraph, chunk_tokens)
+            chunks.append(piece)
+            paragraph = paragraph[len(piece):].lstrip()
+            paragraph_tokens = estimate_tokens(paragraph)
+
+        if paragraph:
+            current.append(paragraph)
+            current_tokens += paragraph_tokens
+
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
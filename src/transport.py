@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .host_health import HostHealth, host_of
+from .proxy import ProxyManager
+
+logger = logging.getLogger(__name__)
+
+
+class TransportSession(requests.Session):
+    def __init__(self, proxy_manager: ProxyManager, timeout, host_health: Optional[HostHealth] = None):
+        """
+        为每个请求补充默认超时，并按 ProxyManager 决定是否走代理的 Session
+
+        配置了 host_health 时，熔断中的主机直接抛出 CircuitOpenError，其余请求记录耗时与结果。
+        """
+        super().__init__()
+        self.proxy_manager = proxy_manager
+        self.default_timeout = timeout
+        self.host_health = host_health
+        # 配置了代理时完全由 ProxyManager 决定，不读取环境变量中的代理
+        self.trust_env = not proxy_manager.proxy_config
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.default_timeout)
+        if kwargs.get('proxies') is None and self.proxy_manager.proxy_config:
+            kwargs['proxies'] = self.proxy_manager.get_request_proxies(url)
+        if self.host_health is None:
+            return super().request(method, url, **kwargs)
+
+        host = host_of(url)
+        self.host_health.before_request(host)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+        except Exception:
+            self.host_health.record(host, time.perf_counter() - start, False)
+            raise
+        self.host_health.record(host, time.perf_counter() - start, response.status_code < 500)
+        return response
+
+
+class Transport:
+    def __init__(self, http_config: Optional[Dict] = None, proxy_config: Optional[Dict] = None,
+                 host_health: Optional[HostHealth] = None):
+        """
+        RSS源、文章、LLM与推送共用的HTTP传输层
+
+        Args:
+            http_config: 连接池与超时配置，支持：
+                pool_hosts: 缓存连接池的主机数
+                pool_maxsize: 每个主机保持的最大连接数
+                connect_timeout / read_timeout: 默认超时（秒）
+                user_agent: 请求的 User-Agent
+            proxy_config: 代理配置，见 ProxyManager
+            host_health: 按主机熔断，为空时不启用
+        """
+        http_config = http_config or {}
+        self.proxy_manager = ProxyManager(proxy_config)
+        timeout = (
+            float(http_config.get('connect_timeout', 10)),
+            float(http_config.get('read_timeout', 30))
+        )
+        self.session = TransportSession(self.proxy_manager, timeout, host_health)
+
+        self.adapter = HTTPAdapter(
+            pool_connections=int(http_config.get('pool_hosts', 100)),
+            pool_maxsize=int(http_config.get('pool_maxsize', 10)),
+            # 重试由各调用方自行处理
+            max_retries=0
+        )
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.session.headers.update({
+            'User-Agent': http_config.get('user_agent', 'crss/1.0 (+RSS monitor)'),
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        self._lock = threading.Lock()
+
+    def _pools(self):
+        managers = [self.adapter.poolmanager] + list(self.adapter.proxy_manager.values())
+        for manager in managers:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    yield key, pool
+
+    def stats(self) -> Dict:
+        """
+        统计连接复用情况
+
+        requests 为经连接池发出的请求数，connections 为新建的连接数，
+        两者之差即复用已有连接的请求数。
+        """
+        with self._lock:
+            hosts = {}
+            requests_total = 0
+            connections_total = 0
+            for key, pool in self._pools():
+                host = f"{key.key_scheme}://{key.key_host}:{key.key_port}"
+                hosts[host] = {'requests': pool.num_requests, 'connections': pool.num_connections}
+                requests_total += pool.num_requests
+                connections_total += pool.num_connections
+
+        return {
+            'requests': requests_total,
+            'connections': connections_total,
+            'reuse_rate': round(1 - connections_total / requests_total, 3) if requests_total else 0.0,
+            'hosts': hosts,
+        }
+
+    def close(self):
+        self.session.close()
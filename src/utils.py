@@ -1,3 +1,7 @@
+import calendar
+import codecs
+import re
+import unicodedata
 from hashlib import blake2b
 from urllib.parse import urlparse, urlunparse
 import logging
@@ -32,4 +36,113 @@ def normalize_url(url):
 def get_link_hash(url):
     """获取规范化URL的哈希值"""
     normalized_url = normalize_url(url)
-    return blake2b(normalized_url.encode(), digest_size=16).hexdigest() 
\ No newline at end of file
+    return blake2b(normalized_url.encode(), digest_size=16).hexdigest() 
+
+def entry_timestamp(entry):
+    """获取RSS条目的发布（或更新）时间戳，没有时间信息时返回 None"""
+    parsed_time = entry.get('published_parsed') or entry.get('updated_parsed')
+    return calendar.timegm(parsed_time) if parsed_time else None
+
+# 常见的字节顺序标记
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+
+# GB2312/GBK 均为 GB18030 的子集，统一使用 GB18030 解码以容纳扩展字符
+_ENCODING_ALIASES = {
+    'gb2312': 'gb18030',
+    'gbk': 'gb18030',
+    'x-gbk': 'gb18030',
+}
+
+_SINGLE_BYTE_ENCODINGS = {'iso8859-1', 'cp1252'}
+
+_XML_ENCODING_RE = re.compile(rb'^\s*<\?xml[^>]*?encoding=["\']([A-Za-z0-9._:-]+)["\']')
+_CHARSET_RE = re.compile(r'charset=["\']?([A-Za-z0-9._:-]+)', re.I)
+
+
+def _canonical_encoding(name):
+    """规范化编码名称，无法识别时返回 None"""
+    if not name:
+        return None
+    name = name.strip().lower()
+    name = _ENCODING_ALIASES.get(name, name)
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def _can_decode(content, encoding):
+    try:
+        content.decode(encoding)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+
+def detect_encoding(content, content_type=None, preferred=None):
+    """
+    基于原始字节检测文档编码
+
+    依次检查：BOM、HTTP 头中的 charset、XML 声明、preferred（上次确定的编码或网页的 meta charset），
+    最后按 utf-8 -> gb18030 -> iso-8859-1 的顺序严格解码试探。
+    声明的编码无法解码内容时会被忽略。preferred 排在声明之后，RSS源更换编码时不会沿用旧编码
+    （gb18030 等编码几乎可以解码任意字节）。单字节编码可以解码任意字节，内容含非ASCII字符时
+    先尝试其余的多字节候选（包括 utf-8 与 gb18030），都无法解码时才采用声明的单字节编码。
+
+    Returns:
+        str: Python 编解码器名称
+    """
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return encoding
+
+    declared = []
+    if content_type:
+        match = _CHARSET_RE.search(content_type)
+        if match:
+            declared.append(match.group(1))
+    match = _XML_ENCODING_RE.match(content[:200])
+    if match:
+        declared.append(match.group(1).decode('ascii'))
+    if preferred:
+        declared.append(preferred)
+
+    single_byte = None
+    for name in declared + ['utf-8', 'gb18030']:
+        encoding = _canonical_encoding(name)
+        if not encoding:
+            continue
+        if encoding in _SINGLE_BYTE_ENCODINGS and not content.isascii():
+            single_byte = single_byte or encoding
+            continue
+        if _can_decode(content, encoding):
+            return encoding
+
+    return single_byte or 'iso-8859-1'
+
+
+def to_utf8_xml(content, encoding):
+    """按指定编码解码XML并重新编码为utf-8，同时修正XML声明中的编码"""
+    text = content.decode(encoding, errors='replace').lstrip('\ufeff')
+    text = re.sub(r'^(\s*<\?xml[^>]*?encoding=["\'])[^"\']*(["\'])', r'\1utf-8\2', text, count=1)
+    return text.encode('utf-8')
+
+
+def estimate_tokens(text):
+    """粗略估算文本的token数：非ASCII字符（如中文）约1个/token，ASCII约4个/token"""
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii) // 4 + 1
+
+
+def normalize_text(text):
+    """规范化文本用于内容比较：统一Unicode形式并合并空白"""
+    text = unicodedata.normalize('NFKC', text or '')
+    return ' '.join(text.split())